@@ -0,0 +1,10 @@
+"""Jupiter benchmarks — load tests against a fake Ollama server and micro-benchmarks of the storage and dispatch paths.
+
+    python benchmarks/fake_ollama.py --port 11500           # standalone fake Ollama
+    python benchmarks/bench_load.py --target chat -c 8      # /chat, /chat/stream or JupiterPlanner under load
+    python benchmarks/bench_storage.py                      # MemoryStore / AuditStore at 1M / 5M rows
+    python benchmarks/bench_dispatch.py                     # execute_plan dispatch
+    python benchmarks/compare.py base.json head.json        # diff two runs
+
+Every bench prints a JSON document ({"meta", "results"}) to stdout or --out, so runs can be kept per commit and compared.
+"""
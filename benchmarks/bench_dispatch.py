@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Dispatch micro-benchmarks — execute_plan from plan to tool output, per kind of plan.
+
+Measures what the executor adds around the tools: routing a plan to its tool, the broker's scope check,
+cache lookup and audit entry, the hop to the tool thread pool, and gathering multi-call plans. Tools
+that touch the host are kept cheap (system_status is served from the metrics collector; terminal_exec
+runs `true`), so the numbers are dominated by the dispatch path itself.
+
+    python benchmarks/bench_dispatch.py -n 2000 --out dispatch.json
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from benchmarks.harness import emit, log, percentiles, result
+from jupiter.agent.daemon import execute_plan
+from jupiter.safety.broker import SafetyBroker
+from jupiter.safety.cache import ResultCache
+from jupiter.storage.audit import AuditStore
+from jupiter.storage.memory import MemoryStore
+from jupiter.tools.metrics import get_collector
+
+PLANS = {
+    "reply": {"action": "reply", "content": "Hello."},
+    "unknown_tool": {"action": "tool", "tool": "no_such_tool", "args": {}},
+    "remember_preference": {"action": "tool", "tool": "remember_preference", "args": {"key": "editor", "value": "vim"}, "confirmed": True},
+    "audit_log": {"action": "tool", "tool": "audit_log", "args": {"limit": 20}},
+    "system_status.cached": {"action": "tool", "tool": "system_status", "args": {}},
+    "system_status.uncached": {"action": "tool", "tool": "system_status", "args": {}},
+    "terminal_explain": {"action": "tool", "tool": "terminal_explain", "args": {"command": "ls -la"}},
+    "calls.3_read_only": {"action": "tool", "calls": [{"tool": "system_status"}, {"tool": "system_diagnostics"},
+                                                      {"tool": "terminal_explain", "args": {"command": "df -h"}}]},
+    "routed": {"action": "tool", "tool": "system_status", "args": {}, "confirmed": True, "route": "system_status"},
+    "terminal_exec": {"action": "tool", "tool": "terminal_exec", "args": {"command": "true", "timeout_seconds": 5}, "confirmed": True},
+}
+
+
+async def run(args) -> list:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        memory = MemoryStore(Path(tmp) / "jupiter.db")
+        audit = AuditStore(Path(tmp) / "audit.db")
+        cached, uncached = SafetyBroker(audit=audit), SafetyBroker(audit=audit, cache=ResultCache({}, 0))
+        get_collector().snapshot()
+        try:
+            for name, plan in PLANS.items():
+                if args.only and name not in args.only:
+                    continue
+                broker = uncached if name.endswith(".uncached") else cached
+                n = min(args.n, 200) if name == "terminal_exec" else args.n
+                for _ in range(min(n, 20)):
+                    await execute_plan(plan, broker, memory)
+                latencies = []
+                for _ in range(n):
+                    start = time.perf_counter()
+                    await execute_plan(plan, broker, memory)
+                    latencies.append(time.perf_counter() - start)
+                audit.flush()
+                results.append(result(f"dispatch.{name}", {"n": n}, latency_ms=percentiles(latencies),
+                                      ops_per_s=round(n / sum(latencies), 1)))
+                log(f"{name:<24} p50 {results[-1]['latency_ms']['p50']:>8} ms  p99 {results[-1]['latency_ms']['p99']:>8} ms")
+        finally:
+            audit.close()
+            memory.close()
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("-n", type=int, default=2000, help="calls timed per plan")
+    ap.add_argument("--only", nargs="+", choices=list(PLANS))
+    ap.add_argument("--out", help="write the JSON results here instead of stdout")
+    args = ap.parse_args()
+    emit(asyncio.run(run(args)), args.out)
+
+
+if __name__ == "__main__":
+    main()
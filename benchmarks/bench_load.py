@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""Load test — /chat, /chat/stream or JupiterPlanner at a given concurrency against the fake Ollama server.
+
+Starts the fake server and (for the API targets) the Jupiter API on scratch databases, warms up, then
+drives --requests calls from --concurrency workers and reports p50/p95/p99 latency, throughput and
+errors, plus time to first token for chat_stream and the per-stage breakdown from jupiter.instrument.
+
+    python benchmarks/bench_load.py --target chat chat_stream planner -c 1 4 16 --tokens-per-sec 40
+    python benchmarks/bench_load.py --target chat --api-url http://127.0.0.1:8765   # a running API (and its Ollama)
+    python benchmarks/bench_load.py --target planner -c 8 --backends 2 --error-rate 0.1   # a pool of fake servers
+"""
+import argparse
+import asyncio
+import json
+import socket
+import sys
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import httpx
+from benchmarks.fake_ollama import FakeOllama, config_args, config_from
+from benchmarks.harness import drive, emit, log, percentiles, result
+from jupiter.agent.planner import JupiterPlanner
+from jupiter.agent.scheduler import RequestScheduler
+from jupiter.config import LLM_CONCURRENCY
+from jupiter.instrument import metrics
+from jupiter.safety.broker import SafetyBroker
+from jupiter.storage.audit import AuditStore
+from jupiter.storage.memory import MemoryStore
+
+TARGETS = ("chat", "chat_stream", "planner")
+MESSAGES = [
+    "How do I find which process is using port 8080?",
+    "Explain what `tar -xzf archive.tar.gz` does.",
+    "What's a good way to keep my home directory backed up?",
+    "Why would a systemd service keep restarting?",
+    "Write a one-line command to count lines in every .py file here.",
+    "What is the difference between apt and snap?",
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class LocalApi:
+    """The Jupiter API under uvicorn on a background thread, with the given stores and planner."""
+
+    def __init__(self, memory: MemoryStore, broker: SafetyBroker, planner: JupiterPlanner):
+        import uvicorn
+        from jupiter.api import main as api
+        api._memory, api._broker, api._planner = memory, broker, planner
+        self.port = _free_port()
+        self.server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, name="jupiter-api", daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("the API server did not start")
+            time.sleep(0.02)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(10)
+
+
+def _conversation(i: int, conversations: int) -> str:
+    return f"bench-{i % conversations}"
+
+
+async def run_target(target: str, args, concurrency: int, planner: JupiterPlanner, api_url: str) -> dict:
+    first_token = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=api_url, timeout=args.timeout, limits=limits) as client:
+        async def chat(i):
+            body = {"message": MESSAGES[i % len(MESSAGES)], "conversation_id": _conversation(i, args.conversations)}
+            r = await client.post("/chat", json=body)
+            r.raise_for_status()
+            r.json()["reply"]
+
+        async def chat_stream(i):
+            body = {"message": MESSAGES[i % len(MESSAGES)], "conversation_id": _conversation(i, args.conversations)}
+            start, seen = time.perf_counter(), False
+            async with client.stream("POST", "/chat/stream", json=body) as r:
+                r.raise_for_status()
+                async for line in r.aiter_lines():
+                    event = json.loads(line) if line else {}
+                    if event.get("type") == "error":
+                        raise RuntimeError(event.get("detail"))
+                    if event.get("type") == "token" and not seen:
+                        seen = True
+                        first_token.append(time.perf_counter() - start)
+
+        async def plan(i):
+            await planner.plan(MESSAGES[i % len(MESSAGES)], _conversation(i, args.conversations))
+
+        call = {"chat": chat, "chat_stream": chat_stream, "planner": plan}[target]
+        if args.warmup:
+            await drive(call, concurrency, requests=args.warmup)
+        metrics.reset()
+        first_token.clear()
+        out = await drive(call, concurrency, requests=args.requests, duration=args.duration)
+    if target == "chat_stream":
+        out["first_token_ms"] = percentiles(first_token)
+    if not args.api_url:
+        out["stages_ms"] = {f"{h['labels'].get('stage') or h['labels'].get('tool')}": {
+            "count": h["count"], "p50": _ms(h["p50"]), "p95": _ms(h["p95"])}
+            for h in metrics.summary()["histograms"] if h["name"] in ("jupiter_stage_seconds", "jupiter_tool_seconds")}
+    return out
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+async def main_async(args) -> list:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp, ExitStack() as fakes:
+        pool = [fakes.enter_context(FakeOllama(config_from(args))) for _ in range(args.backends)]
+        fake = pool[0]
+        memory = MemoryStore(Path(tmp) / "jupiter.db")
+        broker = SafetyBroker(audit=AuditStore(Path(tmp) / "audit.db"))
+        # One planner per event loop: the API's runs on the server thread, the other is driven from here
+        api_planner, planner = (JupiterPlanner(model=fake.config.model, memory=memory, fast_path=args.fast_path,
+                                               backends=[(f.url, ()) for f in pool],
+                                               scheduler=RequestScheduler(max_inflight=LLM_CONCURRENCY * args.backends))
+                                for _ in range(2))
+        api = None if args.api_url or set(args.target) == {"planner"} else LocalApi(memory, broker, api_planner)
+        try:
+            if api:
+                api.__enter__()
+            for target in args.target:
+                for concurrency in args.concurrency:
+                    log(f"{target} x{concurrency} ...")
+                    out = await run_target(target, args, concurrency, planner, args.api_url or (api.url if api else ""))
+                    params = {"concurrency": concurrency, "requests": args.requests, "duration": args.duration,
+                              "conversations": args.conversations, "fast_path": args.fast_path,
+                              "fake": None if args.api_url else vars(fake.config)}
+                    if len(pool) > 1:
+                        params["backends"] = len(pool)
+                        out["backend_requests"] = [f.stats.requests for f in pool]
+                    results.append(result(f"load.{target}", params, **out))
+                    log(f"  p50 {out['latency_ms'].get('p50')} ms  p95 {out['latency_ms'].get('p95')} ms  "
+                        f"{out['throughput_rps']} req/s  errors {out['errors'] or 0}")
+        finally:
+            if api:
+                api.__exit__(None, None, None)
+            await planner.aclose()
+            broker.audit.close()
+            memory.close()
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--target", nargs="+", choices=TARGETS, default=["chat"])
+    ap.add_argument("-c", "--concurrency", nargs="+", type=int, default=[1, 4], help="one run per value")
+    ap.add_argument("-n", "--requests", type=int, default=100, help="calls per run (0 with --duration: run for that long)")
+    ap.add_argument("--duration", type=float, default=0.0, help="seconds per run instead of a fixed number of calls")
+    ap.add_argument("--warmup", type=int, default=4, help="calls before measuring")
+    ap.add_argument("--conversations", type=int, default=8, help="distinct conversation ids the calls rotate through")
+    ap.add_argument("--fast-path", action="store_true", help="let the intent router answer what it can")
+    ap.add_argument("--timeout", type=float, default=300.0)
+    ap.add_argument("--backends", type=int, default=1, help="fake Ollama servers for the planner to spread requests over")
+    ap.add_argument("--api-url", help="drive an already running API instead of starting one (its Ollama is used)")
+    ap.add_argument("--out", help="write the JSON results here instead of stdout")
+    config_args(ap)
+    args = ap.parse_args()
+    if args.duration and args.requests == ap.get_default("requests"):
+        args.requests = 0
+    emit(asyncio.run(main_async(args)), args.out)
+
+
+if __name__ == "__main__":
+    main()
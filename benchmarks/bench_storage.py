@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""Storage micro-benchmarks — MemoryStore and AuditStore calls on databases of realistic size.
+
+The databases are filled directly with SQL (1M session rows over --conversations conversations, 10k
+episodic facts, 5M audit rows over 90 days by default) and can be kept in --data-dir so later runs skip
+the fill. Each operation is then timed call by call through the public store API.
+
+    python benchmarks/bench_storage.py --out storage.json
+    python benchmarks/bench_storage.py --quick                     # 100k / 200k rows
+    python benchmarks/bench_storage.py --data-dir /var/tmp/jb      # fill once, reuse afterwards
+"""
+import argparse
+import json
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from benchmarks.harness import emit, log, percentiles, result, timed
+from jupiter.storage.audit import AuditStore
+from jupiter.storage.memory import MemoryStore
+
+WORDS = ("the service disk usage memory process restart error network config file package update install log journal "
+         "python docker systemd ssh backup permission user home directory kernel cpu load port firewall timeout "
+         "build test deploy branch commit script cron mount partition swap nginx postgres cache").split()
+ACTIONS = ("tool_call", "tool_call", "tool_call", "fast_path", "permission_denied")
+SCOPES = ("system_read", "system_read", "terminal_read", "terminal_exec", "memory_write")
+OUTCOMES = ("success", "success", "success", "cached", "error", "denied")
+TOOLS = ("system_status", "system_diagnostics", "system_logs_tail", "terminal_explain", "terminal_exec")
+
+
+# A Zipf-weighted vocabulary, so full-text queries hit a realistic mix of common and rare terms
+VOCABULARY = WORDS + [f"{w}{n}" for n in range(100) for w in WORDS[:40]]
+WEIGHTS = [1 / rank for rank in range(1, len(VOCABULARY) + 1)]
+
+
+def _text(rng: random.Random, lo: int, hi: int) -> str:
+    return " ".join(rng.choices(VOCABULARY, WEIGHTS, k=rng.randint(lo, hi)))
+
+
+def _count(path: Path, table: str) -> int:
+    if not path.exists():
+        return 0
+    with sqlite3.connect(path) as db:
+        try:
+            return db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        except sqlite3.OperationalError:
+            return 0
+
+
+def _bulk(path: Path):
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA synchronous=OFF")
+    return db
+
+
+def fill_memory(path: Path, rows: int, conversations: int, facts: int, rng: random.Random):
+    """Session rows spread over the last 30 days, round-robin over the conversations, plus episodic facts."""
+    MemoryStore(path).close()  # creates the schema, triggers included
+    have = _count(path, "session")
+    if have >= rows:
+        return
+    log(f"filling {path.name}: {rows - have} session rows, {facts} facts ...")
+    start, now = time.time(), time.time()
+    with _bulk(path) as db:
+        batch = 50_000
+        for offset in range(have, rows, batch):
+            n = min(batch, rows - offset)
+            db.executemany("INSERT INTO session (role, content, created_at, conversation_id) VALUES (?, ?, ?, ?)",
+                           ((("user", "assistant")[i % 2], _text(rng, 8, 120), now - 30 * 86400 * (1 - i / rows),
+                             f"conv-{i % conversations}") for i in range(offset, offset + n)))
+        db.execute("DELETE FROM conversations")
+        db.execute("""INSERT INTO conversations (id, created_at, updated_at, message_count)
+                      SELECT conversation_id, MIN(created_at), MAX(created_at), COUNT(*) FROM session GROUP BY conversation_id""")
+        if _count(path, "episodic") < facts:
+            db.executemany("INSERT INTO episodic (summary, metadata, created_at) VALUES (?, '{}', ?)",
+                           ((_text(rng, 5, 30), now - rng.random() * 90 * 86400) for _ in range(facts)))
+        db.executemany("INSERT OR REPLACE INTO preferences (key, value, updated_at) VALUES (?, ?, ?)",
+                       (("editor", '"vim"', now), ("model", '"llama3.2:3b"', now)))
+    log(f"  done in {time.time() - start:.1f}s")
+
+
+def fill_audit(path: Path, rows: int, rng: random.Random):
+    """Audit rows spread evenly over the last 90 days."""
+    AuditStore(path).close()
+    have = _count(path, "audit")
+    if have >= rows:
+        return
+    log(f"filling {path.name}: {rows - have} audit rows ...")
+    start, now = time.time(), time.time()
+    with _bulk(path) as db:
+        batch = 100_000
+        for offset in range(have, rows, batch):
+            n = min(batch, rows - offset)
+            db.executemany("INSERT INTO audit (action, scope, details, outcome, created_at) VALUES (?, ?, ?, ?, ?)",
+                           ((rng.choice(ACTIONS), rng.choice(SCOPES), json.dumps({"tool": rng.choice(TOOLS), "args": {"lines": 20}}),
+                             rng.choice(OUTCOMES), now - 90 * 86400 * (1 - i / rows)) for i in range(offset, offset + n)))
+    log(f"  done in {time.time() - start:.1f}s")
+
+
+def _row(bench: str, params: dict, latencies: list, **extra) -> dict:
+    total = sum(latencies)
+    return result(bench, params, latency_ms=percentiles(latencies), ops_per_s=round(len(latencies) / total, 1) if total else None, **extra)
+
+
+def bench_memory(path: Path, args, rng: random.Random) -> list:
+    params = {"session_rows": args.session_rows, "conversations": args.conversations, "facts": args.facts}
+    memory = MemoryStore(path)
+    convs = [f"conv-{rng.randrange(args.conversations)}" for _ in range(args.n)]
+    queries = [_text(rng, 4, 12) for _ in range(args.n)]
+    out = []
+    try:
+        def cold(i):
+            memory._context_cache.clear()
+            return i
+        out.append(_row("storage.memory.get_agent_context.cold", params,
+                        timed(lambda i: memory.get_agent_context(20, 5, convs[i], queries[i]), args.n, cold)))
+        memory.get_agent_context(20, 5, convs[0], queries[0])
+        out.append(_row("storage.memory.get_agent_context.warm", params,
+                        timed(lambda i: memory.get_agent_context(20, 5, convs[0], queries[i]), args.n, lambda i: i)))
+        out.append(_row("storage.memory.session_append", params,
+                        timed(lambda i: memory.session_append("user", queries[i], convs[i]), args.n, lambda i: i)))
+        out.append(_row("storage.memory.session_get_recent", params,
+                        timed(lambda i: memory.session_get_recent(50, convs[i]), args.n, lambda i: i)))
+        out.append(_row("storage.memory.episodic_search", params,
+                        timed(lambda i: memory.episodic_search(queries[i], 5), args.n, lambda i: i)))
+        out.append(_row("storage.memory.conversation_list", params, timed(lambda: memory.conversation_list(50), min(args.n, 200))))
+    finally:
+        memory.close()
+    return out
+
+
+def bench_audit(path: Path, args, rng: random.Random) -> list:
+    params = {"audit_rows": args.audit_rows}
+    out = []
+    audit = AuditStore(path)
+    try:
+        details = [{"tool": rng.choice(TOOLS), "args": {"command": _text(rng, 2, 6)}} for _ in range(args.n)]
+        start = time.perf_counter()
+        enqueue = timed(lambda i: audit.log("tool_call", "system_read", details[i], "success"), args.n, lambda i: i)
+        audit.flush()
+        wall = time.perf_counter() - start
+        out.append(_row("storage.audit.log.batched", params, enqueue, committed_per_s=round(args.n / wall, 1)))
+        out.append(_row("storage.audit.query.newest", params,
+                        timed(lambda: audit.query(limit=20, include_details=False), args.n)))
+        out.append(_row("storage.audit.query.filtered", params,
+                        timed(lambda: audit.query(action="permission_denied", outcome="denied", limit=50), args.n)))
+        top = audit.query(limit=1)["entries"][0]["id"]
+        cursors = [rng.randrange(1, top) for _ in range(args.n)]
+        out.append(_row("storage.audit.query.page", params,
+                        timed(lambda i: audit.query(limit=100, cursor=cursors[i]), args.n, lambda i: i)))
+        now = time.time()
+        out.append(_row("storage.audit.summary.hour", params, timed(lambda: audit.summary(since=now - 3600), min(args.n, 200))))
+        out.append(_row("storage.audit.summary.day", params, timed(lambda: audit.summary(since=now - 86400), min(args.n, 50))))
+    finally:
+        audit.close()
+    strict = AuditStore(path, durability="strict")
+    try:
+        n = min(args.n, 200)
+        out.append(_row("storage.audit.log.strict", params,
+                        timed(lambda i: strict.log("tool_call", "system_read", details[i], "success"), n, lambda i: i)))
+    finally:
+        strict.close()
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--session-rows", type=int, default=1_000_000)
+    ap.add_argument("--conversations", type=int, default=2_000)
+    ap.add_argument("--facts", type=int, default=10_000)
+    ap.add_argument("--audit-rows", type=int, default=5_000_000)
+    ap.add_argument("--quick", action="store_true", help="100k session rows and 200k audit rows")
+    ap.add_argument("-n", type=int, default=1000, help="calls timed per operation")
+    ap.add_argument("--only", choices=("memory", "audit"))
+    ap.add_argument("--data-dir", help="keep the filled databases here and reuse them (default: a temporary directory)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", help="write the JSON results here instead of stdout")
+    args = ap.parse_args()
+    if args.quick:
+        args.session_rows, args.audit_rows, args.conversations = 100_000, 200_000, 500
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        data = Path(args.data_dir or tmp)
+        data.mkdir(parents=True, exist_ok=True)
+        results = []
+        if args.only != "audit":
+            db = data / f"memory-{args.session_rows}.db"
+            fill_memory(db, args.session_rows, args.conversations, args.facts, rng)
+            results += bench_memory(db, args, rng)
+        if args.only != "memory":
+            db = data / f"audit-{args.audit_rows}.db"
+            fill_audit(db, args.audit_rows, rng)
+            results += bench_audit(db, args, rng)
+    for r in results:
+        log(f"{r['bench']:<42} p50 {r['latency_ms']['p50']:>9} ms  p99 {r['latency_ms']['p99']:>9} ms")
+    emit(results, args.out)
+
+
+if __name__ == "__main__":
+    main()
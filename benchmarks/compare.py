@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Compare two benchmark runs — per bench, the change in p50/p95/p99 latency and throughput.
+
+    python benchmarks/compare.py base.json head.json [--threshold 10]
+
+Benches are matched by name and params. Changes beyond --threshold percent are marked (+ slower, - faster);
+the exit status is 1 if any latency got worse by more than the threshold, so it can gate a CI job.
+"""
+import argparse
+import json
+import sys
+
+LATENCY = ("p50", "p95", "p99")
+RATES = ("throughput_rps", "ops_per_s", "committed_per_s")
+
+
+def _key(r: dict) -> str:
+    return r["bench"] + " " + json.dumps(r.get("params", {}), sort_keys=True)
+
+
+def _change(old, new):
+    if old in (None, 0) or new is None:
+        return None
+    return 100.0 * (new - old) / old
+
+
+def compare(base: dict, head: dict, threshold: float) -> tuple:
+    rows, regressions = [], 0
+    old = {_key(r): r for r in base["results"]}
+    for r in head["results"]:
+        b = old.get(_key(r))
+        if b is None:
+            rows.append((r["bench"], "new", "", "", ""))
+            continue
+        cells = []
+        for q in LATENCY:
+            c = _change(b.get("latency_ms", {}).get(q), r.get("latency_ms", {}).get(q))
+            regressions += c is not None and c > threshold
+            cells.append(_fmt(c, threshold))
+        rate = next((k for k in RATES if r.get(k) is not None), None)
+        c = _change(b.get(rate), r.get(rate)) if rate else None
+        cells.append(_fmt(None if c is None else -c, threshold))  # lower throughput reads as slower
+        rows.append((r["bench"], *cells))
+    return rows, regressions
+
+
+def _fmt(change, threshold: float) -> str:
+    if change is None:
+        return "-"
+    mark = " !" if change > threshold else " *" if change < -threshold else ""
+    return f"{change:+.1f}%{mark}"
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("base")
+    ap.add_argument("head")
+    ap.add_argument("--threshold", type=float, default=10.0, help="percent change worth flagging")
+    args = ap.parse_args()
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+    print(f"base {(base['meta'].get('commit') or '?')[:12]}  head {(head['meta'].get('commit') or '?')[:12]}"
+          f"  (+ slower, - faster; ! regression, * improvement beyond {args.threshold:g}%)")
+    rows, regressions = compare(base, head, args.threshold)
+    width = max([len(r[0]) for r in rows] + [5])
+    print(f"{'bench':<{width}}  {'p50':>10} {'p95':>10} {'p99':>10} {'throughput':>11}")
+    for name, *cells in rows:
+        print(f"{name:<{width}}  " + " ".join(f"{c:>10}" for c in cells[:3]) + f" {cells[3] if len(cells) > 3 else '':>11}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
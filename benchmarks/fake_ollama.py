@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""Fake Ollama server — /api/chat with simulated model load, prompt processing and token generation.
+
+Replies are timed like a real model: a one-off load delay, prompt tokens at --prompt-tps, then the reply
+at --tokens-per-sec, streamed in --chunk-tokens pieces. --parallel requests are served at once and the rest
+queue, as with OLLAMA_NUM_PARALLEL. Responses carry Ollama's timing fields (eval_count, eval_duration, ...).
+--trailing-tokens makes the model keep talking after its answer, as unconstrained models do after a JSON
+plan; set --response to a cut-off or broken plan to see how Jupiter copes with those. --error-rate answers
+that share of chats with 503, like an Ollama whose queue is full; run several servers to try failover.
+
+    python benchmarks/fake_ollama.py --port 11500 --tokens-per-sec 30 --parallel 1
+    OLLAMA_HOST=http://127.0.0.1:11500 jupiter-agent
+"""
+import argparse
+import json
+import random
+import socket
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+CHARS_PER_TOKEN = 4
+DEFAULT_REPLY = "This is a simulated reply from the fake Ollama server, padded to the configured length"
+
+
+@dataclass
+class FakeConfig:
+    model: str = "llama3.2:3b"
+    load_ms: float = 0.0  # first request only (the cold model load)
+    prompt_tps: float = 2000.0  # prompt tokens per second; 0 = instant
+    tokens_per_sec: float = 50.0  # generated tokens per second; 0 = instant
+    chunk_tokens: int = 1  # tokens per streamed line
+    reply_tokens: int = 40  # length of the default reply
+    response: Optional[str] = None  # the exact assistant content to return (e.g. a JSON plan)
+    trailing_tokens: int = 0  # chatter generated after the response
+    error_rate: float = 0.0  # share of chat requests answered with 503 (server busy)
+    parallel: int = 4  # requests generated at once; the rest wait
+    jitter: float = 0.0  # +/- fraction applied to every delay
+    seed: Optional[int] = None
+
+
+@dataclass
+class FakeStats:
+    requests: int = 0
+    errors: int = 0  # answered with 503 (error_rate)
+    streamed: int = 0
+    structured: int = 0  # requests with a "format" (structured outputs)
+    stopped: int = 0  # streams the client closed before the end
+    max_queued: int = 0
+    paths: dict = field(default_factory=dict)
+
+
+class FakeOllama:
+    """The server on a background thread: `with FakeOllama(FakeConfig(...)) as fake: ... fake.url`."""
+
+    def __init__(self, config: Optional[FakeConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or FakeConfig()
+        self.stats = FakeStats()
+        self._slots = threading.BoundedSemaphore(max(1, self.config.parallel))
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._loaded = False
+        self._connections: set = set()
+        self.models = {self.config.model}  # what /api/tags lists; /api/pull and /api/delete change it
+        self._rng = random.Random(self.config.seed)
+        self._server = ThreadingHTTPServer((host, port), _handler(self))
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllama":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop listening and drop open connections too, as a killed Ollama would."""
+        self._server.shutdown()
+        self._server.server_close()
+        with self._lock:
+            connections = list(self._connections)
+        for conn in connections:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def busy(self) -> bool:
+        with self._lock:
+            if self.config.error_rate and self._rng.random() < self.config.error_rate:
+                self.stats.errors += 1
+                return True
+        return False
+
+    def _delay(self, seconds: float) -> float:
+        j = self.config.jitter
+        return max(0.0, seconds * (1 + self._rng.uniform(-j, j))) if j else seconds
+
+    def content(self) -> str:
+        cfg = self.config
+        text = cfg.response if cfg.response is not None else json.dumps({"action": "reply", "content": _words(cfg.reply_tokens)})
+        return text + ("\n\n" + _words(cfg.trailing_tokens) if cfg.trailing_tokens else "")
+
+    def chat(self, body: dict, write) -> Optional[dict]:
+        """Simulate one /api/chat; write(obj) sends a stream line. Returns the final object when not streaming."""
+        cfg, stream = self.config, body.get("stream", True)
+        messages = body.get("messages") or []
+        with self._lock:
+            self.stats.requests += 1
+            self.stats.streamed += bool(stream)
+            self.stats.structured += body.get("format") is not None
+            self._waiting += 1
+            self.stats.max_queued = max(self.stats.max_queued, self._waiting)
+        with self._slots:
+            with self._lock:
+                self._waiting -= 1
+                load = 0.0 if self._loaded else self._delay(cfg.load_ms / 1000)
+                self._loaded = True
+            time.sleep(load)
+            started = time.perf_counter()
+            if not messages:  # a load request (warmup)
+                return self._final({"message": {"role": "assistant", "content": ""}}, load, 0, 0, 0, 0, started)
+            prompt_tokens = max(1, sum(len(str(m.get("content", ""))) for m in messages) // CHARS_PER_TOKEN)
+            prompt_s = self._delay(prompt_tokens / cfg.prompt_tps) if cfg.prompt_tps else 0.0
+            time.sleep(prompt_s)
+            text = self.content()
+            step = max(1, cfg.chunk_tokens) * CHARS_PER_TOKEN
+            pieces = [text[i:i + step] for i in range(0, len(text), step)] or [""]
+            per_piece = step / CHARS_PER_TOKEN / cfg.tokens_per_sec if cfg.tokens_per_sec else 0.0
+            gen_start = time.perf_counter()
+            for piece in pieces:
+                time.sleep(self._delay(per_piece))
+                if stream:
+                    write({"model": cfg.model, "message": {"role": "assistant", "content": piece}, "done": False})
+            eval_count = max(1, len(text) // CHARS_PER_TOKEN)
+            final = self._final({"message": {"role": "assistant", "content": "" if stream else text}}, load, prompt_tokens,
+                                prompt_s, eval_count, time.perf_counter() - gen_start, started)
+            if stream:
+                write(final)
+                return None
+            return final
+
+    def _final(self, obj: dict, load, prompt_tokens, prompt_s, eval_count, eval_s, started) -> dict:
+        ns = lambda s: int(s * 1e9)
+        return {"model": self.config.model, **obj, "done": True, "done_reason": "stop",
+                "total_duration": ns(load + time.perf_counter() - started), "load_duration": ns(load),
+                "prompt_eval_count": prompt_tokens, "prompt_eval_duration": ns(prompt_s),
+                "eval_count": eval_count, "eval_duration": ns(eval_s)}
+
+
+def _handler(fake: FakeOllama):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            with fake._lock:
+                fake._connections.add(self.connection)
+
+        def finish(self):
+            with fake._lock:
+                fake._connections.discard(self.connection)
+            super().finish()
+
+        def log_message(self, *args):
+            pass
+
+        def _json(self, obj: dict, status: int = 200):
+            data = json.dumps(obj).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _count(self):
+            with fake._lock:
+                fake.stats.paths[self.path] = fake.stats.paths.get(self.path, 0) + 1
+
+        def do_GET(self):
+            self._count()
+            if self.path == "/api/tags":
+                self._json({"models": [{"name": m, "model": m, "size": 0} for m in sorted(fake.models)]})
+            elif self.path == "/api/version":
+                self._json({"version": "0.0.0-fake"})
+            elif self.path == "/api/ps":
+                self._json({"models": [{"name": fake.config.model}] if fake._loaded else []})
+            else:
+                self._json({"error": "not found"}, 404)
+
+        def do_DELETE(self):
+            self._count()
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            with fake._lock:
+                fake.models.discard(body.get("model") or body.get("name"))
+            self._json({})
+
+        def do_POST(self):
+            self._count()
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            except json.JSONDecodeError:
+                return self._json({"error": "invalid JSON"}, 400)
+            if self.path == "/api/embed":
+                inputs = body.get("input")
+                inputs = inputs if isinstance(inputs, list) else [inputs]
+                return self._json({"model": body.get("model"), "embeddings": [_embed(str(t)) for t in inputs]})
+            if self.path == "/api/pull":
+                with fake._lock:
+                    fake.models.add(body.get("model") or body.get("name"))
+                return self._json({"status": "success"})
+            if self.path != "/api/chat":
+                return self._json({"error": "not found"}, 404)
+            if fake.busy():
+                return self._json({"error": "server busy, please try again.  maximum pending requests exceeded"}, 503)
+            if not body.get("stream", True):
+                return self._json(fake.chat(body, None))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def write(obj):
+                data = (json.dumps(obj) + "\n").encode()
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+            try:
+                fake.chat(body, write)
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                with fake._lock:
+                    fake.stats.stopped += 1  # the client gave up (e.g. it stopped reading after the plan)
+
+    return Handler
+
+
+def _words(tokens: int) -> str:
+    words = (DEFAULT_REPLY + " ") * (1 + tokens * CHARS_PER_TOKEN // len(DEFAULT_REPLY))
+    return words[:tokens * CHARS_PER_TOKEN].rstrip()
+
+
+def _embed(text: str, dims: int = 16) -> list:
+    """A deterministic bag-of-words vector, enough for semantic memory to rank something."""
+    vec = [0.0] * dims
+    for word in text.lower().split():
+        vec[hash(word) % dims] += 1.0
+    return vec
+
+
+def config_args(ap: argparse.ArgumentParser):
+    """Add the FakeConfig options to a bench's argument parser."""
+    d = FakeConfig()
+    ap.add_argument("--load-ms", type=float, default=d.load_ms, help="cold model load delay on the first request")
+    ap.add_argument("--prompt-tps", type=float, default=d.prompt_tps, help="prompt tokens processed per second (0 = instant)")
+    ap.add_argument("--tokens-per-sec", type=float, default=d.tokens_per_sec, help="generation speed (0 = instant)")
+    ap.add_argument("--chunk-tokens", type=int, default=d.chunk_tokens, help="tokens per streamed chunk")
+    ap.add_argument("--reply-tokens", type=int, default=d.reply_tokens, help="length of the default reply")
+    ap.add_argument("--response", help="exact assistant content to return, e.g. a JSON plan")
+    ap.add_argument("--trailing-tokens", type=int, default=d.trailing_tokens, help="text generated after the response")
+    ap.add_argument("--error-rate", type=float, default=d.error_rate, help="share of chats answered with 503")
+    ap.add_argument("--parallel", type=int, default=d.parallel, help="requests generated at once (OLLAMA_NUM_PARALLEL)")
+    ap.add_argument("--jitter", type=float, default=d.jitter, help="+/- fraction of random variation on every delay")
+    ap.add_argument("--seed", type=int)
+
+
+def config_from(args) -> FakeConfig:
+    return FakeConfig(load_ms=args.load_ms, prompt_tps=args.prompt_tps, tokens_per_sec=args.tokens_per_sec,
+                      chunk_tokens=args.chunk_tokens, reply_tokens=args.reply_tokens, response=args.response,
+                      trailing_tokens=args.trailing_tokens, error_rate=args.error_rate, parallel=args.parallel, jitter=args.jitter, seed=args.seed)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=11500)
+    config_args(ap)
+    args = ap.parse_args()
+    fake = FakeOllama(config_from(args), args.host, args.port)
+    print(f"fake Ollama on {fake.url}", file=sys.stderr)
+    try:
+        fake._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(vars(fake.stats)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Shared benchmark plumbing — latency percentiles, concurrent drivers and the JSON result document."""
+import asyncio
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def percentiles(samples: list) -> dict:
+    """{count, mean, min, p50, p95, p99, max} of samples in seconds, reported in milliseconds (nearest-rank)."""
+    if not samples:
+        return {"count": 0}
+    s = sorted(samples)
+    rank = lambda q: s[max(0, math.ceil(q * len(s)) - 1)]
+    return {"count": len(s), "mean": round(1000 * sum(s) / len(s), 3), "min": round(1000 * s[0], 3),
+            "p50": round(1000 * rank(0.50), 3), "p95": round(1000 * rank(0.95), 3), "p99": round(1000 * rank(0.99), 3),
+            "max": round(1000 * s[-1], 3)}
+
+
+def timed(fn: Callable, n: int, setup: Optional[Callable[[int], object]] = None) -> list:
+    """Per-call latencies (seconds) of n calls of fn(setup(i)) — or fn() without setup; setup time is not counted."""
+    out = []
+    for i in range(n):
+        arg = setup(i) if setup else None
+        start = time.perf_counter()
+        fn(arg) if setup else fn()
+        out.append(time.perf_counter() - start)
+    return out
+
+
+async def drive(call: Callable[[int], Awaitable], concurrency: int, requests: int = 0, duration: float = 0.0) -> dict:
+    """Run call(i) from concurrency workers until requests calls were made (or duration seconds passed).
+
+    Returns latency percentiles over the successful calls, throughput over the wall time, and error counts
+    by exception type (a call fails by raising)."""
+    latencies, errors, counter = [], {}, iter(range(10 ** 12))
+    deadline = time.perf_counter() + duration if duration else None
+
+    async def worker():
+        for i in counter:
+            if (requests and i >= requests) or (deadline and time.perf_counter() >= deadline):
+                return
+            start = time.perf_counter()
+            try:
+                await call(i)
+            except Exception as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    return {"latency_ms": percentiles(latencies), "throughput_rps": round(len(latencies) / wall, 2) if wall else None,
+            "wall_s": round(wall, 3), "errors": errors}
+
+
+def result(bench: str, params: Optional[dict] = None, **values) -> dict:
+    return {"bench": bench, "params": params or {}, **values}
+
+
+def _git(*args) -> Optional[str]:
+    try:
+        r = subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return r.stdout.strip() if r.returncode == 0 else None
+
+
+def meta() -> dict:
+    """Where and on what the run happened, so results from different commits and machines are not mixed up."""
+    return {"time": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "commit": _git("rev-parse", "HEAD"),
+            "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")), "python": platform.python_version(),
+            "platform": platform.platform(), "cpus": os.cpu_count(), "argv": sys.argv}
+
+
+def emit(results: list, out: Optional[str] = None):
+    """Write {"meta", "results"} as JSON to out (a path) or stdout."""
+    doc = json.dumps({"meta": meta(), "results": results}, indent=2)
+    if out:
+        Path(out).write_text(doc + "\n")
+        print(f"wrote {len(results)} results to {out}", file=sys.stderr)
+    else:
+        print(doc)
+
+
+def log(*parts):
+    """Progress to stderr, so stdout stays clean JSON."""
+    print(*parts, file=sys.stderr, flush=True)
@@ -165,9 +165,15 @@ pull_ollama_model() {
   [ -s "$HARDWARE_JSON" ] || echo '{"gpu_vram_gb":0,"memory_mb":0}' > "$HARDWARE_JSON"
 
   MODEL_JSON="$JUPITER_DATA/model.json"
-  if [ -x "$INSTALL_SRC/provisioning/model_policy.py" ]; then
+  if [ -f "$INSTALL_SRC/provisioning/calibrate.py" ] && command -v ollama &>/dev/null; then
+    # Times a typical prompt on each candidate model (pulling it) and keeps the largest fast enough
+    log "Calibrating models against a ${JUPITER_TARGET_LATENCY:-10}s target (JUPITER_TARGET_LATENCY)..."
+    (cd "$INSTALL_SRC" && python3 provisioning/calibrate.py --hardware "$HARDWARE_JSON") > "$MODEL_JSON" || true
+  fi
+  if [ ! -s "$MODEL_JSON" ] && [ -x "$INSTALL_SRC/provisioning/model_policy.py" ]; then
     VRAM_GB=$(python3 -c "import json; print(json.load(open('$HARDWARE_JSON')).get('gpu_vram_gb',0))" 2>/dev/null || echo 0)
-    (cd "$INSTALL_SRC" && python3 provisioning/model_policy.py "$VRAM_GB") > "$MODEL_JSON" 2>/dev/null || true
+    MEM_MB=$(python3 -c "import json; print(json.load(open('$HARDWARE_JSON')).get('memory_mb',0))" 2>/dev/null || echo 0)
+    (cd "$INSTALL_SRC" && python3 provisioning/model_policy.py "$VRAM_GB" "$MEM_MB") > "$MODEL_JSON" 2>/dev/null || true
   fi
   [ -s "$MODEL_JSON" ] || echo '{"model":"llama3.2:3b"}' > "$MODEL_JSON"
 
@@ -195,13 +201,14 @@ copy_install_tree() {
     }
   fi
   chmod +x "$JUPITER_INSTALL/scripts/firstboot.sh" 2>/dev/null || true
-  chmod +x "$JUPITER_INSTALL/provisioning/hardware_detect.py" "$JUPITER_INSTALL/provisioning/model_policy.py" 2>/dev/null || true
+  chmod +x "$JUPITER_INSTALL/provisioning/hardware_detect.py" "$JUPITER_INSTALL/provisioning/model_policy.py" \
+    "$JUPITER_INSTALL/provisioning/calibrate.py" 2>/dev/null || true
 }
 
 # ─── Systemd user units ──────────────────────────────────────────────────────
 install_systemd_units() {
   mkdir -p "$HOME/.config/systemd/user"
-  for u in jupiter-firstboot.service jupiter-agent.service; do
+  for u in jupiter-firstboot.service jupiter-agent.service jupiter-agent.socket; do
     if [ -f "$INSTALL_SRC/systemd/$u" ]; then
       cp "$INSTALL_SRC/systemd/$u" "$HOME/.config/systemd/user/"
       log "Installed systemd user unit: $u"
@@ -210,7 +217,8 @@ install_systemd_units() {
   systemctl --user daemon-reload 2>/dev/null || true
   systemctl --user enable jupiter-firstboot.service 2>/dev/null || true
   systemctl --user enable jupiter-agent.service 2>/dev/null || true
-  log "Systemd user services enabled (jupiter-firstboot, jupiter-agent)."
+  systemctl --user enable --now jupiter-agent.socket 2>/dev/null || true
+  log "Systemd user services enabled (jupiter-firstboot, jupiter-agent, jupiter-agent.socket)."
 }
 
 # ─── CLI in PATH ─────────────────────────────────────────────────────────────
@@ -1,3 +1,3 @@
-from .daemon import run_daemon, execute_plan
+from .daemon import run_daemon, execute_plan, chat_turn_stream
 from .planner import JupiterPlanner
-__all__ = ["run_daemon", "execute_plan", "JupiterPlanner"]
+__all__ = ["run_daemon", "execute_plan", "chat_turn_stream", "JupiterPlanner"]
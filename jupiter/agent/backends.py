@@ -0,0 +1,204 @@
+"""Jupiter inference backends — several Ollama instances behind one pool, with health checks and failover."""
+import asyncio
+import math
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Iterable, Optional
+import httpx
+from jupiter.config import (
+    BACKEND_COOLDOWN, BACKEND_FAILURES, BACKEND_HEALTH_INTERVAL, OLLAMA_BACKENDS, OLLAMA_CHAT_TIMEOUT, OLLAMA_CONNECT_TIMEOUT,
+    OLLAMA_KEEPALIVE_EXPIRY, OLLAMA_MAX_CONNECTIONS, OLLAMA_MAX_KEEPALIVE_CONNECTIONS,
+)
+from jupiter.instrument import metrics
+
+# Worth another backend (as is a 5xx answer): it could not be reached, timed out or dropped the connection
+_RETRY = (httpx.TransportError,)
+
+
+class BackendUnavailable(httpx.HTTPError):
+    """No backend could take the request (all failed or none serves the model)."""
+
+
+class NoHealthyBackend(BackendUnavailable):
+    """Every backend for the model has its circuit open; retry_after is when the first one may be tried again."""
+
+    def __init__(self, model: str, retry_after: int):
+        super().__init__(f"No healthy Ollama backend for {model}; retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _tagged(model: str) -> str:
+    return model if ":" in model else model + ":latest"
+
+
+class Backend:
+    """One Ollama instance. models is what it may be sent (empty: whatever it has pulled, as last seen
+    by the health check). After BACKEND_FAILURES failures in a row the circuit opens and the backend
+    gets no requests for BACKEND_COOLDOWN seconds; then one request (or health check) may try it again."""
+
+    def __init__(self, url: str, models: Iterable[str] = ()):
+        self.url = url.rstrip("/")
+        self.models = frozenset(_tagged(m) for m in models)
+        self.pulled: Optional[frozenset] = None
+        self.outstanding = 0
+        self.failures = 0
+        self.open_until = 0.0
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            limits = httpx.Limits(max_connections=OLLAMA_MAX_CONNECTIONS, max_keepalive_connections=OLLAMA_MAX_KEEPALIVE_CONNECTIONS,
+                                  keepalive_expiry=OLLAMA_KEEPALIVE_EXPIRY)
+            self._client = httpx.AsyncClient(base_url=self.url, limits=limits,
+                                             timeout=httpx.Timeout(OLLAMA_CHAT_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT))
+        return self._client
+
+    def serves(self, model: str) -> bool:
+        if self.models:
+            return _tagged(model) in self.models
+        return self.pulled is None or _tagged(model) in self.pulled
+
+    def available(self, now: float) -> bool:
+        return self.open_until <= now
+
+    def succeeded(self):
+        self.failures = 0
+        self.open_until = 0.0
+
+    def failed(self):
+        self.failures += 1
+        metrics.inc("jupiter_backend_errors_total", backend=self.url)
+        if self.failures >= BACKEND_FAILURES:
+            self.open_until = time.monotonic() + BACKEND_COOLDOWN
+
+    def stats(self, now: float) -> dict:
+        return {"url": self.url, "models": sorted(self.models or self.pulled or ()), "outstanding": self.outstanding,
+                "failures": self.failures, "open_for": round(max(0.0, self.open_until - now), 1)}
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class BackendPool:
+    """Sends each request to the backend with the fewest requests outstanding among those that serve
+    its model and whose circuit is closed, and on a connection or server error tries the next one.
+    A stream is only retried before its response starts. A background task checks every backend each
+    BACKEND_HEALTH_INTERVAL seconds, so one that went away stops getting requests before a user's
+    request has to find out, and one that came back gets them again."""
+
+    def __init__(self, backends: Optional[list] = None):
+        self.backends = [Backend(url, models) for url, models in (backends or OLLAMA_BACKENDS)]
+        self._health: Optional[asyncio.Task] = None
+
+    def serving(self, model: str) -> list:
+        return [b for b in self.backends if b.serves(model)] or list(self.backends)
+
+    def pick(self, model: str, exclude: Iterable[Backend] = ()) -> Optional[Backend]:
+        """The closed-circuit backend for model with the fewest requests outstanding; None if there is none left."""
+        now = time.monotonic()
+        closed = [b for b in self.serving(model) if b not in exclude and b.available(now)]
+        return min(closed, key=lambda b: b.outstanding) if closed else None  # min() keeps config order among equals
+
+    def _start_health(self):
+        if self._health is None or self._health.done():
+            self._health = asyncio.get_running_loop().create_task(self._check_loop())
+
+    async def _check_loop(self):
+        while True:
+            try:
+                await asyncio.gather(*(self.check(b) for b in self.backends))
+            except Exception as e:  # keep checking: a loop that died would leave circuits open for good
+                print(f"Backend health check failed: {e!r}", file=sys.stderr, flush=True)
+            await asyncio.sleep(BACKEND_HEALTH_INTERVAL)
+
+    async def check(self, backend: Backend) -> bool:
+        """Ask backend for its models; a hung or unreachable backend counts as a failure, and one whose
+        circuit has cooled down is let back in."""
+        try:
+            r = await backend.http().get("/api/tags", timeout=OLLAMA_CONNECT_TIMEOUT)
+            r.raise_for_status()
+            backend.pulled = frozenset(_tagged(m.get("name", "")) for m in r.json().get("models", []))
+        except (httpx.HTTPError, ValueError):
+            backend.failed()
+            return False
+        # Answering /api/tags says nothing of chats that got 5xx: only close a circuit whose cooldown is over
+        if backend.failures >= BACKEND_FAILURES and backend.available(time.monotonic()):
+            backend.succeeded()
+        return True
+
+    async def _send(self, path: str, payload: dict, stream: bool, backend: Optional[Backend]) -> tuple:
+        """(backend, response) from the first backend that answers without a server error (or the last
+        one tried, error and all). The backend's outstanding count stays raised until the caller has
+        finished with the response (see _done)."""
+        self._start_health()
+        model, tried, error = payload.get("model", ""), [], None
+        while True:
+            target = backend or self.pick(model, tried)
+            if target is None and not tried:
+                now = time.monotonic()
+                wait = min((b.open_until for b in self.serving(model)), default=now) - now
+                raise NoHealthyBackend(model, max(1, math.ceil(wait)))
+            if target is None:
+                raise BackendUnavailable(f"No Ollama backend reachable for {model}: "
+                                         + "; ".join(f"{b.url}: {error if b is tried[-1] else 'failed'}" for b in tried))
+            tried.append(target)
+            target.outstanding += 1
+            try:
+                r = await target.http().send(target.http().build_request("POST", path, json=payload), stream=stream)
+            except _RETRY as e:
+                self._done(target, False)
+                if backend is not None:
+                    raise
+                error = str(e) or type(e).__name__
+                continue
+            except BaseException:
+                target.outstanding -= 1
+                raise
+            if r.status_code < 500 or backend is not None or self.pick(model, tried) is None:
+                return target, r
+            self._done(target, False)
+            await r.aclose()
+
+    @staticmethod
+    def _done(backend: Backend, ok: Optional[bool]):
+        backend.outstanding -= 1
+        if ok:
+            backend.succeeded()
+        elif ok is not None:
+            backend.failed()
+
+    async def post(self, path: str, payload: dict, backend: Optional[Backend] = None) -> httpx.Response:
+        """POST payload (its "model" picks the backends) and return the read response; with backend,
+        only to that one."""
+        target, r = await self._send(path, payload, False, backend)
+        self._done(target, r.status_code < 500)
+        return r
+
+    @asynccontextmanager
+    async def stream(self, path: str, payload: dict) -> AsyncIterator[httpx.Response]:
+        """POST payload and yield the response before its body is read."""
+        target, r = await self._send(path, payload, True, None)
+        ok: Optional[bool] = None  # cancelled (e.g. the client went away): neither
+        try:
+            yield r
+            ok = r.status_code < 500
+        except _RETRY:
+            ok = False
+            raise
+        finally:
+            self._done(target, ok)
+            await r.aclose()
+
+    def stats(self) -> list:
+        now = time.monotonic()
+        return [b.stats(now) for b in self.backends]
+
+    async def aclose(self):
+        if self._health is not None:
+            self._health.cancel()
+            self._health = None
+        for b in self.backends:
+            await b.aclose()
@@ -0,0 +1,47 @@
+"""Jupiter context builder — fit replayed history into the model's context window."""
+from typing import Optional
+from jupiter.config import CONTEXT_TOKENS, RESPONSE_TOKENS, REPLAY_MAX_CHARS
+
+# Replayed history: at least HISTORY_WINDOW messages; the oldest are dropped HISTORY_STEP at a time so the
+# first replayed message (and with it the cached prompt prefix) stays put for several turns.
+HISTORY_WINDOW = 20
+HISTORY_STEP = 10
+MESSAGE_OVERHEAD = 4  # tokens of chat-template framing per message
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text and shell output)."""
+    return (len(text) + 3) // 4 + MESSAGE_OVERHEAD
+
+
+def elide(text: str, limit: int = REPLAY_MAX_CHARS) -> str:
+    """text cut to about limit characters: the head and the tail, which carry the command and its verdict."""
+    if len(text) <= limit:
+        return text
+    head, tail = limit * 2 // 3, limit // 3
+    return f"{text[:head]}\n…[{len(text) - head - tail} characters elided]…\n{text[-tail:]}"
+
+
+def history_window(rows: list, total: int) -> list:
+    """rows are the newest messages of a conversation that has total messages in all."""
+    cutoff = max(0, total - HISTORY_WINDOW)
+    cutoff -= cutoff % HISTORY_STEP
+    return rows[max(0, cutoff - (total - len(rows))):]
+
+
+def fit_history(rows: list, budget: int) -> list:
+    """The newest suffix of rows (each elided) that fits budget tokens, dropping the oldest HISTORY_STEP
+    messages at a time. Returns message dicts that keep the row id."""
+    messages = [{"id": m["id"], "role": m["role"], "content": elide(m["content"])} for m in rows]
+    sizes = [estimate_tokens(m["content"]) for m in messages]
+    start, used = 0, sum(sizes)
+    while used > budget and start < len(messages):
+        step = min(HISTORY_STEP, len(messages) - start)
+        used -= sum(sizes[start:start + step])
+        start += step
+    return messages[start:]
+
+
+def history_budget(fixed: list, context_tokens: Optional[int] = None) -> int:
+    """Tokens left for replayed history once the fixed messages and the reply are accounted for."""
+    return (context_tokens or CONTEXT_TOKENS) - RESPONSE_TOKENS - sum(estimate_tokens(m["content"]) for m in fixed)
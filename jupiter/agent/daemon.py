@@ -1,24 +1,72 @@
 """Jupiter Agent Daemon — planner + executor."""
+import asyncio
+import functools
+import json
 import sys
-from typing import Optional
-from jupiter.config import ensure_dirs
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Optional
+from jupiter.config import AGENT_MAX_STEPS, AGENT_TIME_LIMIT, DEFAULT_CONVERSATION, PRUNE_INTERVAL, TOOL_WORKERS, ensure_dirs
 from jupiter.safety.broker import SafetyBroker, Scope
 from jupiter.storage.audit import AuditStore
 from jupiter.storage.memory import MemoryStore
+from jupiter.agent.context import elide
+from jupiter.instrument import metrics
 from jupiter.agent.planner import JupiterPlanner
+from jupiter.agent.schema import READ_ONLY, plan_calls
+from jupiter.tools.metrics import get_collector
 from jupiter.tools.system import system_status, system_logs_tail, system_diagnostics
 from jupiter.tools.terminal import terminal_explain, terminal_exec
 
+# Tools block on subprocesses and /proc reads; they run here so the event loop stays free.
+_tool_pool = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="jupiter-tool")
+# The permission scope each system tool runs under (and that fast-path routes to it are audited with)
+TOOL_SCOPES = {
+    "system_status": Scope.SYSTEM_READ, "system_logs_tail": Scope.SYSTEM_READ, "system_diagnostics": Scope.SYSTEM_READ,
+    "audit_log": Scope.SYSTEM_READ, "terminal_explain": Scope.TERMINAL_READ, "terminal_exec": Scope.TERMINAL_EXEC,
+}
 
-def execute_plan(plan: dict, broker: SafetyBroker, memory: MemoryStore) -> str:
-    action = plan.get("action", "reply")
-    if action == "reply":
-        return plan.get("content", "No reply generated.")
-    if action != "tool":
-        return "Unknown action."
-    tool = plan.get("tool", "")
-    args = plan.get("args") or {}
-    confirmed = plan.get("confirmed", False)
+
+async def run_tool(fn, *args, **kwargs):
+    """Run a blocking tool call on the bounded tool pool."""
+    return await asyncio.get_running_loop().run_in_executor(_tool_pool, functools.partial(fn, *args, **kwargs))
+
+
+async def prune_loop(memory: MemoryStore, interval: float = PRUNE_INTERVAL):
+    """Archive idle conversations now and then every interval seconds, until cancelled."""
+    while True:
+        try:
+            await asyncio.to_thread(memory.conversation_prune)
+        except Exception as e:
+            print(f"Pruning conversations failed: {e}", file=sys.stderr, flush=True)
+        await asyncio.sleep(interval)
+
+
+def _as_int(value, default: int) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+async def execute_call(call: dict, broker: SafetyBroker, memory: MemoryStore,
+                       on_output: Optional[Callable[[str, str], None]] = None, conversation_id: str = DEFAULT_CONVERSATION) -> str:
+    """Run one tool call ({"tool", "args", "confirmed"}) and return its output or error text.
+    on_output(tool, text) receives terminal_exec output while the command runs (from the tool thread).
+    system_logs_tail continues from where the conversation's last read with the same filters stopped."""
+    start = time.perf_counter()
+    try:
+        return await _execute_call(call, broker, memory, on_output, conversation_id)
+    finally:
+        metrics.observe("jupiter_tool_seconds", time.perf_counter() - start, tool=str(call.get("tool", ""))[:64])
+
+
+async def _execute_call(call: dict, broker: SafetyBroker, memory: MemoryStore, on_output, conversation_id: str) -> str:
+    tool = call.get("tool", "")
+    args = call.get("args") or {}
+    if not isinstance(args, dict):
+        args = {}
+    confirmed = call.get("confirmed", False)
 
     # Memory tools (no broker; require user confirmation)
     if tool == "remember_preference":
@@ -27,7 +75,7 @@ def execute_plan(plan: dict, broker: SafetyBroker, memory: MemoryStore) -> str:
         key, value = args.get("key"), args.get("value")
         if not key:
             return "remember_preference needs args: key, value"
-        memory.preference_set(key, value or "")
+        await asyncio.to_thread(memory.preference_set, key, value or "")
         return f"Stored preference: {key} = {value}"
     if tool == "remember_summary":
         if not confirmed:
@@ -35,61 +83,221 @@ def execute_plan(plan: dict, broker: SafetyBroker, memory: MemoryStore) -> str:
         summary = args.get("summary") or ""
         if not summary:
             return "remember_summary needs args: summary"
-        memory.episodic_add(summary)
+        await asyncio.to_thread(memory.episodic_add, summary)
         return f"Remembered: {summary}"
 
     # Read-only: Jupiter audit log (tool use history)
     if tool == "audit_log":
-        limit = int(args.get("limit", 20))
-        entries = broker.audit.get_recent(limit)
+        limit = _as_int(args.get("limit"), 20)
+        entries = (await asyncio.to_thread(broker.audit.query, limit=limit, include_details=False))["entries"]
         if not entries:
             return "No audit entries yet."
         lines = [f"  {e.get('created_at')} | {e.get('action')} | {e.get('scope')} | {e.get('outcome')}" for e in entries]
         return "Recent audit log:\n" + "\n".join(lines)
 
+    journal_key = cursor = since = None
+    if tool == "system_logs_tail":
+        journal_key = json.dumps([args.get("service") or None, args.get("priority") or None])
+        if args.get("new_only", True) is not False:
+            cursor = await asyncio.to_thread(memory.journal_cursor_get, conversation_id, journal_key)
+        if args.get("since_minutes"):
+            since = (time.time() // 60 - _as_int(args.get("since_minutes"), 60)) * 60  # whole minutes keep the cache key stable
+
     tool_map = {
-        "system_status": (Scope.SYSTEM_READ, lambda: system_status()),
-        "system_logs_tail": (Scope.SYSTEM_READ, lambda: system_logs_tail(args.get("service"), args.get("lines", 20))),
-        "system_diagnostics": (Scope.SYSTEM_READ, lambda: system_diagnostics()),
-        "terminal_explain": (Scope.TERMINAL_READ, lambda: terminal_explain(args.get("command", ""))),
-        "terminal_exec": (Scope.TERMINAL_EXEC, lambda: terminal_exec(args.get("command", ""), args.get("timeout_seconds", 30))),
+        "system_status": (system_status, ()),
+        "system_logs_tail": (system_logs_tail,
+                             (args.get("service") or None, _as_int(args.get("lines"), 20), args.get("priority") or None, since, cursor)),
+        "system_diagnostics": (system_diagnostics, ()),
+        "terminal_explain": (terminal_explain, (" ".join(str(args.get("command", "")).split()),)),
+        "terminal_exec": (terminal_exec, (args.get("command", ""), _as_int(args.get("timeout_seconds"), 30))),
     }
     if tool not in tool_map:
         return f"Unknown tool: {tool}"
-    scope, fn = tool_map[tool]
-    result = broker.execute(tool, scope, fn, confirmed=confirmed)
+    scope = TOOL_SCOPES[tool]
+    fn, fn_args = tool_map[tool]
+    live = {"on_output": functools.partial(on_output, tool)} if on_output is not None and tool == "terminal_exec" else {}
+    result = await run_tool(broker.execute, tool, scope, fn, *fn_args, confirmed=confirmed, **live)
+    if journal_key is not None and result.meta.get("cursor") and result.meta["cursor"] != cursor:
+        await asyncio.to_thread(memory.journal_cursor_set, conversation_id, journal_key, result.meta["cursor"])
     return result.error or result.output
 
 
-def run_daemon_loop(planner: JupiterPlanner, broker: SafetyBroker, memory: MemoryStore):
+async def execute_calls(calls: list, broker: SafetyBroker, memory: MemoryStore,
+                        on_output: Optional[Callable[[str, str], None]] = None, conversation_id: str = DEFAULT_CONVERSATION) -> list:
+    """Outputs of calls, in order. Consecutive read-only calls run concurrently (bounded by the tool
+    pool); any other call waits for the ones before it and runs alone."""
+    outputs, batch = [], []
+    for call in calls + [None]:
+        if call is not None and call.get("tool") in READ_ONLY:
+            batch.append(call)
+            continue
+        if batch:
+            outputs += await asyncio.gather(*(execute_call(c, broker, memory, on_output, conversation_id) for c in batch))
+            batch = []
+        if call is not None:
+            outputs.append(await execute_call(call, broker, memory, on_output, conversation_id))
+    return outputs
+
+
+def format_results(calls: list, outputs: list) -> str:
+    if len(calls) == 1:
+        return outputs[0]
+    return "\n\n".join(f"[{c.get('tool')}]\n{out}" for c, out in zip(calls, outputs))
+
+
+async def execute_plan(plan: dict, broker: SafetyBroker, memory: MemoryStore, conversation_id: str = DEFAULT_CONVERSATION) -> str:
+    action = plan.get("action", "reply")
+    if action == "reply":
+        return plan.get("content", "No reply generated.")
+    if action != "tool":
+        return "Unknown action."
+    calls = plan_calls(plan)
+    if plan.get("route"):
+        # Planned by the intent router, not the model
+        await asyncio.to_thread(broker.audit.log, action="fast_path", scope=TOOL_SCOPES.get(plan.get("tool"), Scope.SYSTEM_READ).value,
+                                details={"intent": plan["route"], "tool": plan.get("tool"), "args": plan.get("args") or {}},
+                                outcome="routed")
+    return format_results(calls, await execute_calls(calls, broker, memory, conversation_id=conversation_id))
+
+
+async def _with_output(task: asyncio.Task, events: asyncio.Queue) -> AsyncIterator[dict]:
+    """Yield events queued while task runs, then the ones left once it is done."""
+    while not task.done():
+        getter = asyncio.ensure_future(events.get())
+        done, _ = await asyncio.wait({task, getter}, return_when=asyncio.FIRST_COMPLETED)
+        if getter in done:
+            yield getter.result()
+        else:
+            getter.cancel()
+    while not events.empty():
+        yield events.get_nowait()
+
+
+async def _until(deadline: float, events: AsyncIterator[dict]) -> AsyncIterator[dict]:
+    """events, until the monotonic deadline: past it, the generator is closed and asyncio.TimeoutError raised."""
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(events.__anext__(), max(0.0, deadline - time.monotonic()))
+            except StopAsyncIteration:
+                return
+            yield event
+    finally:
+        await events.aclose()
+
+
+async def chat_turn_stream(user_message: str, planner: JupiterPlanner, broker: SafetyBroker, memory: MemoryStore,
+                           conversation_id: str = DEFAULT_CONVERSATION, live_output: bool = True) -> AsyncIterator[dict]:
+    """One chat turn: yields {"type": "token"} events while the reply is generated, {"type": "tool",
+    "tools": [...]} before each batch of tool calls, {"type": "output", "tool", "content"} with command
+    output as it is produced (if live_output), then {"type": "done", "reply": ...}.
+
+    Tool results go back to the model, which may call more tools or reply. The model sees results
+    AGENT_MAX_STEPS times at most, and planning and tools together get AGENT_TIME_LIMIT seconds per
+    turn; past either limit the reply is what the model had streamed, else the latest tool results.
+    Plans from the intent router are answered with their tool output directly."""
+    started = time.perf_counter()
+    with metrics.span("memory_write"):
+        await asyncio.to_thread(memory.session_append, "user", user_message, conversation_id)
+    deadline = time.monotonic() + AGENT_TIME_LIMIT
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    on_output = (lambda tool, text: loop.call_soon_threadsafe(events.put_nowait, {"type": "output", "tool": tool, "content": text})
+                 if live_output else None)
+    prompt: Optional[list] = None
+    output = ""
+    for step in range(1, AGENT_MAX_STEPS + 2):
+        plan, streamed = {"action": "reply", "content": ""}, ""
+        try:
+            async for event in _until(deadline, planner.plan_stream(user_message, conversation_id, prompt)):
+                if event["type"] == "token":
+                    streamed += event["content"]
+                    yield event
+                else:
+                    plan, prompt = event["plan"], event.get("messages")
+        except asyncio.TimeoutError:
+            output = streamed or output or "Stopped: no answer within the time limit."
+            break
+        if step == 1:
+            metrics.inc("jupiter_requests_total", planner="fast_path" if plan.get("route") else "llm")
+        if plan.get("action") != "tool" or plan.get("route") or prompt is None:
+            with metrics.span("execute"):
+                output = await execute_plan(plan, broker, memory, conversation_id)
+            break
+        calls = plan_calls(plan)
+        yield {"type": "tool", "tools": [c.get("tool") for c in calls]}
+        task = asyncio.ensure_future(asyncio.wait_for(execute_calls(calls, broker, memory, on_output, conversation_id),
+                                                      max(0.0, deadline - time.monotonic())))
+        with metrics.span("execute"):
+            async for event in _with_output(task, events):
+                yield event
+        try:
+            outputs = task.result()
+        except asyncio.TimeoutError:
+            output = "Stopped: the tools did not finish within the time limit."
+            break
+        output = format_results(calls, outputs)
+        if step > AGENT_MAX_STEPS or time.monotonic() >= deadline:
+            break
+        prompt = prompt + [{"role": "assistant", "content": json.dumps(plan)},
+                           {"role": "user", "content": "Tool results:\n" + format_results(calls, [elide(o) for o in outputs])}]
+    with metrics.span("memory_write"):
+        await asyncio.to_thread(memory.session_append, "assistant", output, conversation_id)
+    metrics.observe("jupiter_stage_seconds", time.perf_counter() - started, stage="turn")
+    yield {"type": "done", "reply": output}
+
+
+async def run_daemon_loop(planner: JupiterPlanner, broker: SafetyBroker, memory: MemoryStore):
     ensure_dirs()
     while True:
         try:
-            line = sys.stdin.readline()
+            line = await asyncio.to_thread(sys.stdin.readline)  # keeps the loop free for background tasks
             if not line:
                 break
             user_message = line.strip()
             if not user_message:
                 continue
-            memory.session_append("user", user_message)
-            plan = planner.plan(user_message)
-            output = execute_plan(plan, broker, memory)
-            memory.session_append("assistant", output)
-            print(output, flush=True)
+            streamed = ""
+            async for event in chat_turn_stream(user_message, planner, broker, memory):
+                if event["type"] == "token":
+                    streamed += event["content"]
+                    print(event["content"], end="", flush=True)
+                elif event["type"] == "tool":
+                    continue
+                elif event["type"] == "output":
+                    print(event["content"], end="", file=sys.stderr, flush=True)
+                elif event["reply"] != streamed:
+                    print(("\n" if streamed else "") + event["reply"], flush=True)
+                else:
+                    print(flush=True)
         except KeyboardInterrupt:
             break
         except Exception as e:
             print(f"Error: {e}", file=sys.stderr, flush=True)
 
 
+async def _serve(planner: JupiterPlanner, broker: SafetyBroker, memory: MemoryStore):
+    get_collector()
+    pruning = asyncio.create_task(prune_loop(memory))
+    try:
+        await planner.warmup()
+        await run_daemon_loop(planner, broker, memory)
+    finally:
+        pruning.cancel()
+        await planner.aclose()
+        broker.audit.close()
+
+
 def run_daemon(model: Optional[str] = None, ollama_base: Optional[str] = None):
-    from jupiter.config import OLLAMA_BASE_URL, DEFAULT_MODEL
     ensure_dirs()
     memory = MemoryStore()
     audit = AuditStore()
     broker = SafetyBroker(audit=audit)
-    planner = JupiterPlanner(base_url=ollama_base or OLLAMA_BASE_URL, model=model or memory.preference_get("model") or DEFAULT_MODEL, memory=memory)
-    run_daemon_loop(planner, broker, memory)
+    planner = JupiterPlanner(base_url=ollama_base, model=model or memory.preference_get("model"), memory=memory)
+    try:
+        asyncio.run(_serve(planner, broker, memory))
+    except KeyboardInterrupt:
+        pass
 
 
 if __name__ == "__main__":
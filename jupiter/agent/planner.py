@@ -1,39 +1,534 @@
 """Jupiter planner — plan next action via local Ollama."""
+import asyncio
+import hashlib
 import json
+import re
+import time
 import httpx
-from typing import Optional
-from jupiter.config import OLLAMA_BASE_URL, OLLAMA_CHAT_TIMEOUT, DEFAULT_MODEL
-from jupiter.storage.memory import MemoryStore
-from jupiter.prompt import get_system_info, build_system_prompt
+from typing import AsyncIterator, Optional
+from jupiter.config import (
+    CONTEXT_TOKENS, FAST_PATH, PLAN_CACHE_SIZE, PLAN_CACHE_TTL, PLAN_SCHEMA, RESPONSE_TOKENS, SUMMARY_MIN_MESSAGES, DEFAULT_CONVERSATION, RECALL_BUDGET_CHARS,
+    OLLAMA_KEEP_ALIVE, SMALL_MODEL, SMALL_MODEL_CHARS, DEFAULT_MODEL,
+)
+from jupiter.agent.backends import BackendPool
+from jupiter.calibration import ThroughputMonitor, measured, provisioned, smaller
+from jupiter.agent.router import IntentRouter, normalize
+from jupiter.agent.scheduler import Priority, RequestScheduler
+from jupiter.agent.schema import READ_ONLY, check_plan, plan_calls, plan_schema
+from jupiter.instrument import metrics
+from jupiter.agent.context import HISTORY_WINDOW, HISTORY_STEP, elide, fit_history, history_budget, history_window
+from jupiter.storage.memory import MemoryStore, memory_note, recall_note
+from jupiter.prompt import SUMMARY_PROMPT, get_system_info, build_system_prompt
+
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}
+# Ollama timing/token fields kept from the final response of each turn
+_STATS = ("prompt_eval_count", "prompt_eval_duration", "eval_count", "eval_duration", "load_duration", "total_duration")
+SUMMARY_SNIPPET_CHARS = 600  # per message folded into the rolling summary
+
+
+def _cacheable(plan: Optional[dict]) -> bool:
+    """Model plans that only call read-only tools; the tools still run each time the plan is reused."""
+    return (plan is not None and plan.get("action") == "tool" and not plan.get("route")
+            and all(c.get("tool") in READ_ONLY for c in plan_calls(plan)))
+
+
+class ReplyStream:
+    """Pull the reply text out of a plan while its JSON is still streaming in.
+
+    Tool plans emit nothing; plain-text (non-JSON) responses are passed through as-is."""
+    _CONTENT = re.compile(r'"content"\s*:\s*"')
+    _REPLY = re.compile(r'"action"\s*:\s*"reply"')
+
+    def __init__(self):
+        self.buf = ""
+        self._plain: Optional[bool] = None
+        self._pos: Optional[int] = None
+        self._closed = False
+
+    def feed(self, piece: str) -> str:
+        self.buf += piece
+        if self._closed:
+            return ""
+        if self._plain is None:
+            head = self.buf.lstrip()
+            if not head:
+                return ""
+            self._plain = head[0] not in "{`"
+            if self._plain:
+                return head
+        if self._plain:
+            return piece
+        if self._pos is None:
+            m = self._CONTENT.search(self.buf)
+            if not m or not self._REPLY.search(self.buf, 0, m.start()):
+                return ""
+            self._pos = m.end()
+        return self._decode()
+
+    def _decode(self) -> str:
+        buf, i, out = self.buf, self._pos, []
+        while i < len(buf):
+            ch = buf[i]
+            if ch == '"':
+                self._closed = True
+                break
+            if ch != "\\":
+                out.append(ch)
+                i += 1
+                continue
+            if i + 1 >= len(buf):
+                break
+            esc = buf[i + 1]
+            if esc != "u":
+                out.append(_ESCAPES.get(esc, esc))
+                i += 2
+                continue
+            # \uXXXX, or a \uXXXX\uXXXX surrogate pair
+            width = 12 if buf[i + 2:i + 4].lower() in ("d8", "d9", "da", "db") else 6
+            if i + width > len(buf):
+                break
+            try:
+                out.append(json.loads('"' + buf[i:i + width] + '"'))
+            except json.JSONDecodeError:
+                pass
+            i += width
+        self._pos = i
+        return "".join(out)
+
+
+class PlanParser:
+    """Follow a plan's JSON while it streams in: brackets and strings are tracked as each piece arrives,
+    so the end of the top-level object is known the moment it is written and generation can stop there.
+
+    The object may be fenced in ``` (after some prose, even); a response with no object is plain text,
+    and a closing bracket that does not match makes it malformed."""
+    TRAILING_CHARS = 16  # whitespace after the object to read through, since the final chunk (with stats) is usually next
+
+    def __init__(self):
+        self.buf = ""
+        self.start: Optional[int] = None  # the object's opening brace
+        self.end: Optional[int] = None  # just past its closing brace
+        self.broken = False
+        self._pos = 0
+        self._stack: list = []
+        self._ticks = 0
+        self._prose = self._fenced = self._in_string = self._escape = False
+
+    def feed(self, piece: str) -> bool:
+        """Add piece; True once the object is complete and the model has gone on past it."""
+        self.buf += piece
+        if self.end is None and not self.broken:
+            self._scan()
+        if self.end is None:
+            return False
+        tail = self.buf[self.end:]
+        return bool(tail.strip()) or len(tail) > self.TRAILING_CHARS
+
+    def _scan(self):
+        buf, i = self.buf, self._pos
+        while i < len(buf):
+            ch = buf[i]
+            i += 1
+            if self.start is None:
+                self._ticks = self._ticks + 1 if ch == "`" else 0
+                if self._ticks == 3:
+                    self._fenced = True
+                elif ch == "{" and (self._fenced or not self._prose):
+                    self.start = i - 1
+                    self._stack.append("}")
+                elif not ch.isspace():
+                    self._prose = True
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._stack.append("}" if ch == "{" else "]")
+            elif ch in "}]":
+                if self._stack.pop() != ch:
+                    self.broken = True
+                    break
+                if not self._stack:
+                    self.end = i
+                    break
+        self._pos = i
+
+    def plan(self, shown: str = "") -> dict:
+        """The plan, or a reply if there is none: plain text as it stands; for JSON that does not parse or
+        was cut off, the reply text already shown to the user (shown), else the raw response."""
+        plan = None
+        if self.end is not None:
+            try:
+                plan = check_plan(json.loads(self.buf[self.start:self.end]))
+            except json.JSONDecodeError:
+                pass
+            outcome = "ok" if plan else "malformed"
+        else:
+            outcome = "plain" if self.start is None else "malformed" if self.broken else "truncated"
+        metrics.inc("jupiter_plans_total", outcome=outcome)
+        return plan or {"action": "reply", "content": shown or self.buf.strip()}
 
 
 class JupiterPlanner:
-    def __init__(self, base_url: str = OLLAMA_BASE_URL, model: Optional[str] = None, memory: Optional[MemoryStore] = None):
-        self.base_url = base_url.rstrip("/")
-        self.model = model or DEFAULT_MODEL
+    """Plans each turn with the local model. A router (see jupiter.agent.router) runs first and answers
+    requests that map straight onto a tool; fast_path=False (or JUPITER_FAST_PATH=0) sends everything
+    to the model. Assign another IntentRouter to .router to change the intents. Every model call takes a
+    slot from .scheduler (see jupiter.agent.scheduler), which callers share to coordinate turns.
+
+    Plans are constrained to .format, the plan schema (see jupiter.agent.schema), with Ollama's
+    structured outputs; set it to None (or JUPITER_PLAN_SCHEMA=0) for Ollama versions without them.
+
+    Tool plans that only read are cached in the memory store, keyed by the normalized request, the
+    model and the preferences and facts the model was shown (so remembering something invalidates
+    them), and identical requests in flight at the same time share one model call.
+
+    Requests go to .pool (see jupiter.agent.backends): backends ([(url, models)]), else the Ollama
+    at base_url, else JUPITER_OLLAMA_BACKENDS. With a small_model (JUPITER_SMALL_MODEL), short requests are first
+    planned by it.
+
+    Without a model, the one provisioning chose is used (else DEFAULT_MODEL) and its speed is watched
+    (.throughput, see jupiter.calibration): if a typical turn drifts well past JUPITER_TARGET_LATENCY,
+    the planner moves to the next smaller model a backend has."""
+
+    def __init__(self, base_url: Optional[str] = None, model: Optional[str] = None, memory: Optional[MemoryStore] = None,
+                 fast_path: bool = FAST_PATH, scheduler: Optional[RequestScheduler] = None, small_model: str = SMALL_MODEL,
+                 backends: Optional[list] = None):
+        self.pool = BackendPool(backends or ([(base_url, ())] if base_url else None))
+        self.model = model or provisioned().get("model") or DEFAULT_MODEL
+        self.throughput: Optional[ThroughputMonitor] = None if model else self._monitor(self.model)
+        self.small_model = small_model
         self.memory = memory or MemoryStore()
+        self.router: Optional[IntentRouter] = IntentRouter() if fast_path else None
+        self.scheduler = scheduler or RequestScheduler()
+        self.format: Optional[dict] = plan_schema() if PLAN_SCHEMA else None
         self._system_prompt = build_system_prompt(get_system_info())
+        self._summaries: dict = {}
+        self._inflight: dict = {}  # cache key -> future of the plan being made for it
+        self.last_stats: dict = {}
+
+    @staticmethod
+    def _monitor(model: str) -> ThroughputMonitor:
+        calibration = measured(model)
+        return ThroughputMonitor(calibration.get("prompt_tps"), calibration.get("gen_tps"))
+
+    def _observe(self, stats: dict, model: Optional[str]):
+        """Record a response's throughput; downgrade the model if it has become too slow for the target."""
+        metrics.observe_ollama(stats)
+        if self.throughput is None or (model or self.model) != self.model:
+            return
+        self.throughput.observe(stats)
+        if not self.throughput.drifted():
+            return
+        fallback = smaller(self.model, lambda m: any(b.serves(m) for b in self.pool.backends))
+        if fallback is None:
+            self.throughput = None  # nothing smaller to move to
+            return
+        metrics.inc("jupiter_model_downgrades_total", model=self.model, to=fallback)
+        self.model = fallback
+        self.throughput = self._monitor(fallback)
+
+    def _bind_semantic(self):
+        """Send the semantic index's embedding requests through the backend pool and the scheduler, like
+        every other model call. The index is used from worker threads (asyncio.to_thread), so each request
+        is handed to this loop and waited for; called on the loop itself it uses the index's own client."""
+        index = self.memory.semantic
+        if index is None or index.transport is not None:
+            return
+        loop = asyncio.get_running_loop()
+
+        async def send(body: dict) -> dict:
+            async with self.scheduler.slot(Priority.INTERACTIVE):
+                r = await self.pool.post("/api/embed", body)
+            r.raise_for_status()
+            return r.json()
 
-    def _chat(self, messages: list) -> str:
-        with httpx.Client(timeout=OLLAMA_CHAT_TIMEOUT) as client:
-            r = client.post(f"{self.base_url}/api/chat", json={"model": self.model, "messages": messages, "stream": False})
+        def transport(body: dict) -> dict:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return asyncio.run_coroutine_threadsafe(send(body), loop).result()
+            return index.request(body)  # on a loop: waiting for it would block it
+        index.transport = transport
+
+    async def aclose(self):
+        if self.memory.semantic is not None:
+            self.memory.semantic.transport = None
+        for task in self._summaries.values():
+            task.cancel()
+        self._summaries.clear()
+        await self.pool.aclose()
+
+    def _payload(self, messages: list, stream: bool, format: Optional[dict] = None, model: Optional[str] = None) -> dict:
+        payload = {"model": model or self.model, "messages": messages, "stream": stream, "keep_alive": OLLAMA_KEEP_ALIVE,
+                   "options": {"num_ctx": CONTEXT_TOKENS}}
+        if format is not None:
+            payload["format"] = format
+        return payload
+
+    async def warmup(self) -> bool:
+        """Load the models into every backend that serves them (a chat with no messages) so the first
+        question skips the cold load. True if at least one backend loaded the main model."""
+        loads = [(model, backend) for model in dict.fromkeys(m for m in (self.model, self.small_model) if m)
+                 for backend in self.pool.serving(model)]
+
+        async def load(model, backend) -> bool:
+            try:
+                async with self.scheduler.slot(Priority.BACKGROUND):
+                    r = await self.pool.post("/api/chat", self._payload([], False, model=model), backend)
+                return r.is_success
+            except (httpx.HTTPError, OSError):
+                return False
+        loaded = await asyncio.gather(*(load(m, b) for m, b in loads))
+        return any(ok for (model, _), ok in zip(loads, loaded) if model == self.model)
+
+    async def _complete(self, messages: list, format: Optional[dict] = None, model: Optional[str] = None) -> dict:
+        r = await self.pool.post("/api/chat", self._payload(messages, False, format, model))
+        r.raise_for_status()
+        return r.json()
+
+    def _model_for(self, user_message: str) -> str:
+        """The model for the first plan of a turn: the small one for a short request, if some backend has it."""
+        small = self.small_model
+        if small and small != self.model and len(user_message) <= SMALL_MODEL_CHARS and any(b.serves(small) for b in self.pool.backends):
+            return small
+        return self.model
+
+    async def _chat(self, messages: list, conversation_id: str, model: Optional[str] = None) -> str:
+        async with self.scheduler.slot(Priority.INTERACTIVE, conversation_id):
+            with metrics.span("llm_request"):
+                data = await self._complete(messages, self.format, model)
+        self.last_stats = {k: data[k] for k in _STATS if k in data}
+        self._observe(self.last_stats, model)
+        return (data.get("message") or {}).get("content", "")
+
+    async def _chat_stream(self, messages: list, conversation_id: str, parser: Optional[PlanParser] = None,
+                           model: Optional[str] = None) -> AsyncIterator[str]:
+        """Yield content pieces from Ollama's NDJSON stream as they are generated. With a parser, the
+        stream is closed (which stops generation) once the plan is complete and the model goes on past it."""
+        async with self.scheduler.slot(Priority.INTERACTIVE, conversation_id):
+            async for piece in self._stream(messages, parser, model):
+                yield piece
+
+    async def _stream(self, messages: list, parser: Optional[PlanParser] = None, model: Optional[str] = None) -> AsyncIterator[str]:
+        start, first, stop = time.perf_counter(), True, False
+        async with self.pool.stream("/api/chat", self._payload(messages, True, self.format, model)) as r:
             r.raise_for_status()
-            return (r.json().get("message") or {}).get("content", "")
-
-    def plan(self, user_message: str) -> dict:
-        context = self.memory.get_context_for_agent(session_limit=20, episodic_limit=5)
-        prompt = (context + "\n\nUser: " + user_message) if context else user_message
-        full_user = self._system_prompt + "\n\n---\nConversation context:\n" + prompt
-        response = self._chat([{"role": "user", "content": full_user}])
-        json_str = response.strip()
-        for start in ("```json", "```"):
-            if start in json_str:
-                json_str = json_str.split(start, 1)[-1].split("```", 1)[0].strip()
+            async for line in r.aiter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(chunk["error"])
+                piece = (chunk.get("message") or {}).get("content", "")
+                if piece:
+                    if first:
+                        metrics.observe("jupiter_stage_seconds", time.perf_counter() - start, stage="llm_first_token")
+                        first = False
+                    stop = parser is not None and parser.feed(piece)
+                    yield piece
+                if chunk.get("done"):
+                    self.last_stats = {k: chunk[k] for k in _STATS if k in chunk}
+                    metrics.observe("jupiter_stage_seconds", time.perf_counter() - start, stage="llm_request")
+                    self._observe(self.last_stats, model)
+                    break
+                if stop:
+                    self.last_stats = {}
+                    metrics.observe("jupiter_stage_seconds", time.perf_counter() - start, stage="llm_request")
+                    metrics.inc("jupiter_plan_stopped_total")
+                    break
+
+    async def _messages(self, user_message: str, conversation_id: str) -> tuple:
+        """Stable prefix first so Ollama can reuse its KV cache: system prompt, preferences, the rolling
+        summary, then the conversation as real user/assistant turns in append-only order. Facts recalled
+        for this message change every turn, so they go last, just before the new message.
+
+        The replayed turns are elided and trimmed to what is left of the context window; messages that
+        no longer fit are folded into the rolling summary in the background (see _summarize).
+
+        Returns the messages and a fingerprint of the memory they include, for the plan cache."""
+        self._bind_semantic()
+        lookups = [asyncio.to_thread(self.memory.get_agent_context, session_limit=HISTORY_WINDOW + HISTORY_STEP, episodic_limit=5,
+                                     conversation_id=conversation_id, query=user_message)]
+        if self.memory.semantic is not None:
+            lookups.append(asyncio.to_thread(self.memory.semantic_search, user_message, 8))
+        ctx, *semantic = await asyncio.gather(*lookups)
+        summary = ctx["summary"] or {"text": "", "upto_id": 0, "covered": 0}
+        window = [m for m in history_window(ctx["session"], ctx["session_total"]) if m["id"] > summary["upto_id"]]
+        current = window.pop() if window and window[-1]["role"] == "user" and window[-1]["content"] == user_message else None
+        if semantic:
+            # Semantic hits add what keyword recall and the replayed history don't already cover
+            shown = {e["summary"] for e in ctx["episodic"]} | {f"s:{m['id']}" for m in ctx["session"]}
+            hits = []
+            for h in semantic[0]:
+                if h["key"] not in shown and h["text"] not in shown:
+                    shown.add(h["text"])
+                    hits.append(h)
+            ctx["episodic"] += [{"summary": h["text"]} for h in hits if h["kind"] == "episodic"]
+            ctx["related"] = [h for h in hits if h["kind"] == "session"]
+        messages = [{"role": "system", "content": self._system_prompt}]
+        note = memory_note(ctx)
+        if note:
+            messages.append({"role": "system", "content": "Memory:\n" + note})
+        if summary["text"]:
+            messages.append({"role": "system", "content": "Summary of the earlier conversation:\n" + summary["text"]})
+        tail = [{"role": "user", "content": user_message}]
+        recalled = recall_note(ctx, RECALL_BUDGET_CHARS)
+        if recalled:
+            tail.insert(0, {"role": "system", "content": "Memory:\n" + recalled})
+        history = fit_history(window, history_budget(messages + tail))
+        replayed = len(history) + (current is not None)
+        first = history[0] if history else current
+        if first and ctx["session_total"] - summary["covered"] - replayed >= SUMMARY_MIN_MESSAGES:
+            self._schedule_summary(conversation_id, first["id"])
+        fingerprint = json.dumps([ctx["preferences"], [e["summary"] for e in ctx["episodic"]]], sort_keys=True)
+        return messages + [{"role": m["role"], "content": m["content"]} for m in history] + tail, fingerprint
+
+    def _schedule_summary(self, conversation_id: str, before_id: int):
+        task = self._summaries.get(conversation_id)
+        if task is None or task.done():
+            self._summaries[conversation_id] = asyncio.create_task(self._summarize(conversation_id, before_id))
+
+    async def _summarize(self, conversation_id: str, before_id: int):
+        """Fold the messages before before_id that the rolling summary does not cover yet into it, a
+        context-window-sized chunk per model call. Runs as a background task after the turn's prompt is
+        built; if it fails the next turn schedules it again."""
+        limit = (CONTEXT_TOKENS - RESPONSE_TOKENS) * 2  # characters of messages per call: about half the window
         try:
-            plan = json.loads(json_str)
-        except json.JSONDecodeError:
-            plan = {"action": "reply", "content": response}
-        if plan.get("action") not in ("reply", "tool"):
-            plan["action"] = "reply"
-            plan["content"] = response
+            while True:
+                summary = await asyncio.to_thread(self.memory.summary_get, conversation_id) or {"text": "", "upto_id": 0, "covered": 0}
+                rows = await asyncio.to_thread(self.memory.session_range, conversation_id, summary["upto_id"], before_id)
+                if not rows:
+                    return
+                lines, size = [], 0
+                for m in rows:
+                    line = f"{m['role']}: {elide(m['content'], SUMMARY_SNIPPET_CHARS)}"
+                    if lines and size + len(line) > limit:
+                        break
+                    lines.append(line)
+                    size += len(line)
+                async with self.scheduler.slot(Priority.BACKGROUND, conversation_id):
+                    with metrics.span("summarize"):
+                        data = await self._complete([
+                            {"role": "system", "content": SUMMARY_PROMPT},
+                            {"role": "user", "content": f"Summary so far:\n{summary['text'] or '(none)'}\n\nNew messages:\n" + "\n".join(lines)},
+                        ])
+                text = ((data.get("message") or {}).get("content") or "").strip()
+                if not text:
+                    return
+                await asyncio.to_thread(self.memory.summary_set, conversation_id, text, rows[len(lines) - 1]["id"],
+                                        summary["covered"] + len(lines))
+        except (httpx.HTTPError, OSError, ValueError):
+            return
+
+    @staticmethod
+    def _parse(response: str) -> dict:
+        parser = PlanParser()
+        parser.feed(response)
+        return parser.plan()
+
+    def _cache_key(self, user_message: str, model: str, fingerprint: str) -> Optional[str]:
+        if not PLAN_CACHE_SIZE:
+            return None
+        parts = [model, self._system_prompt, normalize(user_message), fingerprint]
+        return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+    async def _cache_lookup(self, key: Optional[str]) -> tuple:
+        """(plan, None) if key has a cached plan or an identical request in flight just made one. Else
+        (None, future) when this request is the one making the plan for key (pass the future to
+        _cache_done), or (None, None) when the cache is off or the request in flight made no cacheable plan."""
+        if key is None:
+            return None, None
+        pending = self._inflight.get(key)
+        if pending is not None:
+            plan = await asyncio.shield(pending)
+            metrics.inc("jupiter_plan_cache_total", result="shared" if plan else "miss")
+            return plan, None
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            plan = await asyncio.to_thread(self.memory.plan_cache_get, key, PLAN_CACHE_TTL)
+        except BaseException:
+            self._cache_done(key, future, None)
+            raise
+        metrics.inc("jupiter_plan_cache_total", result="hit" if plan else "miss")
+        if plan is None:
+            return None, future
+        self._cache_done(key, future, plan)
+        self.last_stats = {}
+        return plan, None
+
+    async def _cache_store(self, key: Optional[str], future: Optional[asyncio.Future], plan: dict):
+        if future is not None and _cacheable(plan):
+            await asyncio.to_thread(self.memory.plan_cache_put, key, plan, PLAN_CACHE_SIZE)
+
+    def _cache_done(self, key: Optional[str], future: Optional[asyncio.Future], plan: Optional[dict]):
+        """Hand plan to the identical requests waiting on future (None if they must plan for themselves)."""
+        if future is None:
+            return
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.done():
+            future.set_result(plan if _cacheable(plan) else None)
+
+    def _route(self, user_message: str) -> Optional[dict]:
+        plan = self.router.route(user_message) if self.router is not None else None
+        if plan is not None:
+            self.last_stats = {}
+        return plan
+
+    async def plan(self, user_message: str, conversation_id: str = DEFAULT_CONVERSATION) -> dict:
+        routed = self._route(user_message)
+        if routed is not None:
+            return routed
+        with metrics.span("context"):
+            messages, fingerprint = await self._messages(user_message, conversation_id)
+        model = self._model_for(user_message)
+        key = self._cache_key(user_message, model, fingerprint)
+        plan, future = await self._cache_lookup(key)
+        if plan is not None:
+            return plan
+        try:
+            plan = self._parse(await self._chat(messages, conversation_id, model))
+            await self._cache_store(key, future, plan)
+        finally:
+            self._cache_done(key, future, plan)
         return plan
+
+    async def plan_stream(self, user_message: str, conversation_id: str = DEFAULT_CONVERSATION,
+                          messages: Optional[list] = None) -> AsyncIterator[dict]:
+        """Like plan(), but yields {"type": "token", "content": ...} events for reply text as it is
+        generated, then one {"type": "plan", "plan": ..., "messages": ...} event once the response is
+        complete. messages is the prompt that was sent; pass it back, extended with the plan and its
+        tool results, to plan the next step of the same turn (those steps are never cached)."""
+        key = future = plan = None
+        model = self.model
+        if messages is None:
+            routed = self._route(user_message)
+            if routed is not None:
+                yield {"type": "plan", "plan": routed}
+                return
+            with metrics.span("context"):
+                messages, fingerprint = await self._messages(user_message, conversation_id)
+            model = self._model_for(user_message)
+            key = self._cache_key(user_message, model, fingerprint)
+            plan, future = await self._cache_lookup(key)
+            if plan is not None:
+                yield {"type": "plan", "plan": plan, "messages": messages}
+                return
+        try:
+            reply, parser, shown = ReplyStream(), PlanParser(), ""
+            async for piece in self._chat_stream(messages, conversation_id, parser, model):
+                text = reply.feed(piece)
+                if text:
+                    shown += text
+                    yield {"type": "token", "content": text}
+            plan = parser.plan(shown)
+            await self._cache_store(key, future, plan)
+        finally:
+            self._cache_done(key, future, plan)
+        yield {"type": "plan", "plan": plan, "messages": messages}
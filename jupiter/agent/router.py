@@ -0,0 +1,66 @@
+"""Jupiter intent router — fixed plans for requests that map straight onto one tool, without the LLM."""
+import re
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+_POLITE = re.compile(r"^(?:(?:hey |ok |okay )?jupiter[, ]+)?(?:(?:please|can you|could you|pls)\s+)?|(?:\s+please)?[\s?!.]*$")
+
+
+@dataclass(frozen=True)
+class Intent:
+    """name identifies the intent in the audit log; pattern must match the whole normalized request
+    (lowercase, single spaces, politeness stripped); build turns the match into a plan."""
+    name: str
+    pattern: re.Pattern
+    build: Callable[[re.Match], dict]
+
+
+def _tool(name: str, **args) -> Callable[[re.Match], dict]:
+    def build(m: re.Match) -> dict:
+        found = {k: v for k, v in m.groupdict().items() if v is not None}
+        return {"action": "tool", "tool": name, "args": {**args, **{k: int(v) if v.isdigit() else v for k, v in found.items()}},
+                "confirmed": True}
+    return build
+
+
+def normalize(text: str) -> str:
+    """text lowercased, with single spaces and without politeness ("jupiter, could you ... please?")."""
+    return _POLITE.sub("", " ".join(text.lower().split()))
+
+
+_SHOW = r"(?:(?:show|get|check|give|tell|display|view|print|open)(?: me)? |what(?: is|'s) |how(?: is|'s) )?(?:the |my |current )*"
+INTENTS = (
+    Intent("system_status", re.compile(_SHOW + r"(?:system|machine|host|computer) (?:status|info|information|summary)|status"),
+           _tool("system_status")),
+    Intent("system_diagnostics", re.compile(
+        _SHOW + r"(?:(?:system )?diagnostics|disk (?:usage|space)|free (?:disk )?space|(?:system |cpu )?load(?: average)?|df)"),
+        _tool("system_diagnostics")),
+    Intent("audit_log", re.compile(_SHOW + r"(?:last (?P<limit>\d{1,3}) )?(?:jupiter )?audit(?: log| trail)?(?: entries)?"),
+           _tool("audit_log")),
+    Intent("system_logs_tail", re.compile(
+        r"(?:(?:show|get|tail|view|display|print)(?: me)? |what(?: is|'s) new in )?(?:the )?(?:last (?P<lines>\d{1,4}) (?:lines of )?(?:the )?)?"
+        r"(?:new |latest |recent )?(?:system |journal |service )?(?:logs?|journal)(?: (?:for|of|from) (?:the )?(?P<service>[a-z0-9@._-]+?)(?: service)?)?"),
+        _tool("system_logs_tail")),
+)
+
+
+class IntentRouter:
+    """Pre-planner stage: route() returns a ready plan when the request matches an intent exactly,
+    else None and the request goes to the LLM planner. Matching is anchored to the whole request, so
+    anything with more to it than the bare intent ("why is disk usage so high?") falls through."""
+
+    def __init__(self, intents: Iterable[Intent] = INTENTS):
+        self.intents = list(intents)
+
+    def add(self, intent: Intent):
+        self.intents.append(intent)
+
+    def route(self, text: str) -> Optional[dict]:
+        normalized = normalize(text)
+        if not normalized or len(normalized) > 80:
+            return None
+        for intent in self.intents:
+            m = intent.pattern.fullmatch(normalized)
+            if m:
+                return {**intent.build(m), "route": intent.name}
+        return None
@@ -0,0 +1,167 @@
+"""Jupiter request scheduler — admission control, per-conversation turn order and bounded LLM concurrency."""
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import AsyncIterator, Dict, Optional
+from jupiter.config import DEFAULT_CONVERSATION, LLM_CONCURRENCY, QUEUE_DEPTH
+from jupiter.instrument import metrics
+
+
+class Priority(IntEnum):
+    """Lower runs first. Chat turns are INTERACTIVE; summaries and warmup are BACKGROUND."""
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+class Overloaded(Exception):
+    """Raised by admit() when QUEUE_DEPTH turns are already waiting or running."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Too many requests in progress; retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Turn:
+    """An admitted chat turn. `async with turn:` waits for the conversation's earlier turns (FIFO),
+    and holds the conversation until the block exits. release() is idempotent, so a turn that never
+    started (e.g. the client went away first) can be let go from anywhere."""
+
+    def __init__(self, scheduler: "RequestScheduler", conversation_id: str):
+        self.scheduler = scheduler
+        self.conversation_id = conversation_id
+        self._lock: Optional[asyncio.Lock] = None
+        self._started: Optional[float] = None
+        self._released = False
+
+    async def __aenter__(self):
+        self._lock = self.scheduler._conversation_lock(self.conversation_id)
+        await self._lock.acquire()
+        self._started = time.monotonic()
+        return self
+
+    async def __aexit__(self, *exc):
+        self._lock.release()
+        if exc[0] is None:
+            self.scheduler._record_turn(time.monotonic() - self._started)
+        self.release()
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.scheduler._turn_done(self.conversation_id)
+
+
+class RequestScheduler:
+    """Sits between the API and the model.
+
+    Turns: admit() lets at most max_pending turns be queued or running (else Overloaded, with a
+    Retry-After estimate from how often turns finish), and each conversation runs its turns one at a
+    time in arrival order, so their messages are never interleaved.
+
+    Model calls: slot() allows max_inflight Ollama requests at once. Waiters are served by priority
+    class first; within a class, one per conversation in turn (so a long agent loop in one
+    conversation does not hold up the others), FIFO within a conversation. A waiter that is
+    cancelled (the client disconnected) leaves the queue. Background work only runs when no
+    interactive call is waiting."""
+
+    def __init__(self, max_inflight: int = LLM_CONCURRENCY, max_pending: int = QUEUE_DEPTH):
+        self.max_inflight = max(1, max_inflight)
+        self.max_pending = max(1, max_pending)
+        self._inflight = 0
+        self._waiting: Dict[Priority, "OrderedDict[str, deque]"] = {p: OrderedDict() for p in Priority}
+        self._conversations: Dict[str, list] = {}  # conversation -> [lock, admitted turns]
+        self._pending = 0
+        self._gap = 10.0  # moving average of the time between finished turns, for Retry-After
+        self._last_finish: Optional[float] = None
+
+    # Turns
+
+    def admit(self, conversation_id: str = DEFAULT_CONVERSATION) -> Turn:
+        if self._pending >= self.max_pending:
+            metrics.inc("jupiter_rejected_total")
+            raise Overloaded(self.retry_after())
+        self._pending += 1
+        entry = self._conversations.setdefault(conversation_id, [None, 0])
+        entry[1] += 1
+        return Turn(self, conversation_id)
+
+    def retry_after(self) -> int:
+        """Seconds until a place in the queue is likely free, from how often turns have been finishing."""
+        needed = max(1, self._pending - self.max_pending + 1)
+        return min(300, max(1, math.ceil(self._gap * needed)))
+
+    def _conversation_lock(self, conversation_id: str) -> asyncio.Lock:
+        entry = self._conversations[conversation_id]
+        if entry[0] is None:
+            entry[0] = asyncio.Lock()
+        return entry[0]
+
+    def _turn_done(self, conversation_id: str):
+        self._pending -= 1
+        entry = self._conversations[conversation_id]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._conversations[conversation_id]
+
+    def _record_turn(self, seconds: float):
+        now = time.monotonic()
+        # After an idle spell the gap is no longer than the turn itself
+        gap = seconds if self._last_finish is None else min(now - self._last_finish, seconds)
+        self._gap += 0.2 * (gap - self._gap)
+        self._last_finish = now
+
+    # Model calls
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.INTERACTIVE, conversation_id: str = DEFAULT_CONVERSATION) -> AsyncIterator[None]:
+        """Hold one of the max_inflight model-call slots for the duration of the block."""
+        start = time.perf_counter()
+        if self._inflight < self.max_inflight and not any(self._waiting.values()):
+            self._inflight += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiting[priority].setdefault(conversation_id, deque()).append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._release()  # the slot was handed over just as we were cancelled
+                else:
+                    self._forget(priority, conversation_id, waiter)
+                raise
+        metrics.observe("jupiter_queue_seconds", time.perf_counter() - start, priority=priority.name.lower())
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _forget(self, priority: Priority, conversation_id: str, waiter: asyncio.Future):
+        queue = self._waiting[priority].get(conversation_id)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self._waiting[priority][conversation_id]
+
+    def _release(self):
+        self._inflight -= 1
+        for priority in Priority:
+            conversations = self._waiting[priority]
+            while conversations:
+                conversation_id, queue = next(iter(conversations.items()))
+                waiter = queue.popleft()
+                if queue:
+                    conversations.move_to_end(conversation_id)  # round-robin across conversations
+                else:
+                    del conversations[conversation_id]
+                if not waiter.done():
+                    waiter.set_result(None)
+                    self._inflight += 1
+                    return
+
+    def stats(self) -> dict:
+        return {"inflight": self._inflight, "max_inflight": self.max_inflight,
+                "waiting": {p.name.lower(): sum(len(q) for q in self._waiting[p].values()) for p in Priority},
+                "turns": self._pending, "max_turns": self.max_pending, "retry_after": self.retry_after()}
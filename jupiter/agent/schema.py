@@ -0,0 +1,67 @@
+"""Jupiter plan schema — the JSON shape of a plan, sent to Ollama as a structured-output format."""
+import functools
+from typing import Optional
+from jupiter.config import AGENT_MAX_CALLS
+from jupiter.tools.journal import PRIORITIES
+
+_STR, _INT, _BOOL = {"type": "string"}, {"type": "integer"}, {"type": "boolean"}
+
+# The tools the executor runs (see jupiter.agent.daemon): their arguments and which ones are required
+TOOLS = {
+    "system_status": ({}, ()),
+    "system_logs_tail": ({"service": _STR, "lines": _INT, "priority": {"enum": list(PRIORITIES)}, "since_minutes": _INT,
+                          "new_only": _BOOL}, ()),
+    "system_diagnostics": ({}, ()),
+    "terminal_explain": ({"command": _STR}, ("command",)),
+    "terminal_exec": ({"command": _STR, "timeout_seconds": _INT}, ("command",)),
+    "remember_preference": ({"key": _STR, "value": _STR}, ("key", "value")),
+    "remember_summary": ({"summary": _STR}, ("summary",)),
+    "audit_log": ({"limit": _INT}, ()),
+}
+# Tools that change nothing: they run concurrently, and plans made only of them may be cached
+READ_ONLY = frozenset({"system_status", "system_logs_tail", "system_diagnostics", "terminal_explain", "audit_log"})
+
+
+def _object(properties: dict, required) -> dict:
+    return {"type": "object", "properties": properties, "required": list(required), "additionalProperties": False}
+
+
+def _call(tool: str, action: bool) -> dict:
+    args, required = TOOLS[tool]
+    properties = {"action": {"const": "tool"}} if action else {}
+    properties.update(tool={"const": tool}, args=_object(args, required), confirmed=_BOOL)
+    return _object(properties, properties)
+
+
+@functools.lru_cache(maxsize=None)
+def plan_schema() -> dict:
+    """One of: a reply, a single tool call, or several calls. Properties are listed in the order the
+    model writes them ("action" first), which is what ReplyStream relies on to spot a reply early."""
+    reply = _object({"action": {"const": "reply"}, "content": _STR}, ("action", "content"))
+    calls = _object({"action": {"const": "tool"},
+                     "calls": {"type": "array", "items": {"anyOf": [_call(t, False) for t in TOOLS]},
+                               "minItems": 1, "maxItems": AGENT_MAX_CALLS}}, ("action", "calls"))
+    return {"anyOf": [reply, *(_call(t, True) for t in TOOLS), calls]}
+
+
+def plan_calls(plan: dict) -> list:
+    """The tool calls of a tool plan: its "calls" list, or the plan itself for the single-tool form."""
+    calls = plan.get("calls")
+    if isinstance(calls, list):
+        return [c for c in calls if isinstance(c, dict)][:AGENT_MAX_CALLS]
+    return [plan]
+
+
+def check_plan(plan) -> Optional[dict]:
+    """plan if it has the shape the executor expects (a reply with text, or a tool call or list of
+    calls), else None. Unknown tools and bad arguments pass: the executor reports them to the model."""
+    if not isinstance(plan, dict):
+        return None
+    if plan.get("action") == "reply":
+        return plan if isinstance(plan.get("content"), str) else None
+    if plan.get("action") == "tool":
+        calls = plan.get("calls")
+        if isinstance(calls, list):
+            return plan if calls and all(isinstance(c, dict) and isinstance(c.get("tool"), str) for c in calls) else None
+        return plan if isinstance(plan.get("tool"), str) else None
+    return None
@@ -1,66 +1,278 @@
-"""Jupiter Local API — localhost-only HTTP API."""
+"""Jupiter Local API — localhost-only HTTP API, on a Unix socket and on TCP."""
+import asyncio
+import json
+import os
+import socket
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
 from typing import Optional
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from jupiter.config import API_HOST, API_PORT, ensure_dirs
-from jupiter.agent.daemon import execute_plan
+from starlette.background import BackgroundTask
+from jupiter.config import API_HOST, API_PORT, DEFAULT_CONVERSATION, SOCKET_PATH, ensure_dirs
+from jupiter.agent.backends import NoHealthyBackend
+from jupiter.agent.daemon import chat_turn_stream, prune_loop
 from jupiter.agent.planner import JupiterPlanner
+from jupiter.agent.scheduler import Overloaded
+from jupiter.instrument import metrics
 from jupiter.safety.broker import SafetyBroker
 from jupiter.storage.memory import MemoryStore
 from jupiter.storage.audit import AuditStore
+from jupiter.tools.journal import get_journal_source, priority_level
+from jupiter.tools.metrics import SERIES, get_collector
 
 _memory: Optional[MemoryStore] = None
 _broker: Optional[SafetyBroker] = None
 _planner: Optional[JupiterPlanner] = None
+_bound_socket: Optional[Path] = None  # the Unix socket main() created (not systemd's), removed on shutdown
 
 def get_memory(): global _memory; _memory = _memory or MemoryStore(); return _memory
 def get_broker(): global _broker; _broker = _broker or SafetyBroker(audit=AuditStore()); return _broker
 def get_planner(): global _planner; _planner = _planner or JupiterPlanner(memory=get_memory()); return _planner
 
-app = FastAPI(title="Jupiter OS API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Preload the model in the background so startup isn't held up by a cold load
+    warmup = asyncio.create_task(get_planner().warmup())
+    get_collector()
+    pruning = asyncio.create_task(prune_loop(get_memory()))
+    yield
+    warmup.cancel()
+    pruning.cancel()
+    await get_planner().aclose()
+    get_broker().audit.close()
+    if _bound_socket is not None:
+        _bound_socket.unlink(missing_ok=True)
+
+app = FastAPI(title="Jupiter OS API", lifespan=lifespan)
 
 @app.middleware("http")
 async def localhost_only(request: Request, call_next):
     client = request.client
+    server = request.scope.get("server") or (None, None)
+    if client is None and server[0] and server[1] is None:
+        return await call_next(request)  # a Unix socket: only this user can reach it (mode 0600)
     if not client or client.host not in ("127.0.0.1", "::1", "localhost"):
         return JSONResponse({"detail": "Only localhost allowed"}, status_code=403)
     return await call_next(request)
 
-class ChatIn(BaseModel): message: str
+class ChatIn(BaseModel):
+    message: str
+    conversation_id: str = DEFAULT_CONVERSATION
+    live_output: bool = True  # /chat/stream: send command output as it is produced
 class ChatOut(BaseModel): reply: str
 
+def _overloaded(e: Overloaded) -> JSONResponse:
+    return JSONResponse({"detail": str(e)}, status_code=429, headers={"Retry-After": str(e.retry_after)})
+
+def _unhealthy(e: NoHealthyBackend) -> JSONResponse:
+    return JSONResponse({"detail": str(e)}, status_code=503, headers={"Retry-After": str(e.retry_after)})
+
+async def _unless_disconnected(request: Request, coro):
+    """Run coro, cancelling it if the client goes away first (None then)."""
+    task = asyncio.ensure_future(coro)
+    try:
+        while not task.done():
+            await asyncio.wait({task}, timeout=0.5)
+            if not task.done() and await request.is_disconnected():
+                task.cancel()
+                return None
+        return task.result()
+    finally:
+        if not task.done():
+            task.cancel()
+
 @app.post("/chat", response_model=ChatOut)
-async def chat(body: ChatIn):
+async def chat(body: ChatIn, request: Request):
+    """One turn. Turns of the same conversation run in order; 429 with Retry-After when the queue is full,
+    503 with Retry-After when no backend is healthy."""
     memory = get_memory()
     planner = get_planner()
     broker = get_broker()
-    memory.session_append("user", body.message)
-    plan = planner.plan(body.message)
-    output = execute_plan(plan, broker, memory)
-    memory.session_append("assistant", output)
-    return ChatOut(reply=output)
+    try:
+        turn = planner.scheduler.admit(body.conversation_id)
+    except Overloaded as e:
+        return _overloaded(e)
+    async def run() -> str:
+        reply = ""
+        async with turn:
+            async for event in chat_turn_stream(body.message, planner, broker, memory, body.conversation_id, live_output=False):
+                if event["type"] == "done":
+                    reply = event["reply"]
+        return reply
+    try:
+        reply = await _unless_disconnected(request, run())
+    except NoHealthyBackend as e:
+        return _unhealthy(e)
+    finally:
+        turn.release()
+    if reply is None:
+        return JSONResponse({"detail": "Client disconnected"}, status_code=499)
+    return ChatOut(reply=reply)
+
+@app.post("/chat/stream")
+async def chat_stream(body: ChatIn):
+    """NDJSON stream: {"type": "token", "content"} lines as the reply is generated, {"type": "tool", "tools"} before
+    each batch of tool calls, {"type": "output", "tool", "content"} while a command runs, then {"type": "done", "reply"}.
+    Queued like /chat (429 when full); the turn is cancelled if the client disconnects."""
+    memory = get_memory()
+    planner = get_planner()
+    broker = get_broker()
+    try:
+        turn = planner.scheduler.admit(body.conversation_id)
+    except Overloaded as e:
+        return _overloaded(e)
+    async def lines():
+        try:
+            async with turn:
+                async for event in chat_turn_stream(body.message, planner, broker, memory, body.conversation_id, body.live_output):
+                    yield json.dumps(event) + "\n"
+        except NoHealthyBackend as e:
+            yield json.dumps({"type": "error", "detail": str(e), "retry_after": e.retry_after}) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+        finally:
+            turn.release()
+    # release() again once the response is over, in case the stream never started
+    return StreamingResponse(lines(), media_type="application/x-ndjson", background=BackgroundTask(turn.release))
 
 @app.get("/memory/session")
-async def memory_session():
-    return {"messages": get_memory().session_get_recent(50)}
+async def memory_session(conversation_id: str = DEFAULT_CONVERSATION):
+    return {"messages": await asyncio.to_thread(get_memory().session_get_recent, 50, conversation_id)}
 
 @app.delete("/memory/session")
-async def memory_session_clear():
-    get_memory().session_clear()
+async def memory_session_clear(conversation_id: Optional[str] = None):
+    await asyncio.to_thread(get_memory().session_clear, conversation_id)
+    return {"ok": True}
+
+@app.get("/conversations")
+async def conversations(limit: int = 50):
+    return {"conversations": await asyncio.to_thread(get_memory().conversation_list, limit)}
+
+@app.get("/conversations/{conversation_id}/messages")
+async def conversation_messages(conversation_id: str, limit: int = 50):
+    return {"messages": await asyncio.to_thread(get_memory().session_get_recent, limit, conversation_id)}
+
+@app.delete("/conversations/{conversation_id}")
+async def conversation_delete(conversation_id: str):
+    await asyncio.to_thread(get_memory().session_clear, conversation_id)
     return {"ok": True}
 
 @app.get("/audit")
-async def audit_recent(limit: int = 100):
-    return {"entries": get_broker().audit.get_recent(limit)}
+async def audit_recent(limit: int = 100, action: Optional[str] = None, scope: Optional[str] = None, outcome: Optional[str] = None,
+                       since: Optional[float] = None, until: Optional[float] = None, cursor: Optional[int] = None, details: bool = True):
+    """Newest-first audit entries; pass the returned next_cursor as cursor for the next page."""
+    return await asyncio.to_thread(get_broker().audit.query, action=action, scope=scope, outcome=outcome, since=since, until=until,
+                                   limit=limit, cursor=cursor, include_details=details)
+
+@app.get("/audit/summary")
+async def audit_summary(window_seconds: float = 86400):
+    """Entry counts per outcome and per scope over the last window_seconds."""
+    counts = await asyncio.to_thread(get_broker().audit.summary, since=time.time() - window_seconds)
+    return {"window_seconds": window_seconds, **counts}
+
+@app.get("/system/metrics")
+async def system_metrics(history: int = 0):
+    """Latest host metrics sample and min/avg/max per series over the last 1/5/15 minutes; history=N adds
+    the newest N samples of each series as [time, value] pairs."""
+    collector = get_collector()
+    out = {"interval": collector.interval, "latest": collector.snapshot(), "stats": collector.stats()}
+    if history > 0:
+        out["series"] = {name: collector.history(name, history) for name in SERIES}
+    return out
+
+@app.get("/system/logs")
+async def system_logs(unit: Optional[str] = None, priority: Optional[str] = None, since: Optional[float] = None,
+                      until: Optional[float] = None, after_cursor: Optional[str] = None, lines: int = 50):
+    """Journal entries (oldest first) filtered by unit, priority (0-7 or a name) and time; pass the returned
+    cursor as after_cursor to get only newer entries next time."""
+    try:
+        entries = await asyncio.to_thread(get_journal_source().read, lines=lines, unit=unit, priority=priority, since=since,
+                                          until=until, after_cursor=after_cursor)
+    except ValueError as e:
+        return JSONResponse({"detail": str(e)}, status_code=400)
+    except (OSError, RuntimeError) as e:
+        return JSONResponse({"detail": str(e)}, status_code=503)
+    return {"entries": entries, "cursor": entries[-1]["cursor"] if entries else after_cursor}
+
+@app.get("/system/logs/follow")
+async def system_logs_follow(unit: Optional[str] = None, priority: Optional[str] = None, after_cursor: Optional[str] = None,
+                             lines: int = 10):
+    """NDJSON stream of journal entries as they are written: the last lines entries (or all after after_cursor) first."""
+    try:
+        priority_level(priority)
+    except ValueError as e:
+        return JSONResponse({"detail": str(e)}, status_code=400)
+    async def entries():
+        async for entry in get_journal_source().follow(lines=lines, unit=unit, priority=priority, after_cursor=after_cursor):
+            yield json.dumps(entry) + "\n"
+    return StreamingResponse(entries(), media_type="application/x-ndjson")
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Per-stage latency histograms, tool times and Ollama token throughput in Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/summary")
+async def metrics_summary():
+    """The same measurements as counts, averages and estimated p50/p95 (used by `jupiter stats`)."""
+    return metrics.summary()
+
+@app.get("/scheduler")
+async def scheduler_stats():
+    """Model calls in flight and waiting per priority, admitted turns, and the Retry-After a full queue would answer."""
+    return get_planner().scheduler.stats()
+
+@app.get("/backends")
+async def backend_stats():
+    """Each Ollama backend: its models, requests outstanding, failures in a row and seconds until its circuit closes;
+    and the main model with its measured speed against the target latency."""
+    planner = get_planner()
+    throughput = planner.throughput.stats() if planner.throughput is not None else None
+    return {"backends": planner.pool.stats(), "model": planner.model, "throughput": throughput}
 
 @app.get("/health")
 async def health():
     return {"status": "ok", "service": "jupiter"}
 
+def _listeners() -> list:
+    """The sockets systemd passed in (socket activation, see systemd/jupiter-agent.socket), else a Unix
+    socket at SOCKET_PATH and TCP on API_HOST:API_PORT (unless the port is 0)."""
+    if os.environ.get("LISTEN_PID") == str(os.getpid()):
+        return [socket.socket(fileno=fd) for fd in range(3, 3 + int(os.environ.get("LISTEN_FDS", "0")))]
+    SOCKET_PATH.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(str(SOCKET_PATH))
+        except (FileNotFoundError, ConnectionRefusedError):
+            SOCKET_PATH.unlink(missing_ok=True)  # left over from a process that did not exit cleanly
+        else:
+            raise SystemExit(f"Jupiter API already running on {SOCKET_PATH}")
+    unix = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)
+    try:
+        unix.bind(str(SOCKET_PATH))
+    finally:
+        os.umask(old_umask)
+    global _bound_socket
+    _bound_socket = SOCKET_PATH
+    sockets = [unix]
+    if API_PORT:
+        tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        tcp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        tcp.bind((API_HOST, API_PORT))
+        sockets.append(tcp)
+    return sockets
+
 def main():
     import uvicorn
-    uvicorn.run(app, host=API_HOST, port=API_PORT, log_level="info")
+    ensure_dirs()
+    sockets = _listeners()
+    # Keep idle connections open for a while: the CLI reuses one connection for a whole session
+    server = uvicorn.Server(uvicorn.Config(app, log_level="info", timeout_keep_alive=300))
+    server.run(sockets=sockets)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,114 @@
+"""Jupiter model calibration — how long a typical turn takes on a model, from its measured token rates.
+
+Standard library only: provisioning/calibrate.py uses it under the system Python, before the venv exists."""
+import json
+import re
+from typing import Callable, Optional
+from jupiter.config import (
+    DEFAULT_MODEL, DRIFT_MARGIN, DRIFT_SAMPLES, HARDWARE_FILE, MODEL_FILE, MODEL_POLICY, TARGET_LATENCY, TYPICAL_PROMPT_TOKENS, TYPICAL_REPLY_TOKENS,
+)
+
+_PARAMS = re.compile(r"(\d+(?:\.\d+)?)b", re.I)
+_BITS = re.compile(r"(?:q(\d)|fp?(16|32))", re.I)
+# Rates from smaller responses than these say more about per-request overhead than about the model
+MIN_PROMPT_TOKENS = 256
+MIN_REPLY_TOKENS = 16
+
+
+def estimate_mb(model: str) -> int:
+    """Rough memory a model needs, from its tag ("7b-q4_0": 7B parameters at ~4.5 bits each), plus room
+    for the KV cache. Untagged sizes are taken as 3B and unnamed quantizations as Ollama's default (q4)."""
+    tag = model.partition(":")[2] or model
+    params = _PARAMS.search(tag)
+    bits = _BITS.search(tag)
+    width = (int(bits.group(1)) + 0.5 if bits.group(1) else int(bits.group(2))) if bits else 4.5
+    return int(float(params.group(1) if params else 3) * width / 8 * 1024) + 512
+
+
+def candidates() -> list:
+    """The models provisioning chooses from, smallest first."""
+    return sorted(set(MODEL_POLICY.values()) | {DEFAULT_MODEL}, key=estimate_mb)
+
+
+def rates(stats: dict) -> tuple:
+    """(prompt, generation) tokens per second from the timing fields of an Ollama response; None where
+    the response had too few tokens to tell."""
+    def rate(count_key, duration_key, least):
+        count, duration = stats.get(count_key) or 0, stats.get(duration_key) or 0
+        return count / (duration / 1e9) if count >= least and duration > 0 else None
+    return (rate("prompt_eval_count", "prompt_eval_duration", MIN_PROMPT_TOKENS),
+            rate("eval_count", "eval_duration", MIN_REPLY_TOKENS))
+
+
+def turn_seconds(prompt_tps: float, gen_tps: float) -> float:
+    """Seconds for a typical Jupiter turn: its prompt evaluated, then a plan generated."""
+    return TYPICAL_PROMPT_TOKENS / prompt_tps + TYPICAL_REPLY_TOKENS / gen_tps
+
+
+def select(results: dict, target: float = TARGET_LATENCY) -> Optional[str]:
+    """The largest calibrated model whose typical turn takes at most target seconds, else the fastest one
+    (results: model -> {"seconds": ...}); None if none was measured."""
+    timed = {m: r["seconds"] for m, r in results.items() if r.get("seconds") is not None}
+    within = [m for m, s in timed.items() if s <= target]
+    if within:
+        return max(within, key=estimate_mb)
+    return min(timed, key=timed.get) if timed else None
+
+
+def smaller(model: str, available: Callable[[str], bool] = lambda m: True) -> Optional[str]:
+    """The largest candidate smaller than model that is available, if any."""
+    below = [m for m in candidates() if estimate_mb(m) < estimate_mb(model) and available(m)]
+    return below[-1] if below else None
+
+
+def _read(path) -> dict:
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def provisioned() -> dict:
+    """What provisioning chose (model.json): {"model": ..., and if it was calibrated "prompt_tps", "gen_tps", ...}."""
+    return _read(MODEL_FILE)
+
+
+def measured(model: str) -> dict:
+    """model's calibration results from hardware.json ({"prompt_tps", "gen_tps", "seconds", "rss_mb", ...}), if any."""
+    result = ((_read(HARDWARE_FILE).get("calibration") or {}).get("models") or {}).get(model)
+    return result if isinstance(result, dict) else {}
+
+
+class ThroughputMonitor:
+    """Moving averages of one model's prompt and generation rates, fed the stats of its responses and
+    seeded with its calibration. drifted() once DRIFT_SAMPLES responses have been seen and a typical
+    turn at the averaged rates takes longer than DRIFT_MARGIN x target."""
+
+    def __init__(self, prompt_tps: Optional[float] = None, gen_tps: Optional[float] = None, target: float = TARGET_LATENCY):
+        self.target = target
+        self.prompt_tps = prompt_tps
+        self.gen_tps = gen_tps
+        self.samples = 0
+
+    def observe(self, stats: dict):
+        prompt, gen = rates(stats)
+        if prompt:
+            self.prompt_tps = prompt if self.prompt_tps is None else self.prompt_tps + 0.2 * (prompt - self.prompt_tps)
+        if gen:
+            self.gen_tps = gen if self.gen_tps is None else self.gen_tps + 0.2 * (gen - self.gen_tps)
+            self.samples += 1
+
+    def seconds(self) -> Optional[float]:
+        if not (self.prompt_tps and self.gen_tps):
+            return None
+        return turn_seconds(self.prompt_tps, self.gen_tps)
+
+    def drifted(self) -> bool:
+        seconds = self.seconds()
+        return bool(self.target) and self.samples >= DRIFT_SAMPLES and seconds is not None and seconds > self.target * DRIFT_MARGIN
+
+    def stats(self) -> dict:
+        seconds = self.seconds()
+        return {"prompt_tps": round(self.prompt_tps or 0, 1), "gen_tps": round(self.gen_tps or 0, 1), "samples": self.samples,
+                "turn_seconds": round(seconds, 2) if seconds is not None else None, "target_seconds": self.target}
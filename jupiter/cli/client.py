@@ -0,0 +1,150 @@
+"""Jupiter API client — one keep-alive HTTP connection to the local API over its Unix socket (or TCP).
+
+Standard library only, and http.client is imported on the first request, so `jupiter` can show its
+prompt before anything heavy is loaded."""
+import functools
+import json
+import socket
+from pathlib import Path
+from typing import Iterator, Optional
+from urllib.parse import urlencode, urlsplit
+from jupiter.config import API_HOST, API_PORT, SOCKET_PATH
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, detail: str, retry_after: Optional[int] = None):
+        super().__init__(f"HTTP {status}: {detail}")
+        self.status = status
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+@functools.lru_cache(maxsize=None)
+def _connection_class():
+    import http.client
+
+    class UnixHTTPConnection(http.client.HTTPConnection):
+        def __init__(self, path: str, timeout: float):
+            super().__init__("localhost", timeout=timeout)
+            self.path = path
+
+        def connect(self):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            self.sock = sock
+
+    return http.client, UnixHTTPConnection
+
+
+class ApiClient:
+    """Talks to url (http://host:port) if given, else to the API's Unix socket at socket_path, falling
+    back to TCP on the default port. The connection is opened once and reused; if the server closed it
+    while idle, the request is sent again on a new one."""
+
+    def __init__(self, url: Optional[str] = None, socket_path: Path = SOCKET_PATH, timeout: float = 10.0):
+        self.url = url
+        self.socket_path = str(socket_path)
+        self.timeout = timeout
+        self.target: Optional[str] = None  # "unix:/path" or "host:port", once connected
+        self._conn = None
+
+    def _candidates(self) -> list:
+        if self.url:
+            parts = urlsplit(self.url if "//" in self.url else "http://" + self.url)
+            return [("tcp", (parts.hostname or API_HOST, parts.port or 80))]
+        return [("unix", self.socket_path), ("tcp", (API_HOST, API_PORT))]
+
+    def available(self) -> bool:
+        """True if something accepts connections where the API should be (a plain connect, no request)."""
+        for kind, address in self._candidates():
+            if kind == "unix" and not Path(address).exists():
+                continue
+            family = socket.AF_UNIX if kind == "unix" else socket.AF_INET
+            with socket.socket(family, socket.SOCK_STREAM) as sock:
+                sock.settimeout(0.5)
+                try:
+                    sock.connect(address)
+                except OSError:
+                    continue
+            self.target = f"unix:{address}" if kind == "unix" else f"{address[0]}:{address[1]}"
+            return True
+        return False
+
+    def _open(self):
+        if self.target is None and not self.available():
+            raise ConnectionError("The Jupiter API is not running")
+        http_client, unix_connection = _connection_class()
+        if self.target.startswith("unix:"):
+            return unix_connection(self.target[5:], self.timeout)
+        host, _, port = self.target.rpartition(":")
+        return http_client.HTTPConnection(host, int(port), timeout=self.timeout)
+
+    def _send(self, method: str, path: str, body: Optional[dict], timeout: Optional[float]):
+        http_client, _ = _connection_class()
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        for attempt in (1, 2):
+            if self._conn is None:
+                self._conn = self._open()
+            self._conn.timeout = timeout or self.timeout
+            if self._conn.sock is not None:
+                self._conn.sock.settimeout(self._conn.timeout)
+            try:
+                self._conn.request(method, path, body=payload, headers=headers)
+                return self._conn.getresponse()
+            except (http_client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # The server dropped the idle keep-alive connection before reading the request
+                self.close()
+                if attempt == 2:
+                    raise
+
+    @staticmethod
+    def _check(response):
+        if response.status < 400:
+            return
+        raw = response.read()
+        try:
+            detail = json.loads(raw).get("detail") or raw.decode(errors="replace")
+        except (ValueError, AttributeError):
+            detail = raw.decode(errors="replace")
+        retry = response.getheader("Retry-After")
+        raise ApiError(response.status, str(detail), int(retry) if retry and retry.isdigit() else None)
+
+    def get(self, path: str, params: Optional[dict] = None, timeout: Optional[float] = None) -> dict:
+        return json.loads(self.text(path, params, timeout))
+
+    def text(self, path: str, params: Optional[dict] = None, timeout: Optional[float] = None) -> str:
+        query = urlencode({k: v for k, v in (params or {}).items() if v is not None}, doseq=True)
+        response = self._send("GET", path + ("?" + query if query else ""), None, timeout)
+        self._check(response)
+        return response.read().decode()
+
+    def post(self, path: str, body: dict, timeout: Optional[float] = None) -> dict:
+        response = self._send("POST", path, body, timeout)
+        self._check(response)
+        return json.loads(response.read())
+
+    def stream(self, path: str, body: dict, timeout: Optional[float] = None) -> Iterator[dict]:
+        """POST body and yield each line of the NDJSON response as it arrives."""
+        response = self._send("POST", path, body, timeout)
+        self._check(response)
+        try:
+            while True:
+                line = response.readline()
+                if not line:
+                    break
+                if line.strip():
+                    yield json.loads(line)
+        finally:
+            if not response.isclosed():
+                self.close()  # stopped early: the rest of the response would be read as the next one
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -1,11 +1,16 @@
-"""Jupiter CLI — jupiter command."""
+"""Jupiter CLI — jupiter command.
+
+Talks to the running API over its Unix socket (see jupiter.cli.client). The agent itself (planner,
+stores, httpx, asyncio) is only imported when there is no API to talk to, so startup stays fast."""
+import json
 import sys
+import time
 import click
-import httpx
 from jupiter import __version__
-from jupiter.config import API_HOST, API_PORT, OLLAMA_CHAT_TIMEOUT, ensure_dirs
+from jupiter.cli.client import ApiClient, ApiError
+from jupiter.config import DEFAULT_CONVERSATION, OLLAMA_CHAT_TIMEOUT, ensure_dirs
 
-JUPITER_API_URL = f"http://{API_HOST}:{API_PORT}"
+API_HINT = "Is the API running? Try: systemctl --user start jupiter-agent.socket (or python -m jupiter.api.main)"
 
 
 @click.group(invoke_without_command=True)
@@ -19,73 +24,220 @@ def cli(ctx):
         ctx.invoke(chat)
 
 
+_api_url = click.option("--api-url", envvar="JUPITER_API_URL", help="API over TCP (default: the Unix socket, then 127.0.0.1).")
+
 @cli.command()
-@click.option("--api-url", default=JUPITER_API_URL, envvar="JUPITER_API_URL")
-def chat(api_url: str):
+@_api_url
+@click.option("--conversation", default=DEFAULT_CONVERSATION, envvar="JUPITER_CONVERSATION", help="Conversation to continue (each has its own history).")
+def chat(api_url, conversation: str):
     """Start Jupiter and ask in plain language (default when you run 'jupiter')."""
+    client = ApiClient(api_url)
+    if client.available():
+        _chat_via_api(client, conversation)
+    else:
+        click.echo(click.style("(The Jupiter API is not running; answering in this terminal.)", dim=True), err=True)
+        _chat_local(conversation)
+
+_BANNER = "Jupiter — ask anything (e.g. 'what's my system status?', 'list files here', 'show audit log'). Type your question and Enter. Ctrl+D or 'exit' to quit."
+
+def _read_message():
+    """The next message, or None when the user is done."""
     try:
-        r = httpx.get(f"{api_url.rstrip('/')}/health", timeout=2.0)
-        if r.status_code == 200:
-            _chat_via_api(api_url)
-            return
-    except Exception:
-        pass
-    _chat_local()
+        line = click.prompt("You", default="", show_default=False)
+    except (EOFError, click.Abort):
+        return None
+    if not line or line.strip().lower() in ("exit", "quit", "q"):
+        return None
+    return line.strip()
 
-def _chat_via_api(api_url: str):
-    url = f"{api_url.rstrip('/')}/chat"
-    click.echo("Jupiter — ask anything (e.g. 'what's my system status?', 'list files here', 'show audit log'). Type your question and Enter. Ctrl+D or 'exit' to quit.")
-    while True:
-        try:
-            line = click.prompt("You", default="", show_default=False)
-        except (EOFError, click.Abort):
-            break
-        if not line or line.strip().lower() in ("exit", "quit", "q"):
-            break
+class _StreamPrinter:
+    """Print reply tokens as they arrive; print the final reply only if it wasn't streamed (e.g. tool output)."""
+    def __init__(self):
+        self.streamed = ""
+
+    def on(self, event: dict):
+        if event["type"] == "token":
+            if not self.streamed:
+                click.echo("Jupiter: ", nl=False)
+            self.streamed += event["content"]
+            click.echo(event["content"], nl=False)
+        elif event["type"] == "error":
+            if self.streamed:
+                click.echo()
+            click.echo(f"Error: {event.get('detail')}", err=True)
+        elif event["type"] == "tool":
+            click.echo(click.style(f"[running {', '.join(str(t) for t in event['tools'])}]", dim=True), err=True)
+        elif event["type"] == "output":
+            click.echo(click.style(event["content"], dim=True), nl=False, err=True)
+        elif event["reply"] != self.streamed:
+            if self.streamed:
+                click.echo()
+            click.echo("Jupiter: " + event["reply"])
+        else:
+            click.echo()
+
+def _api_events(client: ApiClient, message: str, conversation: str, retries: int = 3):
+    for attempt in range(retries + 1):
         try:
-            r = httpx.post(url, json={"message": line.strip()}, timeout=OLLAMA_CHAT_TIMEOUT)
-            r.raise_for_status()
-            click.echo("Jupiter: " + r.json().get("reply", ""))
-        except Exception as e:
-            click.echo(f"Error: {e}", err=True)
-
-def _chat_local():
-    from jupiter.agent.daemon import run_daemon_loop, execute_plan
+            yield from client.stream("/chat/stream", {"message": message, "conversation_id": conversation}, timeout=OLLAMA_CHAT_TIMEOUT)
+            return
+        except ApiError as e:
+            if e.status != 429 or attempt == retries:
+                raise
+            wait = e.retry_after or 5
+            click.echo(f"(Jupiter is busy; retrying in {wait}s)", err=True)
+            time.sleep(wait)
+
+def _chat_via_api(client: ApiClient, conversation: str):
+    click.echo(_BANNER)
+    try:
+        while True:
+            message = _read_message()
+            if message is None:
+                break
+            try:
+                printer = _StreamPrinter()
+                for event in _api_events(client, message, conversation):
+                    printer.on(event)
+            except Exception as e:
+                click.echo(f"Error: {e}", err=True)
+    finally:
+        client.close()
+
+def _preload_agent():
+    import jupiter.agent.daemon  # noqa: F401
+
+def _chat_local(conversation: str):
+    import threading
+    # Import the agent while the first prompt is up instead of before it
+    threading.Thread(target=_preload_agent, daemon=True).start()
+    click.echo(_BANNER)
+    first = _read_message()
+    if first is None:
+        return
+    import asyncio
+    asyncio.run(_chat_local_loop(conversation, first))
+
+async def _chat_local_loop(conversation: str, message: str):
+    from jupiter.agent.daemon import chat_turn_stream
     from jupiter.agent.planner import JupiterPlanner
     from jupiter.safety.broker import SafetyBroker
     from jupiter.storage.memory import MemoryStore
     from jupiter.storage.audit import AuditStore
-    click.echo("Jupiter — ask anything (e.g. 'what's my system status?', 'list files here', 'show audit log'). Type your question and Enter. Ctrl+D or 'exit' to quit.")
     memory = MemoryStore()
     audit = AuditStore()
     broker = SafetyBroker(audit=audit)
     planner = JupiterPlanner(memory=memory)
-    while True:
-        try:
-            line = click.prompt("You", default="", show_default=False)
-        except (EOFError, click.Abort):
-            break
-        if not line or line.strip().lower() in ("exit", "quit", "q"):
-            break
-        user_message = line.strip()
-        memory.session_append("user", user_message)
-        plan = planner.plan(user_message)
-        output = execute_plan(plan, broker, memory)
-        memory.session_append("assistant", output)
-        click.echo("Jupiter: " + output)
+    try:
+        while message is not None:
+            try:
+                printer = _StreamPrinter()
+                async for event in chat_turn_stream(message, planner, broker, memory, conversation):
+                    printer.on(event)
+            except Exception as e:
+                click.echo(f"Error: {e}", err=True)
+            message = _read_message()
+    finally:
+        await planner.aclose()
+        audit.close()
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+def _seconds(value: str) -> float:
+    """'90', '30m', '2h', '7d' -> seconds."""
+    value = value.strip().lower()
+    if value and value[-1] in _UNITS:
+        return float(value[:-1]) * _UNITS[value[-1]]
+    return float(value)
 
 @cli.command()
-@click.option("--api-url", default=JUPITER_API_URL)
+@_api_url
 @click.option("--limit", default=20)
-def audit(api_url: str, limit: int):
+@click.option("--action", help="Only this action (e.g. terminal_exec).")
+@click.option("--scope", help="Only this scope (e.g. terminal.exec).")
+@click.option("--outcome", help="Only this outcome (e.g. denied_no_confirm).")
+@click.option("--since", help="Only entries newer than this age, e.g. 30m, 2h, 7d.")
+@click.option("--cursor", type=int, help="Continue from a previous page's cursor.")
+@click.option("--details/--no-details", default=False, help="Include each entry's details.")
+@click.option("--summary", is_flag=True, help="Show counts per outcome and scope instead of entries (window: --since, default 24h).")
+def audit(api_url, limit: int, action, scope, outcome, since, cursor, details: bool, summary: bool):
     """Show recent audit log entries."""
+    client = ApiClient(api_url)
+    try:
+        if summary:
+            data = client.get("/audit/summary", {"window_seconds": _seconds(since or "24h")})
+            click.echo(f"  {data.get('total')} entries in the last {since or '24h'}")
+            for kind in ("outcome", "scope"):
+                for key, n in sorted(data.get(f"by_{kind}", {}).items(), key=lambda kv: -kv[1]):
+                    click.echo(f"  {kind:<8} {key}: {n}")
+            return
+        params = {"limit": limit, "action": action, "scope": scope, "outcome": outcome, "cursor": cursor, "details": details}
+        if since:
+            params["since"] = time.time() - _seconds(since)
+        data = client.get("/audit", {k: str(v).lower() if isinstance(v, bool) else v for k, v in params.items()})
+        for e in data.get("entries", []):
+            line = f"  {e.get('created_at')} | {e.get('action')} | {e.get('scope')} | {e.get('outcome')}"
+            click.echo(line + (f" | {json.dumps(e['details'])}" if details else ""))
+        if data.get("next_cursor") is not None:
+            click.echo(f"  (more: --cursor {data['next_cursor']})")
+    except Exception as e:
+        click.echo(f"Error: {e}. {API_HINT}", err=True)
+
+@cli.command()
+@_api_url
+def conversations(api_url):
+    """List conversations, most recently active first."""
+    try:
+        for c in ApiClient(api_url).get("/conversations").get("conversations", []):
+            click.echo(f"  {c.get('id')} | {c.get('message_count')} messages | last active {c.get('updated_at')}")
+    except Exception as e:
+        click.echo(f"Error: {e}. {API_HINT}", err=True)
+
+def _ms(seconds) -> str:
+    return "-" if seconds is None else f"{seconds * 1000:.1f}ms" if seconds < 10 else f"{seconds:.1f}s"
+
+@cli.command()
+@_api_url
+@click.option("--raw", is_flag=True, help="Print the Prometheus text from /metrics.")
+def stats(api_url, raw: bool):
+    """Show per-stage latency, tool times and model throughput of the running API."""
+    client = ApiClient(api_url)
     try:
-        r = httpx.get(f"{api_url.rstrip('/')}/audit", params={"limit": limit}, timeout=5.0)
-        r.raise_for_status()
-        for e in r.json().get("entries", []):
-            click.echo(f"  {e.get('created_at')} | {e.get('action')} | {e.get('scope')} | {e.get('outcome')}")
+        if raw:
+            click.echo(client.text("/metrics"), nl=False)
+            return
+        data = client.get("/metrics/summary")
     except Exception as e:
-        click.echo(f"Error: {e}. Is the API running? Try: python -m jupiter.api.main", err=True)
+        click.echo(f"Error: {e}. {API_HINT}", err=True)
+        return
+    click.echo(f"Since {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(data['started']))}")
+    sections = (("Stages", "jupiter_stage_seconds", "stage", _ms), ("Tools", "jupiter_tool_seconds", "tool", _ms),
+                ("Tokens/s", "jupiter_llm_tokens_per_second", "phase", lambda v: "-" if v is None else f"{v:.1f}"))
+    for title, name, label, fmt in sections:
+        rows = [h for h in data["histograms"] if h["name"] == name]
+        if rows:
+            click.echo(f"{title}:{'count':>22} {'avg':>10} {'p50':>10} {'p95':>10}")
+            for h in rows:
+                click.echo(f"  {h['labels'].get(label, ''):<24}{h['count']:>6} {fmt(h['avg']):>10} {fmt(h['p50']):>10} {fmt(h['p95']):>10}")
+    for c in data["counters"]:
+        labels = ",".join(f"{k}={v}" for k, v in c["labels"].items())
+        click.echo(f"  {c['name']}{{{labels}}} {c['value']:g}")
+
+@cli.command("memory-index")
+@click.option("--batch-size", default=64, help="Texts per embedding request.")
+def memory_index(batch_size: int):
+    """Embed remembered facts and past messages into the semantic memory index."""
+    from jupiter.storage.memory import MemoryStore
+    memory = MemoryStore()
+    if memory.semantic is None:
+        click.echo("Semantic memory is off. Set JUPITER_EMBED_MODEL (e.g. nomic-embed-text) and install numpy (pip install jupiter-os[semantic]).", err=True)
+        sys.exit(1)
+    try:
+        added = memory.semantic_backfill(batch_size=batch_size)
+    except Exception as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    click.echo(f"Indexed {added} new entries ({len(memory.semantic)} total).")
 
 @cli.command()
 def status():
@@ -96,14 +248,12 @@ def status():
     click.echo(f"  Data:   {JUPITER_DATA}")
     click.echo(f"  Config: {JUPITER_CONFIG}")
     click.echo(f"  DB:     {DB_PATH}")
+    api = ApiClient()
+    click.echo(f"  API:    {api.target if api.available() else '(not running)'}")
     click.echo(f"  Ollama: {OLLAMA_BASE_URL}")
     try:
-        r = httpx.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=3.0)
-        if r.status_code == 200:
-            tags = r.json().get("models", [])
-            click.echo(f"  Models: {[m.get('name') for m in tags]}")
-        else:
-            click.echo("  Models: (Ollama not reachable)")
+        tags = ApiClient(OLLAMA_BASE_URL, timeout=3.0).get("/api/tags").get("models", [])
+        click.echo(f"  Models: {[m.get('name') for m in tags]}")
     except Exception:
         click.echo("  Models: (Ollama not reachable)")
 
@@ -11,10 +11,77 @@ JUPITER_CONFIG = XDG_CONFIG / "jupiter"
 JUPITER_STATE = XDG_STATE / "jupiter"
 DB_PATH = JUPITER_DATA / "jupiter.db"
 AUDIT_DB_PATH = JUPITER_DATA / "audit.db"
+# "batched": audit entries are queued and written in batches by a background thread (default);
+# "strict": each entry is committed and fsynced before the tool call returns
+AUDIT_DURABILITY = os.environ.get("JUPITER_AUDIT_DURABILITY", "batched")
+AUDIT_QUEUE_SIZE = int(os.environ.get("JUPITER_AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_SIZE = 500
+# Semantic memory: Ollama embedding model (e.g. nomic-embed-text); empty disables it. Needs numpy.
+EMBED_MODEL = os.environ.get("JUPITER_EMBED_MODEL", "")
+RECALL_BUDGET_CHARS = int(os.environ.get("JUPITER_RECALL_BUDGET_CHARS", "1500"))  # recalled facts/messages per prompt
+DEFAULT_CONVERSATION = "default"
+# Prompt size: the model's context window (sent to Ollama as num_ctx), tokens kept free for the reply, and
+# the longest any one replayed message may be (longer ones, e.g. tool output, are elided in the middle)
+CONTEXT_TOKENS = int(os.environ.get("JUPITER_CONTEXT_TOKENS", "4096"))
+RESPONSE_TOKENS = int(os.environ.get("JUPITER_RESPONSE_TOKENS", "512"))
+REPLAY_MAX_CHARS = int(os.environ.get("JUPITER_REPLAY_MAX_CHARS", "1200"))
+SUMMARY_MIN_MESSAGES = 6  # messages that must fall out of the replayed history before the rolling summary is updated
+SESSION_RETENTION_DAYS = float(os.environ.get("JUPITER_SESSION_RETENTION_DAYS", "30"))  # idle conversations are archived after this
+PRUNE_INTERVAL = float(os.environ.get("JUPITER_PRUNE_INTERVAL", "3600"))  # seconds between archiving passes while running
 OLLAMA_BASE_URL = os.environ.get("OLLAMA_HOST", "http://127.0.0.1:11434")
 OLLAMA_CHAT_TIMEOUT = float(os.environ.get("JUPITER_OLLAMA_CHAT_TIMEOUT", "600"))  # seconds; 10 min default for slow CPU-only
+OLLAMA_CONNECT_TIMEOUT = float(os.environ.get("JUPITER_OLLAMA_CONNECT_TIMEOUT", "3"))  # also the health check's timeout
+# How long Ollama keeps the model loaded after a request: a duration ("30m") or seconds (-1 = forever)
+_keep_alive = os.environ.get("JUPITER_OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_KEEP_ALIVE = int(_keep_alive) if _keep_alive.lstrip("-").isdigit() else _keep_alive
+OLLAMA_MAX_CONNECTIONS = int(os.environ.get("JUPITER_OLLAMA_MAX_CONNECTIONS", "8"))
+OLLAMA_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("JUPITER_OLLAMA_MAX_KEEPALIVE_CONNECTIONS", "4"))
+OLLAMA_KEEPALIVE_EXPIRY = float(os.environ.get("JUPITER_OLLAMA_KEEPALIVE_EXPIRY", "300"))  # seconds an idle connection is kept
+# Ollama instances to spread requests over (default: OLLAMA_HOST alone), separated by spaces: "url" or
+# "url=model,model" for one that only gets those models (without a list, whatever it has pulled), e.g.
+# "http://127.0.0.1:11434=llama3.2:7b-q4_0 http://127.0.0.1:11435=llama3.2:3b"
+OLLAMA_BACKENDS = [(url, tuple(m for m in models.split(",") if m)) for url, _, models in
+                   (b.partition("=") for b in os.environ.get("JUPITER_OLLAMA_BACKENDS", OLLAMA_BASE_URL).split())]
+# A backend fails BACKEND_FAILURES times in a row: no requests for BACKEND_COOLDOWN seconds. All are checked every interval.
+BACKEND_FAILURES = 3
+BACKEND_COOLDOWN = 30.0
+BACKEND_HEALTH_INTERVAL = float(os.environ.get("JUPITER_BACKEND_HEALTH_INTERVAL", "10"))
+# A smaller model for the first plan of short requests (at most SMALL_MODEL_CHARS), which are mostly a tool
+# call or a quick answer; tool results still go to the main model. Empty: always the main model.
+SMALL_MODEL = os.environ.get("JUPITER_SMALL_MODEL", "")
+SMALL_MODEL_CHARS = int(os.environ.get("JUPITER_SMALL_MODEL_CHARS", "80"))
+# Scheduler: Ollama requests in flight at once (match OLLAMA_NUM_PARALLEL, per backend) and chat turns
+# queued or running before the API answers 429
+LLM_CONCURRENCY = int(os.environ.get("JUPITER_LLM_CONCURRENCY", int(os.environ.get("OLLAMA_NUM_PARALLEL", "1")) * len(OLLAMA_BACKENDS)))
+QUEUE_DEPTH = int(os.environ.get("JUPITER_QUEUE_DEPTH", "16"))
+FAST_PATH = os.environ.get("JUPITER_FAST_PATH", "1") != "0"  # answer exact tool requests ("disk usage") without the LLM
+# Tool plans from the model, reused for the same request and memory context (entries; 0 disables) for up to a TTL (seconds)
+PLAN_CACHE_SIZE = int(os.environ.get("JUPITER_PLAN_CACHE_SIZE", "256"))
+PLAN_CACHE_TTL = float(os.environ.get("JUPITER_PLAN_CACHE_TTL", "86400"))
+# Constrain plans to the plan schema with Ollama structured outputs (Ollama 0.5+); 0 relies on the prompt alone
+PLAN_SCHEMA = os.environ.get("JUPITER_PLAN_SCHEMA", "1") != "0"
+TOOL_WORKERS = int(os.environ.get("JUPITER_TOOL_WORKERS", "4"))  # threads for blocking tool calls
+# terminal_exec output: kept head and tail (bytes; the middle is counted but not stored) and how much is streamed live
+EXEC_HEAD_BYTES = int(os.environ.get("JUPITER_EXEC_HEAD_BYTES", "4096"))
+EXEC_TAIL_BYTES = int(os.environ.get("JUPITER_EXEC_TAIL_BYTES", "4096"))
+EXEC_STREAM_BYTES = int(os.environ.get("JUPITER_EXEC_STREAM_BYTES", "65536"))
+# Host metrics: sampling interval (seconds) and samples kept per series (720 x 5s = the last hour)
+METRICS_INTERVAL = float(os.environ.get("JUPITER_METRICS_INTERVAL", "5"))
+METRICS_SAMPLES = int(os.environ.get("JUPITER_METRICS_SAMPLES", "720"))
+# A JSON-lines file in `journalctl -o json` format to read instead of the systemd journal (for testing)
+JOURNAL_FIXTURE = os.environ.get("JUPITER_JOURNAL_FIXTURE", "")
+# Agent loop: tool results go back to the model at most AGENT_MAX_STEPS times per turn, within AGENT_TIME_LIMIT seconds
+AGENT_MAX_STEPS = int(os.environ.get("JUPITER_AGENT_MAX_STEPS", "4"))
+AGENT_TIME_LIMIT = float(os.environ.get("JUPITER_AGENT_TIME_LIMIT", "120"))
+AGENT_MAX_CALLS = 8  # tool calls per step
+# Seconds a read-only tool's result is reused for the same arguments; tools not listed are never cached
+TOOL_CACHE_TTL = {"system_status": METRICS_INTERVAL, "system_diagnostics": METRICS_INTERVAL, "system_logs_tail": 2.0, "terminal_explain": 300.0}
+TOOL_CACHE_SIZE = int(os.environ.get("JUPITER_TOOL_CACHE_SIZE", "256"))  # 0 disables the cache
 API_HOST = "127.0.0.1"
-API_PORT = int(os.environ.get("JUPITER_API_PORT", "8765"))
+API_PORT = int(os.environ.get("JUPITER_API_PORT", "8765"))  # 0: no TCP listener, only the Unix socket
+# The API's Unix socket (the CLI's default transport); under systemd, jupiter-agent.socket creates it
+_runtime = os.environ.get("XDG_RUNTIME_DIR")
+SOCKET_PATH = Path(os.environ.get("JUPITER_SOCKET") or (Path(_runtime) / "jupiter" / "api.sock" if _runtime else JUPITER_STATE / "api.sock"))
 
 MODEL_POLICY = {
     0: "llama3.2:3b",
@@ -25,6 +92,17 @@ MODEL_POLICY = {
     16: "llama3.2:13b-q4_0",
 }
 DEFAULT_MODEL = "llama3.2:3b"
+# Written at install by provisioning/: the host (with calibration results) and the chosen model
+HARDWARE_FILE = JUPITER_DATA / "hardware.json"
+MODEL_FILE = JUPITER_DATA / "model.json"
+# The slowest a typical turn (TYPICAL_PROMPT_TOKENS of prompt, TYPICAL_REPLY_TOKENS of plan) may be, in seconds:
+# provisioning picks the largest model within it, and the agent moves to a smaller one when the measured
+# rates put a typical turn over DRIFT_MARGIN x the target (0: never)
+TARGET_LATENCY = float(os.environ.get("JUPITER_TARGET_LATENCY", "10"))
+TYPICAL_PROMPT_TOKENS = 1200
+TYPICAL_REPLY_TOKENS = 80
+DRIFT_MARGIN = 1.25
+DRIFT_SAMPLES = 8  # responses seen before the agent judges a model's speed
 
 
 def ensure_dirs():
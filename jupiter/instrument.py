@@ -0,0 +1,159 @@
+"""Jupiter instrumentation — in-process latency histograms and counters, rendered as Prometheus text.
+
+Recording is a perf_counter pair, a bisect and a locked add per observation; nothing is formatted
+or exported until someone asks (GET /metrics, `jupiter stats`)."""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+RATE_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 50, 75, 100, 150, 200, 400)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate from the buckets (linear within the bucket, as Prometheus' histogram_quantile does),
+        clamped to the observed min and max."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = max(self.buckets[i - 1] if i > 0 else 0.0, self.min)
+                upper = min(self.buckets[i] if i < len(self.buckets) else self.max, self.max)
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.max
+
+
+_HELP = {
+    "jupiter_stage_seconds": ("histogram", "Time spent per pipeline stage."),
+    "jupiter_tool_seconds": ("histogram", "Tool execution time per tool."),
+    "jupiter_llm_tokens_per_second": ("histogram", "Ollama throughput per request (phase: prompt or generate)."),
+    "jupiter_llm_tokens_total": ("counter", "Tokens processed by Ollama (phase: prompt or generate)."),
+    "jupiter_requests_total": ("counter", "Chat turns by how they were planned (planner: llm or fast_path)."),
+    "jupiter_tool_cache_total": ("counter", "Tool result cache lookups (result: hit or miss)."),
+    "jupiter_queue_seconds": ("histogram", "Time a model call waited for a scheduler slot (priority: interactive or background)."),
+    "jupiter_rejected_total": ("counter", "Chat turns refused with 429 because the queue was full."),
+    "jupiter_plans_total": ("counter", "Model responses by how they parsed (outcome: ok, plain, malformed or truncated)."),
+    "jupiter_plan_cache_total": ("counter", "Plan cache lookups (result: hit, shared with an identical request in flight, or miss)."),
+    "jupiter_plan_stopped_total": ("counter", "Streams cut off because the model kept generating after its plan."),
+    "jupiter_model_downgrades_total": ("counter", "Moves to a smaller model because a typical turn got slower than the target."),
+    "jupiter_start_time_seconds": ("gauge", "Unix time the process started recording."),
+}
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, tuple], Histogram] = {}
+        self._counters: Dict[Tuple[str, tuple], float] = {}
+        self.started = time.time()
+
+    def observe(self, name: str, value: float, buckets: tuple = SECONDS_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            h = self._histograms.get(key)
+            if h is None:
+                h = self._histograms[key] = Histogram(buckets)
+            h.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def reset(self):
+        """Drop everything recorded so far (e.g. between benchmark runs)."""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self.started = time.time()
+
+    @contextmanager
+    def span(self, stage: str):
+        """Time the enclosed block into jupiter_stage_seconds{stage=...}."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("jupiter_stage_seconds", time.perf_counter() - start, stage=stage)
+
+    def observe_ollama(self, stats: dict):
+        """Token counts and throughput from the timing fields of an Ollama response (durations in ns)."""
+        for phase, count_key, duration_key in (("prompt", "prompt_eval_count", "prompt_eval_duration"),
+                                               ("generate", "eval_count", "eval_duration")):
+            count, duration = stats.get(count_key), stats.get(duration_key)
+            if count:
+                self.inc("jupiter_llm_tokens_total", count, phase=phase)
+            if duration:
+                self.observe("jupiter_stage_seconds", duration / 1e9, stage=f"llm_{phase}")
+                if count:
+                    self.observe("jupiter_llm_tokens_per_second", count / (duration / 1e9), RATE_BUCKETS, phase=phase)
+        if stats.get("load_duration"):
+            self.observe("jupiter_stage_seconds", stats["load_duration"] / 1e9, stage="llm_load")
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        with self._lock:
+            histograms = {k: (list(h.counts), h.count, h.sum, h.buckets) for k, h in self._histograms.items()}
+            counters = dict(self._counters)
+        lines, described = [], set()
+
+        def header(name):
+            if name not in described:
+                described.add(name)
+                kind, text = _HELP.get(name, ("untyped", name))
+                lines.extend((f"# HELP {name} {text}", f"# TYPE {name} {kind}"))
+
+        for (name, labels), (counts, count, total, buckets) in sorted(histograms.items()):
+            header(name)
+            cumulative = 0
+            for bound, n in zip(buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {total:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+        for (name, labels), value in sorted(counters.items()):
+            header(name)
+            lines.append(f"{name}{_labels(labels)} {value:g}")
+        header("jupiter_start_time_seconds")
+        lines.append(f"jupiter_start_time_seconds {self.started:.0f}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict:
+        """{"histograms": [{name, labels, count, avg, p50, p95}], "counters": [...]} for display."""
+        with self._lock:
+            rows = [{"name": name, "labels": dict(labels), "count": h.count, "avg": h.sum / h.count if h.count else None,
+                     "p50": h.quantile(0.5), "p95": h.quantile(0.95)} for (name, labels), h in sorted(self._histograms.items())]
+            counters = [{"name": name, "labels": dict(labels), "value": v} for (name, labels), v in sorted(self._counters.items())]
+        return {"started": self.started, "histograms": rows, "counters": counters}
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: tuple) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}" if labels else ""
+
+
+metrics = Registry()
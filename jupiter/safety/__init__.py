@@ -1,2 +1,3 @@
 from .broker import SafetyBroker, ToolResult, Scope, require_confirmation
-__all__ = ["SafetyBroker", "ToolResult", "Scope", "require_confirmation"]
+from .cache import ResultCache
+__all__ = ["SafetyBroker", "ToolResult", "Scope", "require_confirmation", "ResultCache"]
@@ -1,7 +1,10 @@
 """Jupiter Tool Safety Broker — scoped permissions, confirmations, audit."""
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 from typing import Any, Callable, Optional
+from jupiter.config import TOOL_CACHE_SIZE, TOOL_CACHE_TTL
+from jupiter.instrument import metrics
+from jupiter.safety.cache import ResultCache
 from jupiter.storage.audit import AuditStore
 
 
@@ -20,6 +23,7 @@ class ToolResult:
     output: str
     error: Optional[str] = None
     audit_action: Optional[str] = None
+    meta: dict = field(default_factory=dict)  # structured extras for the caller (e.g. a journal cursor)
 
 
 def require_confirmation(action: str, scope: Scope, details: dict, confirmed: bool, audit: AuditStore) -> bool:
@@ -33,14 +37,27 @@ def require_confirmation(action: str, scope: Scope, details: dict, confirmed: bo
     return True
 
 
+_CACHEABLE = (Scope.SYSTEM_READ, Scope.TERMINAL_READ)
+
+
 class SafetyBroker:
-    def __init__(self, audit: Optional[AuditStore] = None):
+    def __init__(self, audit: Optional[AuditStore] = None, cache: Optional[ResultCache] = None):
         self.audit = audit or AuditStore()
+        self.cache = cache or ResultCache(TOOL_CACHE_TTL, TOOL_CACHE_SIZE)
 
     def execute(self, tool_name: str, scope: Scope, fn: Callable, *args, confirmed: bool = False, **kwargs) -> ToolResult:
+        """Run fn(*args, **kwargs) as tool_name if scope allows it. Read-scoped tools with a TTL in the
+        cache return a recent result for the same arguments instead, without another result entry."""
         if not require_confirmation(tool_name, scope, {"args": str(args)}, confirmed, self.audit):
             return ToolResult(success=False, output="", error="Action requires explicit user confirmation.", audit_action=f"{tool_name}_denied")
-        result = fn(*args, **kwargs)
-        if result.audit_action:
-            self.audit.log(action=result.audit_action, scope=scope.value, details={"result_success": result.success}, outcome="success" if result.success else "error")
+        ttl = self.cache.ttl(tool_name) if scope in _CACHEABLE else 0
+        if ttl:
+            key = (tool_name, repr(args), repr(sorted(kwargs.items())))
+            result, cached = self.cache.get_or_call(key, ttl, lambda: fn(*args, **kwargs))
+            metrics.inc("jupiter_tool_cache_total", result="hit" if cached else "miss")
+        else:
+            result, cached = fn(*args, **kwargs), False
+        if result.audit_action and not cached:
+            self.audit.log(action=result.audit_action, scope=scope.value, details={"result_success": result.success},
+                           outcome="success" if result.success else "error")
         return result
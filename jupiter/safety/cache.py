@@ -0,0 +1,56 @@
+"""Jupiter tool result cache — short-lived results of read-only tools, shared by concurrent callers."""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class ResultCache:
+    """LRU of at most max_entries successful results, each valid for its tool's TTL. Concurrent calls
+    with the same key while one is running wait for that call instead of running the tool again."""
+
+    def __init__(self, ttls: Dict[str, float], max_entries: int = 256):
+        self.ttls = dict(ttls)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, Future] = {}
+
+    def ttl(self, tool_name: str) -> float:
+        return self.ttls.get(tool_name, 0) if self.max_entries > 0 else 0
+
+    def get_or_call(self, key: Hashable, ttl: float, compute: Callable[[], Any]) -> Tuple[Any, bool]:
+        """(result, cached): cached is True when the result came from the cache or from a concurrent call."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return entry[1], True
+                del self._entries[key]
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            return future.result(), True
+        try:
+            result = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._inflight[key]
+            if getattr(result, "success", True):
+                self._entries[key] = (time.monotonic() + ttl, result)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        future.set_result(result)
+        return result, False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -1,34 +1,163 @@
 """Jupiter audit store — local audit log (SQLite)."""
+import atexit
 import json
+import queue
 import sqlite3
+import sys
+import threading
 import time
 from pathlib import Path
 from typing import Any, Optional
-from jupiter.config import AUDIT_DB_PATH, ensure_dirs
+from jupiter.instrument import metrics
+from jupiter.config import AUDIT_DB_PATH, AUDIT_DURABILITY, AUDIT_QUEUE_SIZE, AUDIT_BATCH_SIZE, ensure_dirs
+
+_INSERT = "INSERT INTO audit (action, scope, details, outcome, created_at) VALUES (?, ?, ?, ?, ?)"
+_STOP = object()
 
 
 class AuditStore:
-    def __init__(self, path: Optional[Path] = None):
+    """Audit log with a write-behind writer: log() enqueues and returns, and one thread drains the queue
+    into multi-row inserts, one transaction per batch. durability="strict" commits (with a full fsync)
+    before log() returns. Reads flush the queue first, so they always see earlier log() calls."""
+
+    def __init__(self, path: Optional[Path] = None, durability: str = AUDIT_DURABILITY):
+        if durability not in ("batched", "strict"):
+            raise ValueError(f"durability must be 'batched' or 'strict', not {durability!r}")
         self.path = path or AUDIT_DB_PATH
+        self.durability = durability
         ensure_dirs()
+        self._lock = threading.Lock()
+        self._gate = threading.Lock()  # held by log() while queueing (never blocking) and by close() while stopping the writer
+        self._db = self._connect()
         self._init_schema()
+        self._queue: queue.Queue = queue.Queue(maxsize=AUDIT_QUEUE_SIZE)
+        self._writer: Optional[threading.Thread] = None
+        self._closed = False
+        atexit.register(self.close)
 
-    def _conn(self):
-        return sqlite3.connect(self.path)
+    def _connect(self):
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=" + ("FULL" if self.durability == "strict" else "NORMAL"))
+        return db
 
     def _init_schema(self):
-        with self._conn() as c:
+        with self._lock, self._db as c:
             c.executescript("""
                 CREATE TABLE IF NOT EXISTS audit (
                     id INTEGER PRIMARY KEY, action TEXT NOT NULL, scope TEXT, details TEXT, outcome TEXT, created_at REAL NOT NULL);
+                CREATE INDEX IF NOT EXISTS idx_audit_action ON audit (action, id);
+                CREATE INDEX IF NOT EXISTS idx_audit_scope ON audit (scope, id);
+                CREATE INDEX IF NOT EXISTS idx_audit_outcome ON audit (outcome, id);
+                CREATE INDEX IF NOT EXISTS idx_audit_created ON audit (created_at, outcome, scope);
             """)
 
+    def _start_writer(self):
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._drain, name="jupiter-audit-writer", daemon=True)
+                self._writer.start()
+
+    def _drain(self):
+        db = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < AUDIT_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [r for r in batch if r is not _STOP]
+            if rows:
+                try:
+                    with metrics.span("audit_write"), db:
+                        db.executemany(_INSERT, rows)
+                except sqlite3.Error as e:
+                    print(f"Audit write failed ({len(rows)} entries): {e}", file=sys.stderr, flush=True)
+            for _ in batch:
+                self._queue.task_done()
+            if len(rows) < len(batch):
+                db.close()
+                return
+
     def log(self, action: str, scope: Optional[str] = None, details: Optional[dict] = None, outcome: Optional[str] = None):
-        with self._conn() as c:
-            c.execute("INSERT INTO audit (action, scope, details, outcome, created_at) VALUES (?, ?, ?, ?, ?)",
-                      (action, scope, json.dumps(details or {}), outcome, time.time()))
+        row = (action, scope, json.dumps(details or {}), outcome, time.time())
+        if self.durability != "strict":
+            with self._gate:  # so close() cannot put _STOP between the check and the put
+                if not self._closed:
+                    if self._writer is None:
+                        self._start_writer()
+                    try:
+                        self._queue.put_nowait(row)
+                        return
+                    except queue.Full:
+                        pass  # the writer is behind: write this one here, which slows callers down as a blocking put would
+        with metrics.span("audit_write"), self._lock, self._db as c:
+            c.execute(_INSERT, row)
+
+    def flush(self):
+        """Block until every queued entry has been committed."""
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.join()
+
+    def close(self):
+        """Flush pending entries and stop the writer; later log() calls write synchronously."""
+        with self._gate:
+            writer, self._closed = self._writer, True
+            if writer is not None and writer.is_alive():
+                self._queue.put(_STOP)  # after every entry log() queued
+        if writer is not None:
+            writer.join()
+        atexit.unregister(self.close)
+
+    @staticmethod
+    def _where(action=None, scope=None, outcome=None, since=None, until=None, before_id=None):
+        clauses, params = [], []
+        for column, value in (("action", action), ("scope", scope), ("outcome", outcome)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        for clause, value in (("created_at >= ?", since), ("created_at < ?", until), ("id < ?", before_id)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, action: Optional[str] = None, scope: Optional[str] = None, outcome: Optional[str] = None,
+              since: Optional[float] = None, until: Optional[float] = None, limit: int = 100,
+              cursor: Optional[int] = None, include_details: bool = True) -> dict:
+        """Newest-first entries matching every given filter (since/until are unix timestamps).
+
+        Pages are keyset-paginated: pass the returned next_cursor as cursor to get the next (older) page;
+        it is None on the last page. include_details=False skips reading and decoding the details blob."""
+        self.flush()
+        where, params = self._where(action, scope, outcome, since, until, cursor)
+        columns = "id, action, scope, outcome, created_at" + (", details" if include_details else "")
+        with self._lock:
+            rows = self._db.execute(f"SELECT {columns} FROM audit{where} ORDER BY id DESC LIMIT ?", (*params, limit + 1)).fetchall()
+        entries = []
+        for r in rows[:limit]:
+            e = {"id": r[0], "action": r[1], "scope": r[2], "outcome": r[3], "created_at": r[4]}
+            if include_details:
+                e["details"] = json.loads(r[5] or "{}")
+            entries.append(e)
+        return {"entries": entries, "next_cursor": entries[-1]["id"] if len(rows) > limit else None}
+
+    def summary(self, since: Optional[float] = None, until: Optional[float] = None) -> dict:
+        """Entry counts per outcome and per scope over [since, until)."""
+        self.flush()
+        where, params = self._where(since=since, until=until)
+        # "+column" stops SQLite from walking the whole outcome/scope index to group, so a time window
+        # is read as a range of the covering created_at index instead
+        sql = (f"SELECT 'outcome', outcome, COUNT(*) FROM audit{where} GROUP BY +outcome "
+               f"UNION ALL SELECT 'scope', scope, COUNT(*) FROM audit{where} GROUP BY +scope")
+        with self._lock:
+            rows = self._db.execute(sql, params * 2).fetchall()
+        counts = {"by_outcome": {}, "by_scope": {}}
+        for kind, key, n in rows:
+            counts["by_" + kind][key] = n
+        counts["total"] = sum(counts["by_outcome"].values())
+        return counts
 
     def get_recent(self, limit: int = 100):
-        with self._conn() as c:
-            rows = c.execute("SELECT action, scope, details, outcome, created_at FROM audit ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
-        return [{"action": r[0], "scope": r[1], "details": json.loads(r[2] or "{}"), "outcome": r[3], "created_at": r[4]} for r in rows]
+        return self.query(limit=limit)["entries"]
@@ -1,79 +1,400 @@
-"""Jupiter memory store — session, episodic, preferences (SQLite)."""
+"""Jupiter memory store — session, episodic, preferences, cached plans (SQLite)."""
 import json
+import re
 import sqlite3
+import sys
+import threading
 import time
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Any, Optional
-from jupiter.config import DB_PATH, ensure_dirs
+from jupiter.config import DB_PATH, DEFAULT_CONVERSATION, SESSION_RETENTION_DAYS, ensure_dirs
+from jupiter.storage.semantic import SemanticIndex, open_semantic_index
+
+CONTEXT_PREFERENCES = ("model", "editor", "theme", "speed_quality")
+
+# Context parts, run as one UNION ALL statement: preferences, episodic facts (most relevant to the user's
+# message by BM25, or most recent), the conversation's message count and its recent session rows
+_PREFS_SQL = f"SELECT 'p', key, value, NULL, NULL FROM preferences WHERE key IN ({', '.join('?' * len(CONTEXT_PREFERENCES))})"
+_RECENT_SQL = "SELECT * FROM (SELECT 'e', summary, metadata, created_at, id FROM episodic ORDER BY created_at DESC LIMIT ?)"
+_RECALL_SQL = """SELECT * FROM (SELECT 'e', e.summary, e.metadata, e.created_at, e.id FROM episodic_fts JOIN episodic e ON e.id = episodic_fts.rowid
+    WHERE episodic_fts MATCH ? ORDER BY bm25(episodic_fts), e.created_at DESC LIMIT ?)"""
+_SESSION_SQL = """SELECT 'c', NULL, NULL, NULL, message_count FROM conversations WHERE id = ?
+    UNION ALL SELECT 'm', summary, upto_id, updated_at, covered FROM conversation_summaries WHERE conversation_id = ?
+    UNION ALL SELECT * FROM (SELECT 's', role, content, created_at, id FROM session WHERE conversation_id = ? ORDER BY id DESC LIMIT ?)"""
+
+_WORD = re.compile(r"\w+")
+_STOPWORDS = frozenset("""a an and are as at be but by can could do does did for from has have how i if in is it its me my no not of on
+    or our please should so that the their them then there these they this to us was we what when where which who why will with would
+    you your""".split())
+
+
+def fts_match(text: str, max_terms: int = 32) -> Optional[str]:
+    """FTS5 MATCH expression OR-ing the distinct non-stopword terms of text, or None if there are none."""
+    terms = dict.fromkeys(w for w in _WORD.findall(text.lower()) if len(w) > 1 and w not in _STOPWORDS)
+    return " OR ".join(f'"{w}"' for w in list(terms)[:max_terms]) or None
+
+
+def _load_pref(raw: str) -> Any:
+    try:
+        return json.loads(raw)
+    except (json.JSONDecodeError, TypeError):
+        return raw
 
 
 class MemoryStore:
-    def __init__(self, path: Optional[Path] = None):
+    """One long-lived WAL connection shared across threads (serialized by a lock); sqlite3 caches the
+    prepared statements. Planner context is cached in-process and kept current by session_append.
+    self.semantic is the embedding index next to the DB when semantic memory is enabled, else None."""
+
+    def __init__(self, path: Optional[Path] = None, semantic: Optional[SemanticIndex] = None):
         self.path = path or DB_PATH
         ensure_dirs()
+        self.semantic = semantic if semantic is not None else open_semantic_index(Path(self.path))
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, cached_statements=64)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._context_cache: dict = {}
+        self.fts = False
         self._init_schema()
 
+    @contextmanager
     def _conn(self):
-        return sqlite3.connect(self.path)
+        with self._lock, self._db:
+            yield self._db
+
+    def close(self):
+        with self._lock:
+            self._db.close()
 
     def _init_schema(self):
         with self._conn() as c:
             c.executescript("""
                 CREATE TABLE IF NOT EXISTS session (
-                    id INTEGER PRIMARY KEY, role TEXT NOT NULL, content TEXT NOT NULL, created_at REAL NOT NULL);
+                    id INTEGER PRIMARY KEY, role TEXT NOT NULL, content TEXT NOT NULL, created_at REAL NOT NULL,
+                    conversation_id TEXT NOT NULL DEFAULT 'default');
+                CREATE TABLE IF NOT EXISTS session_archive (
+                    id INTEGER PRIMARY KEY, role TEXT NOT NULL, content TEXT NOT NULL, created_at REAL NOT NULL,
+                    conversation_id TEXT NOT NULL, archived_at REAL NOT NULL);
+                CREATE TABLE IF NOT EXISTS conversations (
+                    id TEXT PRIMARY KEY, created_at REAL NOT NULL, updated_at REAL NOT NULL, message_count INTEGER NOT NULL DEFAULT 0);
+                CREATE TABLE IF NOT EXISTS journal_cursors (
+                    conversation_id TEXT NOT NULL, filter TEXT NOT NULL, cursor TEXT NOT NULL, updated_at REAL NOT NULL,
+                    PRIMARY KEY (conversation_id, filter));
+                CREATE TABLE IF NOT EXISTS conversation_summaries (
+                    conversation_id TEXT PRIMARY KEY, summary TEXT NOT NULL, upto_id INTEGER NOT NULL, covered INTEGER NOT NULL,
+                    updated_at REAL NOT NULL);
                 CREATE TABLE IF NOT EXISTS episodic (
                     id INTEGER PRIMARY KEY, summary TEXT NOT NULL, metadata TEXT, created_at REAL NOT NULL);
                 CREATE TABLE IF NOT EXISTS preferences (
                     key TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at REAL NOT NULL);
+                CREATE TABLE IF NOT EXISTS plan_cache (
+                    key TEXT PRIMARY KEY, plan TEXT NOT NULL, created_at REAL NOT NULL, used_at REAL NOT NULL);
+            """)
+            # Databases from before conversations: every existing message belongs to the default conversation
+            if "conversation_id" not in {r[1] for r in c.execute("PRAGMA table_info(session)")}:
+                c.execute("ALTER TABLE session ADD COLUMN conversation_id TEXT NOT NULL DEFAULT 'default'")
+                c.execute("""INSERT OR IGNORE INTO conversations (id, created_at, updated_at, message_count)
+                             SELECT conversation_id, MIN(created_at), MAX(created_at), COUNT(*) FROM session GROUP BY conversation_id""")
+            c.executescript("""
+                CREATE INDEX IF NOT EXISTS idx_session_conversation ON session (conversation_id, id);
+                CREATE INDEX IF NOT EXISTS idx_conversations_updated ON conversations (updated_at);
+                CREATE INDEX IF NOT EXISTS idx_plan_cache_used ON plan_cache (used_at);
+            """)
+            self.fts = self._init_fts(c)
+
+    @staticmethod
+    def _init_fts(c) -> bool:
+        """Full-text index over episodic summaries, kept in sync by triggers. False if SQLite lacks FTS5."""
+        existed = c.execute("SELECT 1 FROM sqlite_master WHERE name = 'episodic_fts'").fetchone() is not None
+        try:
+            c.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS episodic_fts USING fts5(summary, content='episodic', content_rowid='id', tokenize='porter unicode61');
+                CREATE TRIGGER IF NOT EXISTS episodic_fts_insert AFTER INSERT ON episodic BEGIN
+                    INSERT INTO episodic_fts (rowid, summary) VALUES (new.id, new.summary); END;
+                CREATE TRIGGER IF NOT EXISTS episodic_fts_delete AFTER DELETE ON episodic BEGIN
+                    INSERT INTO episodic_fts (episodic_fts, rowid, summary) VALUES ('delete', old.id, old.summary); END;
+                CREATE TRIGGER IF NOT EXISTS episodic_fts_update AFTER UPDATE ON episodic BEGIN
+                    INSERT INTO episodic_fts (episodic_fts, rowid, summary) VALUES ('delete', old.id, old.summary);
+                    INSERT INTO episodic_fts (rowid, summary) VALUES (new.id, new.summary); END;
             """)
+        except sqlite3.OperationalError:
+            return False
+        if not existed:
+            c.execute("INSERT INTO episodic_fts (episodic_fts) VALUES ('rebuild')")
+        return True
+
+    def session_append(self, role: str, content: str, conversation_id: str = DEFAULT_CONVERSATION):
+        now = time.time()
+        with self._lock:
+            with self._conn() as c:
+                row_id = c.execute("INSERT INTO session (role, content, created_at, conversation_id) VALUES (?, ?, ?, ?)",
+                                   (role, content, now, conversation_id)).lastrowid
+                c.execute("""INSERT INTO conversations (id, created_at, updated_at, message_count) VALUES (?, ?, ?, 1)
+                             ON CONFLICT (id) DO UPDATE SET updated_at = excluded.updated_at, message_count = message_count + 1""",
+                          (conversation_id, now, now))
+            for (conv, session_limit, _), ctx in self._context_cache.items():
+                if conv == conversation_id:
+                    ctx["session"] = (ctx["session"] + [{"id": row_id, "role": role, "content": content, "created_at": now}])[-session_limit:]
+                    ctx["session_total"] += 1
+
+    def session_get_recent(self, limit: int = 50, conversation_id: str = DEFAULT_CONVERSATION):
+        with self._conn() as c:
+            rows = c.execute("SELECT id, role, content, created_at FROM session WHERE conversation_id = ? ORDER BY id DESC LIMIT ?",
+                             (conversation_id, limit)).fetchall()
+        return [{"id": r[0], "role": r[1], "content": r[2], "created_at": r[3]} for r in reversed(rows)]
+
+    def session_clear(self, conversation_id: Optional[str] = None):
+        """Delete one conversation's messages, or every conversation's when conversation_id is None."""
+        with self._conn() as c:
+            if conversation_id is None:
+                c.execute("DELETE FROM session")
+                c.execute("DELETE FROM conversations")
+                c.execute("DELETE FROM conversation_summaries")
+                c.execute("DELETE FROM journal_cursors")
+            else:
+                c.execute("DELETE FROM session WHERE conversation_id = ?", (conversation_id,))
+                c.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
+                c.execute("DELETE FROM conversation_summaries WHERE conversation_id = ?", (conversation_id,))
+                c.execute("DELETE FROM journal_cursors WHERE conversation_id = ?", (conversation_id,))
+            self._context_cache.clear()
+
+    def session_range(self, conversation_id: str, after_id: int, before_id: int, limit: int = 200):
+        """Messages of a conversation with after_id < id < before_id, oldest first."""
+        with self._conn() as c:
+            rows = c.execute("""SELECT id, role, content, created_at FROM session WHERE conversation_id = ? AND id > ? AND id < ?
+                                ORDER BY id LIMIT ?""", (conversation_id, after_id, before_id, limit)).fetchall()
+        return [{"id": r[0], "role": r[1], "content": r[2], "created_at": r[3]} for r in rows]
+
+    def summary_get(self, conversation_id: str) -> Optional[dict]:
+        """The conversation's rolling summary: text, upto_id (last message id it covers), covered (message count)."""
+        with self._conn() as c:
+            row = c.execute("SELECT summary, upto_id, covered, updated_at FROM conversation_summaries WHERE conversation_id = ?",
+                            (conversation_id,)).fetchone()
+        return {"text": row[0], "upto_id": row[1], "covered": row[2], "updated_at": row[3]} if row else None
 
-    def session_append(self, role: str, content: str):
+    def summary_set(self, conversation_id: str, text: str, upto_id: int, covered: int):
         with self._conn() as c:
-            c.execute("INSERT INTO session (role, content, created_at) VALUES (?, ?, ?)", (role, content, time.time()))
+            c.execute("INSERT OR REPLACE INTO conversation_summaries (conversation_id, summary, upto_id, covered, updated_at) VALUES (?, ?, ?, ?, ?)",
+                      (conversation_id, text, upto_id, covered, time.time()))
+            for key in [k for k in self._context_cache if k[0] == conversation_id]:
+                del self._context_cache[key]
 
-    def session_get_recent(self, limit: int = 50):
+    def journal_cursor_get(self, conversation_id: str, filter_key: str) -> Optional[str]:
+        """Where this conversation's last journal read with these filters stopped."""
         with self._conn() as c:
-            rows = c.execute("SELECT role, content, created_at FROM session ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
-        return [{"role": r[0], "content": r[1], "created_at": r[2]} for r in reversed(rows)]
+            row = c.execute("SELECT cursor FROM journal_cursors WHERE conversation_id = ? AND filter = ?", (conversation_id, filter_key)).fetchone()
+        return row[0] if row else None
 
-    def session_clear(self):
+    def journal_cursor_set(self, conversation_id: str, filter_key: str, cursor: str):
         with self._conn() as c:
-            c.execute("DELETE FROM session")
+            c.execute("INSERT OR REPLACE INTO journal_cursors (conversation_id, filter, cursor, updated_at) VALUES (?, ?, ?, ?)",
+                      (conversation_id, filter_key, cursor, time.time()))
+
+    def conversation_list(self, limit: int = 50):
+        with self._conn() as c:
+            rows = c.execute("SELECT id, created_at, updated_at, message_count FROM conversations ORDER BY updated_at DESC LIMIT ?", (limit,)).fetchall()
+        return [{"id": r[0], "created_at": r[1], "updated_at": r[2], "message_count": r[3]} for r in rows]
+
+    def conversation_prune(self, max_age_days: float = SESSION_RETENTION_DAYS, archive: bool = True) -> int:
+        """Move (or, with archive=False, delete) conversations idle for longer than max_age_days out of the
+        hot session table. Returns the number of conversations removed."""
+        cutoff = time.time() - max_age_days * 86400
+        with self._conn() as c:
+            stale = [r[0] for r in c.execute("SELECT id FROM conversations WHERE updated_at < ?", (cutoff,))]
+            for conv in stale:
+                if archive:
+                    c.execute("""INSERT INTO session_archive (id, role, content, created_at, conversation_id, archived_at)
+                                 SELECT id, role, content, created_at, conversation_id, ? FROM session WHERE conversation_id = ?""",
+                              (time.time(), conv))
+                c.execute("DELETE FROM session WHERE conversation_id = ?", (conv,))
+                c.execute("DELETE FROM conversations WHERE id = ?", (conv,))
+                c.execute("DELETE FROM conversation_summaries WHERE conversation_id = ?", (conv,))
+                c.execute("DELETE FROM journal_cursors WHERE conversation_id = ?", (conv,))
+            if stale:
+                self._context_cache.clear()
+        return len(stale)
 
     def episodic_add(self, summary: str, metadata: Optional[dict] = None):
         with self._conn() as c:
-            c.execute("INSERT INTO episodic (summary, metadata, created_at) VALUES (?, ?, ?)", (summary, json.dumps(metadata or {}), time.time()))
+            row_id = c.execute("INSERT INTO episodic (summary, metadata, created_at) VALUES (?, ?, ?)",
+                               (summary, json.dumps(metadata or {}), time.time())).lastrowid
+            c.execute("DELETE FROM plan_cache")
+            self._context_cache.clear()
+        if self.semantic is not None:
+            self._semantic_add([(f"e:{row_id}", summary)])
 
     def episodic_get_recent(self, limit: int = 20):
         with self._conn() as c:
             rows = c.execute("SELECT summary, metadata, created_at FROM episodic ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
         return [{"summary": r[0], "metadata": json.loads(r[1] or "{}"), "created_at": r[2]} for r in rows]
 
+    def episodic_search(self, query: str, limit: int = 5):
+        """Episodic facts ranked by BM25 relevance to query (newest first among equals)."""
+        match = fts_match(query) if self.fts else None
+        if match is None:
+            return []
+        with self._conn() as c:
+            rows = c.execute(_RECALL_SQL, (match, limit)).fetchall()
+        return [{"summary": r[1], "metadata": json.loads(r[2] or "{}"), "created_at": r[3]} for r in rows]
+
+    def _semantic_add(self, items: list) -> int:
+        # Best effort: if Ollama can't embed right now, semantic_backfill() picks the rows up later
+        try:
+            return self.semantic.add(items)
+        except Exception as e:
+            print(f"Semantic index update failed: {e}", file=sys.stderr, flush=True)
+            return 0
+
+    def semantic_backfill(self, batch_size: int = 64, max_chars: int = 2000) -> int:
+        """Embed every episodic fact and session message (live and archived) missing from the semantic
+        index, batch_size texts per Ollama call. Returns the number of rows added."""
+        if self.semantic is None:
+            return 0
+        added = 0
+        for prefix, sql in (("e", "SELECT id, summary FROM episodic WHERE id > ? ORDER BY id LIMIT ?"),
+                            ("s", "SELECT id, content FROM session WHERE id > ? ORDER BY id LIMIT ?"),
+                            ("s", "SELECT id, content FROM session_archive WHERE id > ? ORDER BY id LIMIT ?")):
+            last = 0
+            while True:
+                with self._conn() as c:
+                    rows = c.execute(sql, (last, batch_size * 16)).fetchall()
+                if not rows:
+                    break
+                last = rows[-1][0]
+                items = [(f"{prefix}:{row_id}", text[:max_chars]) for row_id, text in rows if f"{prefix}:{row_id}" not in self.semantic]
+                for i in range(0, len(items), batch_size):
+                    added += self.semantic.add(items[i:i + batch_size])
+        return added
+
+    def semantic_search(self, query: str, limit: int = 5, exclude: Optional[set] = None) -> list:
+        """Episodic facts and past session messages closest in meaning to query, best first. Each hit has
+        key ("e:<id>" or "s:<id>"), kind ("episodic" or "session"), text, role, created_at and score."""
+        if self.semantic is None or not query.strip():
+            return []
+        try:
+            ranked = self.semantic.search(query, limit, exclude)
+        except Exception as e:
+            print(f"Semantic search failed: {e}", file=sys.stderr, flush=True)
+            return []
+        ids = {"e": [], "s": []}
+        for key, _ in ranked:
+            kind, _, row_id = key.partition(":")
+            ids.setdefault(kind, []).append(int(row_id))
+        found = {}
+        with self._conn() as c:
+            if ids["e"]:
+                marks = ", ".join("?" * len(ids["e"]))
+                for row_id, text, created_at in c.execute(f"SELECT id, summary, created_at FROM episodic WHERE id IN ({marks})", ids["e"]):
+                    found[f"e:{row_id}"] = {"kind": "episodic", "text": text, "role": None, "created_at": created_at}
+            if ids["s"]:
+                marks = ", ".join("?" * len(ids["s"]))
+                sql = (f"SELECT id, role, content, created_at FROM session WHERE id IN ({marks}) "
+                       f"UNION ALL SELECT id, role, content, created_at FROM session_archive WHERE id IN ({marks})")
+                for row_id, role, text, created_at in c.execute(sql, ids["s"] * 2):
+                    found[f"s:{row_id}"] = {"kind": "session", "text": text, "role": role, "created_at": created_at}
+        return [{"key": key, "score": score, **found[key]} for key, score in ranked if key in found]
+
     def preference_set(self, key: str, value: Any):
         with self._conn() as c:
             c.execute("INSERT OR REPLACE INTO preferences (key, value, updated_at) VALUES (?, ?, ?)", (key, json.dumps(value), time.time()))
+            c.execute("DELETE FROM plan_cache")
+            self._context_cache.clear()
 
     def preference_get(self, key: str, default: Any = None):
         with self._conn() as c:
             row = c.execute("SELECT value FROM preferences WHERE key = ?", (key,)).fetchone()
         if row is None:
             return default
-        try:
-            return json.loads(row[0])
-        except (json.JSONDecodeError, TypeError):
-            return row[0]
-
-    def get_context_for_agent(self, session_limit: int = 30, episodic_limit: int = 10):
-        parts = []
-        prefs = {}
-        for key in ("model", "editor", "theme", "speed_quality"):
-            v = self.preference_get(key)
-            if v is not None:
-                prefs[key] = v
-        if prefs:
-            parts.append("User preferences: " + json.dumps(prefs))
-        for e in self.episodic_get_recent(episodic_limit):
-            parts.append("Past: " + e["summary"])
-        for m in self.session_get_recent(session_limit):
+        return _load_pref(row[0])
+
+    def plan_cache_get(self, key: str, max_age: float) -> Optional[dict]:
+        """The plan stored under key if it is younger than max_age seconds (and marks it recently used)."""
+        now = time.time()
+        with self._conn() as c:
+            row = c.execute("SELECT plan, created_at FROM plan_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now - max_age:
+                c.execute("DELETE FROM plan_cache WHERE key = ?", (key,))
+                return None
+            c.execute("UPDATE plan_cache SET used_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def plan_cache_put(self, key: str, plan: dict, max_entries: int):
+        """Store plan under key, dropping the least recently used entries beyond max_entries."""
+        now = time.time()
+        with self._conn() as c:
+            c.execute("INSERT OR REPLACE INTO plan_cache (key, plan, created_at, used_at) VALUES (?, ?, ?, ?)",
+                      (key, json.dumps(plan), now, now))
+            c.execute("DELETE FROM plan_cache WHERE key IN (SELECT key FROM plan_cache ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                      (max_entries,))
+
+    def get_agent_context(self, session_limit: int = 30, episodic_limit: int = 10, conversation_id: str = DEFAULT_CONVERSATION,
+                          query: Optional[str] = None) -> dict:
+        """Preferences, episodic facts and the conversation's recent messages (oldest first) for the planner;
+        session_total is the conversation's full message count and summary its rolling summary (see
+        summary_get) or None. With a query (the user's message) the facts
+        are the most relevant ones by BM25 instead of the most recent."""
+        key = (conversation_id, session_limit, episodic_limit)
+        if query is not None and self.fts:
+            match = fts_match(query)
+            recall_sql, recall_params = (_RECALL_SQL, (match, episodic_limit)) if match else (_RECENT_SQL, (0,))
+        else:
+            recall_sql, recall_params = _RECENT_SQL, (episodic_limit,)
+        with self._conn() as c:
+            ctx = self._context_cache.get(key)
+            fresh = ctx is None
+            if fresh:
+                ctx = {"preferences": {}, "session": [], "session_total": 0, "summary": None}
+                rows = c.execute(" UNION ALL ".join((_PREFS_SQL, recall_sql, _SESSION_SQL)),
+                                 (*CONTEXT_PREFERENCES, *recall_params, conversation_id, conversation_id, conversation_id, session_limit))
+            else:
+                rows = c.execute(recall_sql, recall_params)
+            episodic = []
+            for kind, a, b, created_at, n in rows:
+                if kind == "e":
+                    episodic.append({"summary": a, "metadata": json.loads(b or "{}"), "created_at": created_at})
+                elif kind == "p":
+                    ctx["preferences"][a] = _load_pref(b)
+                elif kind == "c":
+                    ctx["session_total"] = n
+                elif kind == "m":
+                    ctx["summary"] = {"text": a, "upto_id": b, "covered": n, "updated_at": created_at}
+                else:
+                    ctx["session"].append({"id": n, "role": a, "content": b, "created_at": created_at})
+            if fresh:
+                ctx["preferences"] = {k: ctx["preferences"][k] for k in CONTEXT_PREFERENCES if k in ctx["preferences"]}
+                ctx["session"].reverse()
+                self._context_cache[key] = ctx
+            return {"preferences": dict(ctx["preferences"]), "episodic": episodic, "session": list(ctx["session"]),
+                    "session_total": ctx["session_total"], "summary": ctx["summary"]}
+
+    def get_context_for_agent(self, session_limit: int = 30, episodic_limit: int = 10, conversation_id: str = DEFAULT_CONVERSATION):
+        ctx = self.get_agent_context(session_limit, episodic_limit, conversation_id)
+        parts = [p for p in (memory_note(ctx), recall_note(ctx)) if p]
+        for m in ctx["session"]:
             parts.append(f"{m['role']}: {m['content']}")
         return "\n".join(parts) if parts else ""
+
+
+def memory_note(ctx: dict) -> str:
+    """Preferences as one line; byte-identical across turns until they change."""
+    return ("User preferences: " + json.dumps(ctx["preferences"], sort_keys=True)) if ctx["preferences"] else ""
+
+
+def recall_note(ctx: dict, budget: Optional[int] = None, snippet: int = 300) -> str:
+    """Episodic facts ("Past:") and related earlier messages ("Earlier:", from ctx["related"]) recalled for
+    this turn, in order, stopping before the note would exceed budget characters."""
+    lines = ["Past: " + e["summary"] for e in ctx["episodic"]]
+    for m in ctx.get("related", ()):
+        text = m["text"] if len(m["text"]) <= snippet else m["text"][:snippet] + "…"
+        lines.append(f"Earlier ({m['role']}): {text}")
+    used, kept = 0, []
+    for line in lines:
+        used += len(line) + 1
+        if budget is not None and used > budget:
+            break
+        kept.append(line)
+    return "\n".join(kept)
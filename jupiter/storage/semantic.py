@@ -0,0 +1,143 @@
+"""Jupiter semantic index — local Ollama embeddings in a memory-mapped float32 matrix (needs numpy)."""
+import hashlib
+import threading
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+import httpx
+from jupiter.config import EMBED_MODEL, OLLAMA_BASE_URL
+
+try:
+    import numpy as np
+except ImportError:  # optional: pip install jupiter-os[semantic]
+    np = None
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+class SemanticIndex:
+    """Append-only index of unit-length embeddings.
+
+    <base>.f32 holds the rows as a raw float32 matrix (memory-mapped for search); <base>.keys holds one
+    "key<TAB>content-hash" line per row after a "#model<TAB>dim" header. Keys name the source row
+    ("e:12" episodic, "s:345" session). Texts whose hash is already indexed reuse that row's vector
+    instead of being embedded again."""
+
+    def __init__(self, base: Path, model: str = EMBED_MODEL, base_url: str = OLLAMA_BASE_URL, timeout: float = 60.0):
+        if np is None:
+            raise RuntimeError("semantic memory needs numpy (pip install jupiter-os[semantic])")
+        self.matrix_path = base.with_name(base.name + ".f32")
+        self.keys_path = base.with_name(base.name + ".keys")
+        self.model = model
+        self._client = httpx.Client(base_url=base_url.rstrip("/"), timeout=timeout)
+        # Posts an /api/embed body and returns the response's JSON. The planner points it at its backend
+        # pool (connection limits, scheduler, health checks); None: this index's own client (e.g. the CLI)
+        self.transport: Optional[Callable[[dict], dict]] = None
+        self._lock = threading.Lock()
+        self._keys: list = []
+        self._rows: dict = {}
+        self._by_hash: dict = {}
+        self.dim = 0
+        self._matrix = None
+        self._load()
+
+    def _load(self):
+        if not self.keys_path.exists():
+            return
+        lines = self.keys_path.read_text().splitlines()
+        model, _, dim = (lines[0][1:] if lines and lines[0].startswith("#") else "").partition("\t")
+        if model != self.model or not dim.isdigit():
+            # Embeddings from another model live in another vector space: start over
+            self.matrix_path.unlink(missing_ok=True)
+            self.keys_path.unlink(missing_ok=True)
+            return
+        self.dim = int(dim)
+        entries = [line.partition("\t")[::2] for line in lines[1:]]
+        stored = self.matrix_path.stat().st_size // (4 * self.dim) if self.matrix_path.exists() else 0
+        for key, h in entries[:stored]:
+            self._remember(key, h)
+        if stored != len(entries) or self.matrix_path.exists() and self.matrix_path.stat().st_size != 4 * self.dim * len(self._keys):
+            # A crash between the matrix and key appends: drop the half-written tail
+            with open(self.matrix_path, "r+b") as f:
+                f.truncate(4 * self.dim * len(self._keys))
+            self.keys_path.write_text("".join(f"{line}\n" for line in lines[:len(self._keys) + 1]))
+
+    def _remember(self, key: str, h: str):
+        self._rows[key] = len(self._keys)
+        self._by_hash.setdefault(h, len(self._keys))
+        self._keys.append(key)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key: str):
+        return key in self._rows
+
+    def close(self):
+        self._client.close()
+
+    def request(self, body: dict) -> dict:
+        """POST an /api/embed body with this index's own client."""
+        r = self._client.post("/api/embed", json=body)
+        r.raise_for_status()
+        return r.json()
+
+    def embed(self, texts: list) -> "np.ndarray":
+        """Unit-normalized embeddings for texts, one row each, from Ollama's /api/embed (through transport if set)."""
+        data = (self.transport or self.request)({"model": self.model, "input": texts})
+        vectors = np.asarray(data["embeddings"], dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def _matrix_view(self):
+        if self._matrix is None and self._keys:
+            self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(len(self._keys), self.dim))
+        return self._matrix
+
+    def add(self, items: Iterable) -> int:
+        """Index (key, text) pairs not indexed yet; returns how many rows were added. Texts already
+        embedded (same content hash) are copied rather than sent to Ollama again."""
+        with self._lock:
+            pending, seen = [], set()
+            for key, text in items:
+                if key not in self._rows and key not in seen:
+                    seen.add(key)
+                    pending.append((key, text, content_hash(text)))
+            if not pending:
+                return 0
+            new_texts = list(dict.fromkeys(text for _, text, h in pending if h not in self._by_hash))
+            embedded = dict(zip(new_texts, self.embed(new_texts))) if new_texts else {}
+            if not self.dim:
+                self.dim = len(next(iter(embedded.values())))
+                self.keys_path.write_text(f"#{self.model}\t{self.dim}\n")
+            matrix = self._matrix_view()
+            rows = [embedded[text] if h not in self._by_hash else np.array(matrix[self._by_hash[h]]) for _, text, h in pending]
+            with open(self.matrix_path, "ab") as f:
+                f.write(np.stack(rows).astype(np.float32).tobytes())
+            with open(self.keys_path, "a") as f:
+                f.write("".join(f"{key}\t{h}\n" for key, _, h in pending))
+            for key, _, h in pending:
+                self._remember(key, h)
+            self._matrix = None
+            return len(pending)
+
+    def search(self, text: str, limit: int = 5, exclude: Optional[set] = None) -> list:
+        """Top (key, cosine similarity) pairs for text, best first, skipping keys in exclude."""
+        if not self._keys or limit <= 0:
+            return []
+        query = self.embed([text])[0]
+        with self._lock:
+            scores = self._matrix_view() @ query
+            keys = self._keys
+        want = min(len(scores), limit + len(exclude or ()))
+        top = np.argpartition(-scores, want - 1)[:want]
+        ranked = [(keys[i], float(scores[i])) for i in top[np.argsort(-scores[top])]]
+        return [(k, s) for k, s in ranked if not exclude or k not in exclude][:limit]
+
+
+def open_semantic_index(db_path: Path) -> Optional[SemanticIndex]:
+    """The index next to db_path, or None when semantic memory is off (no JUPITER_EMBED_MODEL) or numpy is missing."""
+    if not EMBED_MODEL or np is None:
+        return None
+    return SemanticIndex(db_path.with_name(db_path.stem + ".vectors"))
@@ -1,3 +1,4 @@
 from .system import system_status, system_logs_tail, system_diagnostics
 from .terminal import terminal_explain, terminal_exec
-__all__ = ["system_status", "system_logs_tail", "system_diagnostics", "terminal_explain", "terminal_exec"]
+from .process import OutputBuffer, run_command
+__all__ = ["system_status", "system_logs_tail", "system_diagnostics", "terminal_explain", "terminal_exec", "OutputBuffer", "run_command"]
@@ -0,0 +1,165 @@
+"""Journal reader — structured, cursor-based reads of the systemd journal (or a fixture standing in for it)."""
+import asyncio
+import json
+import subprocess
+import time
+from pathlib import Path
+from typing import AsyncIterator, Optional
+from jupiter.config import JOURNAL_FIXTURE
+
+PRIORITIES = ("emerg", "alert", "crit", "err", "warning", "notice", "info", "debug")
+MAX_LINES = 500
+MESSAGE_CHARS = 500
+
+
+def priority_level(priority) -> Optional[int]:
+    """0-7 from a number or a syslog name ("err", "warning", ...); None for no filter."""
+    if priority is None or priority == "":
+        return None
+    text = str(priority).strip().lower()
+    if text.isdigit():
+        return min(int(text), 7)
+    aliases = {"error": "err", "warn": "warning", "critical": "crit", "emergency": "emerg"}
+    text = aliases.get(text, text)
+    if text not in PRIORITIES:
+        raise ValueError(f"unknown priority {priority!r} (use 0-7 or one of {', '.join(PRIORITIES)})")
+    return PRIORITIES.index(text)
+
+
+def parse_entry(raw: dict) -> dict:
+    """A journal JSON record as {"cursor", "time", "unit", "priority", "message"}."""
+    message = raw.get("MESSAGE")
+    if isinstance(message, list):  # non-UTF-8 messages are exported as byte arrays
+        message = bytes(message).decode("utf-8", errors="replace")
+    priority = raw.get("PRIORITY")
+    return {"cursor": raw.get("__CURSOR"), "time": int(raw.get("__REALTIME_TIMESTAMP") or 0) / 1e6,
+            "unit": raw.get("_SYSTEMD_UNIT") or raw.get("SYSLOG_IDENTIFIER") or "", "priority": int(priority) if priority else None,
+            "message": message or ""}
+
+
+def format_entries(entries: list) -> str:
+    lines = []
+    for e in entries:
+        stamp = time.strftime("%b %d %H:%M:%S", time.localtime(e["time"]))
+        level = f" <{PRIORITIES[e['priority']]}>" if e["priority"] is not None and e["priority"] <= 4 else ""
+        message = e["message"] if len(e["message"]) <= MESSAGE_CHARS else e["message"][:MESSAGE_CHARS] + "…"
+        lines.append(f"{stamp} {e['unit']}{level}: {message}")
+    return "\n".join(lines)
+
+
+class JournalctlSource:
+    """Reads through journalctl -o json. Cursors are the journal's own (__CURSOR)."""
+
+    @staticmethod
+    def _args(unit, priority, since, until) -> list:
+        args = ["-o", "json", "--no-pager"]
+        if unit:
+            args += ["-u", unit]
+        level = priority_level(priority)
+        if level is not None:
+            args += ["-p", str(level)]
+        if since is not None:
+            args += ["--since", f"@{since:.0f}"]
+        if until is not None:
+            args += ["--until", f"@{until:.0f}"]
+        return args
+
+    def read(self, lines: int = 20, unit: Optional[str] = None, priority=None, since: Optional[float] = None,
+             until: Optional[float] = None, after_cursor: Optional[str] = None) -> list:
+        """Newest entries (at most lines), oldest first; with after_cursor only entries after it."""
+        cmd = ["journalctl", *self._args(unit, priority, since, until), "-n", str(min(lines, MAX_LINES))]
+        if after_cursor:
+            cmd += ["--after-cursor", after_cursor]
+        r = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+        if r.returncode != 0 and not r.stdout and after_cursor:
+            # A cursor from a rotated-away or foreign journal: read the newest entries instead
+            return self.read(lines, unit, priority, since, until)
+        if r.returncode != 0 and not r.stdout:
+            raise RuntimeError((r.stderr or f"journalctl exited with {r.returncode}").strip())
+        return [parse_entry(json.loads(line)) for line in r.stdout.splitlines() if line.startswith("{")]
+
+    async def follow(self, lines: int = 0, unit: Optional[str] = None, priority=None,
+                     after_cursor: Optional[str] = None) -> AsyncIterator[dict]:
+        """Entries as they are written, starting with the last lines (or everything after after_cursor)."""
+        cmd = ["journalctl", "-f", *self._args(unit, priority, None, None)]
+        cmd += ["--after-cursor", after_cursor] if after_cursor else ["-n", str(min(lines, MAX_LINES))]
+        proc = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+        try:
+            async for line in proc.stdout:
+                if line.startswith(b"{"):
+                    yield parse_entry(json.loads(line))
+        finally:
+            if proc.returncode is None:
+                proc.kill()
+            await proc.wait()
+
+
+class FakeJournalSource:
+    """Stands in for journalctl: entries come from a JSON-lines fixture in `journalctl -o json` format
+    (records without __CURSOR get their line number). The file is re-read when it changes, so appending
+    to it simulates new log entries for follow()."""
+
+    def __init__(self, path: Path, poll_interval: float = 0.5):
+        self.path = Path(path)
+        self.poll_interval = poll_interval
+        self._entries: list = []
+        self._mtime = None
+
+    def _load(self) -> list:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return []
+        if (st.st_mtime_ns, st.st_size) != self._mtime:
+            entries = []
+            for n, line in enumerate(self.path.read_text().splitlines(), 1):
+                if line.strip():
+                    raw = json.loads(line)
+                    raw.setdefault("__CURSOR", f"fake;i={n}")
+                    raw.setdefault("__REALTIME_TIMESTAMP", str(int(st.st_mtime * 1e6)))
+                    entries.append(parse_entry(raw))
+            self._entries, self._mtime = entries, (st.st_mtime_ns, st.st_size)
+        return self._entries
+
+    @staticmethod
+    def _match(e: dict, unit, level, since, until) -> bool:
+        return ((not unit or e["unit"] in (unit, unit + ".service"))
+                and (level is None or e["priority"] is not None and e["priority"] <= level)
+                and (since is None or e["time"] >= since) and (until is None or e["time"] < until))
+
+    def _select(self, unit, priority, since, until, after_cursor) -> list:
+        entries = self._load()
+        if after_cursor:
+            index = next((i for i, e in enumerate(entries) if e["cursor"] == after_cursor), None)
+            entries = entries[index + 1:] if index is not None else entries
+        level = priority_level(priority)
+        return [e for e in entries if self._match(e, unit, level, since, until)]
+
+    def read(self, lines: int = 20, unit: Optional[str] = None, priority=None, since: Optional[float] = None,
+             until: Optional[float] = None, after_cursor: Optional[str] = None) -> list:
+        entries = self._select(unit, priority, since, until, after_cursor)
+        return entries[-min(lines, MAX_LINES):] if lines > 0 else []
+
+    async def follow(self, lines: int = 0, unit: Optional[str] = None, priority=None,
+                     after_cursor: Optional[str] = None) -> AsyncIterator[dict]:
+        backlog = self._select(unit, priority, None, None, after_cursor)
+        pending = backlog if after_cursor else backlog[-min(lines, MAX_LINES):] if lines > 0 else []
+        level, seen = priority_level(priority), len(self._load())
+        while True:
+            for entry in pending:
+                yield entry
+            await asyncio.sleep(self.poll_interval)
+            entries = self._load()
+            pending = [e for e in entries[seen:] if self._match(e, unit, level, None, None)]
+            seen = len(entries)
+
+
+_source = None
+
+
+def get_journal_source():
+    """FakeJournalSource over JUPITER_JOURNAL_FIXTURE when it is set, else journalctl."""
+    global _source
+    if _source is None:
+        _source = FakeJournalSource(Path(JOURNAL_FIXTURE)) if JOURNAL_FIXTURE else JournalctlSource()
+    return _source
@@ -0,0 +1,209 @@
+"""Host metrics collector — /proc and statvfs sampled in the background into fixed-size ring buffers."""
+import math
+import os
+import threading
+import time
+from array import array
+from typing import Dict, Optional
+from jupiter.config import METRICS_INTERVAL, METRICS_SAMPLES
+
+SERIES = ("load1", "cpu_pct", "iowait_pct", "mem_used_pct", "swap_used_pct", "disk_read_bps", "disk_write_bps", "root_used_pct")
+WINDOWS = (60, 300, 900)  # seconds summarized by stats()
+_REAL_FS = frozenset({"ext2", "ext3", "ext4", "xfs", "btrfs", "zfs", "f2fs", "vfat", "exfat", "ntfs", "ntfs3", "fuseblk"})
+
+
+class Ring:
+    """The last size samples of one series in a preallocated array of doubles (NaN = no value)."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._data = array("d", [math.nan]) * size
+        self._next = 0
+        self.count = 0
+
+    def push(self, value: Optional[float]):
+        self._data[self._next] = math.nan if value is None else value
+        self._next = (self._next + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+    def last(self, n: Optional[int] = None) -> list:
+        """Up to n newest samples, oldest first."""
+        n = self.count if n is None else min(n, self.count)
+        start = (self._next - n) % self.size
+        if start + n <= self.size:
+            return self._data[start:start + n].tolist()
+        return (self._data[start:] + self._data[:start + n - self.size]).tolist()
+
+
+def _read(path: str) -> str:
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return ""
+
+
+def read_meminfo() -> Dict[str, int]:
+    """/proc/meminfo in bytes."""
+    info = {}
+    for line in _read("/proc/meminfo").splitlines():
+        key, _, rest = line.partition(":")
+        parts = rest.split()
+        if parts and parts[0].isdigit():
+            info[key] = int(parts[0]) * (1024 if parts[1:] == ["kB"] else 1)
+    return info
+
+
+def read_cpu_times() -> Optional[tuple]:
+    """(busy, iowait, total) jiffies from the aggregate cpu line of /proc/stat."""
+    for line in _read("/proc/stat").splitlines():
+        if line.startswith("cpu "):
+            fields = [int(v) for v in line.split()[1:]]
+            idle, iowait = fields[3], fields[4] if len(fields) > 4 else 0
+            total = sum(fields[:8])  # guest time is already counted in user/nice
+            return total - idle - iowait, iowait, total
+    return None
+
+
+def read_disk_sectors() -> tuple:
+    """(sectors read, sectors written) summed over whole disks in /proc/diskstats (512-byte sectors)."""
+    read = written = 0
+    for line in _read("/proc/diskstats").splitlines():
+        f = line.split()
+        if len(f) < 10:
+            continue
+        name = f[2]
+        if name.startswith(("loop", "ram", "zram", "dm-", "md")) or not os.path.exists(f"/sys/block/{name}"):
+            continue  # partitions and virtual devices would count the same I/O twice
+        read += int(f[5])
+        written += int(f[9])
+    return read, written
+
+
+def read_mounts() -> list:
+    """Usage of every mounted real filesystem via statvfs."""
+    seen, mounts = set(), []
+    for line in _read("/proc/self/mounts").splitlines():
+        f = line.split()
+        if len(f) < 3 or f[2] not in _REAL_FS and not f[0].startswith("/dev/"):
+            continue
+        path = f[1].replace("\\040", " ")
+        if f[0] in seen and path != "/":
+            continue  # bind mounts of a device already listed
+        try:
+            st = os.statvfs(path)
+        except OSError:
+            continue
+        seen.add(f[0])
+        total, free = st.f_blocks * st.f_frsize, st.f_bavail * st.f_frsize
+        used = total - st.f_bfree * st.f_frsize
+        if total:
+            mounts.append({"mount": path, "device": f[0], "fstype": f[2], "total_bytes": total, "free_bytes": free,
+                           "used_pct": round(100.0 * used / (used + free), 1) if used + free else 0.0})
+    return mounts
+
+
+class MetricsCollector:
+    """Samples host metrics every interval seconds on a daemon thread. snapshot() and stats() only read
+    what was already sampled, so callers never wait on /proc or the disks."""
+
+    def __init__(self, interval: float = METRICS_INTERVAL, samples: int = METRICS_SAMPLES):
+        self.interval = interval
+        self.series = {name: Ring(samples) for name in SERIES}
+        self.times = Ring(samples)
+        self._lock = threading.Lock()
+        self._latest: dict = {}
+        self._prev: Optional[tuple] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="jupiter-metrics", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while True:
+            self.sample()
+            if self._stop.wait(self.interval):
+                return
+
+    def sample(self) -> dict:
+        now = time.time()
+        load = _read("/proc/loadavg").split()
+        mem = read_meminfo()
+        cpu = read_cpu_times()
+        disk = read_disk_sectors()
+        mounts = read_mounts()
+        snap = {"time": now, "load": [float(v) for v in load[:3]] if len(load) >= 3 else None,
+                "mem_total_bytes": mem.get("MemTotal"), "mem_available_bytes": mem.get("MemAvailable"),
+                "swap_total_bytes": mem.get("SwapTotal"), "swap_free_bytes": mem.get("SwapFree"), "mounts": mounts}
+        snap["mem_used_pct"] = _pct(mem.get("MemTotal", 0) - mem.get("MemAvailable", 0), mem.get("MemTotal"))
+        snap["swap_used_pct"] = _pct(mem.get("SwapTotal", 0) - mem.get("SwapFree", 0), mem.get("SwapTotal"))
+        snap["root_used_pct"] = next((m["used_pct"] for m in mounts if m["mount"] == "/"), None)
+        snap["cpu_pct"] = snap["iowait_pct"] = snap["disk_read_bps"] = snap["disk_write_bps"] = None
+        with self._lock:
+            if self._prev is not None and cpu is not None:
+                t0, cpu0, disk0 = self._prev
+                dt, total = now - t0, cpu[2] - cpu0[2]
+                if total > 0:
+                    snap["cpu_pct"] = round(100.0 * (cpu[0] - cpu0[0]) / total, 1)
+                    snap["iowait_pct"] = round(100.0 * (cpu[1] - cpu0[1]) / total, 1)
+                if dt > 0:
+                    snap["disk_read_bps"] = round((disk[0] - disk0[0]) * 512 / dt)
+                    snap["disk_write_bps"] = round((disk[1] - disk0[1]) * 512 / dt)
+            self._prev = (now, cpu, disk) if cpu is not None else None
+            snap["load1"] = snap["load"][0] if snap["load"] else None
+            for name, ring in self.series.items():
+                ring.push(snap[name])
+            self.times.push(now)
+            self._latest = snap
+        return snap
+
+    def snapshot(self) -> dict:
+        """The latest sample (taken now if nothing has been sampled yet)."""
+        with self._lock:
+            latest = self._latest
+        return latest or self.sample()
+
+    def stats(self, windows=WINDOWS) -> dict:
+        """{series: {window_seconds: {"min", "avg", "max", "samples"}}} over the samples in each window."""
+        out: dict = {}
+        with self._lock:
+            times = self.times.last()
+            values = {name: ring.last() for name, ring in self.series.items()}
+        now = time.time()
+        for window in windows:
+            n = sum(1 for t in times if now - t <= window)
+            for name, series in values.items():
+                vals = [v for v in series[len(series) - n:] if not math.isnan(v)] if n else []
+                out.setdefault(name, {})[window] = ({"min": min(vals), "avg": round(sum(vals) / len(vals), 2), "max": max(vals),
+                                                     "samples": len(vals)} if vals else None)
+        return out
+
+    def history(self, name: str, n: Optional[int] = None) -> list:
+        """[(time, value)] for the newest n samples of one series, oldest first."""
+        with self._lock:
+            return [(t, None if math.isnan(v) else v) for t, v in zip(self.times.last(n), self.series[name].last(n))]
+
+
+def _pct(part: int, whole: Optional[int]) -> Optional[float]:
+    return round(100.0 * part / whole, 1) if whole else None
+
+
+_collector: Optional[MetricsCollector] = None
+_collector_lock = threading.Lock()
+
+
+def get_collector() -> MetricsCollector:
+    """The process-wide collector, started on first use."""
+    global _collector
+    with _collector_lock:
+        if _collector is None:
+            _collector = MetricsCollector()
+            _collector.start()
+    return _collector
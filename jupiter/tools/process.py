@@ -0,0 +1,127 @@
+"""Process runner — bounded, incrementally read output and whole-group timeouts for shell commands."""
+import codecs
+import os
+import selectors
+import signal
+import subprocess
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+from jupiter.config import EXEC_HEAD_BYTES, EXEC_STREAM_BYTES, EXEC_TAIL_BYTES
+
+_READ_SIZE = 65536
+
+
+class OutputBuffer:
+    """Keeps the first head and the last tail bytes of a stream plus byte and line counts, so memory
+    stays constant however much the command writes."""
+
+    def __init__(self, head: int = EXEC_HEAD_BYTES, tail: int = EXEC_TAIL_BYTES):
+        self.head_limit, self.tail_limit = head, tail
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total_bytes = 0
+        self.total_lines = 0
+        self._last = b"\n"
+
+    def write(self, data: bytes):
+        self.total_bytes += len(data)
+        self.total_lines += data.count(b"\n")
+        self._last = data[-1:] or self._last
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data and self.tail_limit > 0:
+            self.tail += data[-self.tail_limit:]
+            if len(self.tail) > self.tail_limit:
+                del self.tail[:len(self.tail) - self.tail_limit]
+
+    @property
+    def lines(self) -> int:
+        """Lines produced, counting a last line without a newline."""
+        return self.total_lines + (self._last != b"\n")
+
+    @property
+    def omitted(self) -> int:
+        return self.total_bytes - len(self.head) - len(self.tail)
+
+    def text(self) -> str:
+        head = self.head.decode("utf-8", errors="replace")
+        if not self.omitted:
+            return head + self.tail.decode("utf-8", errors="replace")
+        return (f"{head}\n…[{self.omitted} bytes omitted]…\n{self.tail.decode('utf-8', errors='replace')}"
+                f"\n[{self.total_bytes} bytes, {self.lines} lines in total]")
+
+
+@dataclass
+class ExecResult:
+    returncode: Optional[int]
+    output: str
+    total_bytes: int
+    total_lines: int
+    timed_out: bool = False
+
+
+def _kill_group(proc: subprocess.Popen):
+    """SIGTERM the command's process group, then SIGKILL whatever is left after a second."""
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(proc.pid, sig)
+        except ProcessLookupError:
+            return
+        try:
+            proc.wait(timeout=1)
+            if sig == signal.SIGTERM:
+                os.killpg(proc.pid, signal.SIGKILL)  # the shell is gone; make sure its children are too
+            return
+        except subprocess.TimeoutExpired:
+            continue
+        except ProcessLookupError:
+            return
+
+
+def run_command(command: str, timeout: float, on_output: Optional[Callable[[str], None]] = None,
+                buffer: Optional[OutputBuffer] = None) -> ExecResult:
+    """Run command in a shell in its own process group, reading stdout and stderr (merged) as they are
+    written. on_output gets decoded chunks as they arrive, up to EXEC_STREAM_BYTES in all. On timeout
+    the whole process group is killed, so children of the shell do not outlive it."""
+    buf = buffer or OutputBuffer()
+    proc = subprocess.Popen(command, shell=True, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            start_new_session=True)
+    deadline = time.monotonic() + timeout
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    streamed = 0
+    timed_out = False
+    with selectors.DefaultSelector() as sel:
+        sel.register(proc.stdout, selectors.EVENT_READ)
+        fd = proc.stdout.fileno()
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timed_out = True
+                break
+            if not sel.select(min(remaining, 1.0)):
+                continue
+            data = os.read(fd, _READ_SIZE)
+            if not data:
+                break
+            buf.write(data)
+            if on_output is not None and streamed < EXEC_STREAM_BYTES:
+                chunk = data[:EXEC_STREAM_BYTES - streamed]
+                streamed += len(chunk)
+                text = decoder.decode(chunk, final=streamed >= EXEC_STREAM_BYTES)
+                if streamed >= EXEC_STREAM_BYTES:
+                    text += "\n…[live output truncated]\n"
+                if text:
+                    on_output(text)
+    proc.stdout.close()
+    if timed_out:
+        _kill_group(proc)
+    else:
+        try:
+            proc.wait(timeout=max(0.0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            _kill_group(proc)
+    return ExecResult(None if timed_out else proc.returncode, buf.text(), buf.total_bytes, buf.lines, timed_out)
@@ -1,31 +1,56 @@
 """System tools — status, logs, diagnostics."""
 import platform
-import subprocess
 from typing import Optional
 from jupiter.safety.broker import ToolResult
+from jupiter.tools.journal import format_entries, get_journal_source
+from jupiter.tools.metrics import get_collector
+
+
+def _size(n: Optional[float]) -> str:
+    if n is None:
+        return "?"
+    for unit in ("B", "K", "M", "G", "T"):
+        if abs(n) < 1024 or unit == "T":
+            return f"{n:.0f}{unit}" if unit == "B" else f"{n:.1f}{unit}"
+        n /= 1024
+
+
+def _trend(stats: dict, name: str, unit: str = "") -> str:
+    parts, seen = [], 0
+    for window, s in stats[name].items():
+        if s and s["samples"] > max(seen, 1):  # a longer window with no older samples adds nothing
+            parts.append(f"{window // 60}m {s['min']:g}/{s['avg']:g}/{s['max']:g}{unit}")
+            seen = s["samples"]
+    return f" (min/avg/max: {', '.join(parts)})" if parts else ""
 
 
 def system_status() -> ToolResult:
     try:
         uname = platform.uname()
         out = f"System: {uname.system} {uname.release} ({uname.machine})\nNode: {uname.node}"
-        try:
-            with open("/proc/meminfo") as f:
-                out += "\n" + " ".join(f.read().splitlines()[:3])
-        except FileNotFoundError:
-            pass
+        snap = get_collector().snapshot()
+        if snap.get("mem_total_bytes"):
+            used = snap["mem_total_bytes"] - (snap["mem_available_bytes"] or 0)
+            out += f"\nMemory: {_size(used)} used of {_size(snap['mem_total_bytes'])} ({snap['mem_used_pct']}%), {_size(snap['mem_available_bytes'])} available"
+        if snap.get("swap_total_bytes"):
+            out += f"\nSwap: {snap['swap_used_pct']}% of {_size(snap['swap_total_bytes'])} used"
         return ToolResult(success=True, output=out)
     except Exception as e:
         return ToolResult(success=False, output="", error=str(e))
 
 
-def system_logs_tail(service: Optional[str] = None, lines: int = 20) -> ToolResult:
+def system_logs_tail(service: Optional[str] = None, lines: int = 20, priority=None, since: Optional[float] = None,
+                     after_cursor: Optional[str] = None) -> ToolResult:
+    """Newest journal entries, optionally for one unit, at or above a priority, or newer than since (unix
+    time). With after_cursor only entries after it; meta["cursor"] is where the next read should start."""
     try:
-        cmd = ["journalctl", "-n", str(lines), "--no-pager"]
-        if service:
-            cmd = ["journalctl", "-u", service, "-n", str(lines), "--no-pager"]
-        r = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-        return ToolResult(success=r.returncode == 0, output=(r.stdout or r.stderr or "")[:4096])
+        entries = get_journal_source().read(lines=lines, unit=service, priority=priority, since=since, after_cursor=after_cursor)
+        cursor = entries[-1]["cursor"] if entries else after_cursor
+        if not entries:
+            return ToolResult(success=True, output="No new log entries since the last check." if after_cursor else "No log entries.",
+                              meta={"cursor": cursor})
+        head = f"{len(entries)} new entries since the last check:\n" if after_cursor else ""
+        return ToolResult(success=True, output=head + format_entries(entries), meta={"cursor": cursor})
     except FileNotFoundError:
         return ToolResult(success=False, output="", error="journalctl not available")
     except Exception as e:
@@ -33,16 +58,22 @@ def system_logs_tail(service: Optional[str] = None, lines: int = 20) -> ToolResu
 
 
 def system_diagnostics() -> ToolResult:
+    """Latest load, CPU, memory, disk I/O and filesystem usage, with min/avg/max over the last 1/5/15 minutes."""
     try:
+        collector = get_collector()
+        snap, stats = collector.snapshot(), collector.stats()
         parts = []
-        try:
-            with open("/proc/loadavg") as f:
-                parts.append("Load: " + f.read().strip())
-        except FileNotFoundError:
-            pass
-        r = subprocess.run(["df", "-h", "/"], capture_output=True, text=True, timeout=5)
-        if r.returncode == 0:
-            parts.append("Disk:\n" + r.stdout)
+        if snap.get("load"):
+            parts.append("Load: " + " ".join(f"{v:g}" for v in snap["load"]) + _trend(stats, "load1"))
+        if snap.get("cpu_pct") is not None:
+            parts.append(f"CPU: {snap['cpu_pct']}% busy, {snap['iowait_pct']}% iowait" + _trend(stats, "cpu_pct", "%"))
+        if snap.get("mem_used_pct") is not None:
+            parts.append(f"Memory: {snap['mem_used_pct']}% used" + _trend(stats, "mem_used_pct", "%"))
+        if snap.get("disk_read_bps") is not None:
+            parts.append(f"Disk I/O: read {_size(snap['disk_read_bps'])}/s, write {_size(snap['disk_write_bps'])}/s")
+        if snap.get("mounts"):
+            parts.append("Disk:\n" + "\n".join(f"  {m['mount']}: {m['used_pct']}% used, {_size(m['free_bytes'])} free of {_size(m['total_bytes'])}"
+                                                 for m in snap["mounts"]))
         return ToolResult(success=True, output="\n".join(parts))
     except Exception as e:
         return ToolResult(success=False, output="", error=str(e))
@@ -1,7 +1,7 @@
 """Terminal tools — explain (read-only), exec (restricted)."""
-import subprocess
-from typing import Optional
+from typing import Callable, Optional
 from jupiter.safety.broker import ToolResult
+from jupiter.tools.process import run_command
 
 SAFE_READ_ONLY = frozenset({"cat", "head", "tail", "less", "grep", "ls", "pwd", "whoami", "date", "echo", "env", "which", "type", "man", "help"})
 
@@ -13,16 +13,16 @@ def terminal_explain(command: str) -> ToolResult:
     return ToolResult(success=True, output=f"Command: {command}\nNote: {note}")
 
 
-def terminal_exec(command: str, timeout_seconds: int = 30) -> ToolResult:
+def terminal_exec(command: str, timeout_seconds: int = 30, on_output: Optional[Callable[[str], None]] = None) -> ToolResult:
+    """Run command; output keeps its head and tail (see process.OutputBuffer). on_output receives it live."""
     if not command or not command.strip():
         return ToolResult(success=False, output="", error="Empty command")
     if command.strip().lower().startswith("sudo"):
         return ToolResult(success=False, output="", error="sudo is not allowed via Jupiter")
     try:
-        r = subprocess.run(command, shell=True, capture_output=True, text=True, timeout=timeout_seconds)
-        out = (r.stdout or "") + (r.stderr or "")
-        return ToolResult(success=r.returncode == 0, output=out[:8192], error=None if r.returncode == 0 else f"Exit code {r.returncode}", audit_action="terminal_exec")
-    except subprocess.TimeoutExpired:
-        return ToolResult(success=False, output="", error="Command timed out", audit_action="terminal_exec_timeout")
+        r = run_command(command, timeout_seconds, on_output)
+        if r.timed_out:
+            return ToolResult(success=False, output=r.output, error=f"Command timed out after {timeout_seconds}s", audit_action="terminal_exec_timeout")
+        return ToolResult(success=r.returncode == 0, output=r.output, error=None if r.returncode == 0 else f"Exit code {r.returncode}", audit_action="terminal_exec")
     except Exception as e:
         return ToolResult(success=False, output="", error=str(e), audit_action="terminal_exec_error")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Model selection by measurement: time a typical Jupiter prompt on each candidate model.
+
+Candidates are tried smallest first, pulling them if needed, until one does not fit in memory or is
+slower than the target (a larger one would be slower still). Prompt and generation tokens/sec and the
+runner's peak RSS are added to hardware.json under "calibration"; the chosen model is printed as JSON
+for model.json. Without a reachable Ollama, falls back to the VRAM/memory policy.
+
+    python3 provisioning/calibrate.py --hardware ~/.local/share/jupiter/hardware.json > model.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from jupiter.calibration import candidates, estimate_mb, rates, select, smaller, turn_seconds
+from jupiter.config import CONTEXT_TOKENS, HARDWARE_FILE, OLLAMA_BASE_URL, TARGET_LATENCY, TYPICAL_PROMPT_TOKENS, TYPICAL_REPLY_TOKENS
+from jupiter.prompt import build_system_prompt, get_system_info
+from provisioning.model_policy import select_model
+
+RUNS = 2
+QUESTION = "Which processes are using the most memory right now, and is anything in the logs about it?"
+
+def _request(base: str, path: str, body=None, timeout: float = 600):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(base + path, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=timeout) as r:
+        return json.loads(r.read() or b"{}")
+
+def pulled(base: str) -> set:
+    names = {m.get("name", "") for m in _request(base, "/api/tags", timeout=5).get("models", [])}
+    return names | {n[:-len(":latest")] for n in names if n.endswith(":latest")}
+
+def runner_peak_rss_mb() -> int:
+    """Largest peak RSS (VmHWM) of the Ollama model runners on this machine; 0 if none can be seen."""
+    peak = 0
+    for pid in filter(str.isdigit, os.listdir("/proc")):
+        try:
+            cmdline = Path(f"/proc/{pid}/cmdline").read_bytes().split(b"\0")
+            if b"ollama" not in os.path.basename(cmdline[0]) or b"runner" not in cmdline:
+                continue
+            status = Path(f"/proc/{pid}/status").read_text()
+        except (OSError, IndexError):
+            continue
+        for line in status.splitlines():
+            if line.startswith("VmHWM:"):
+                peak = max(peak, int(line.split()[1]) // 1024)
+    return peak
+
+def measure(base: str, model: str) -> dict:
+    """Load model, then run the typical prompt RUNS times (each with a different first line, so Ollama
+    cannot reuse the previous run's cache) and average the rates."""
+    system = build_system_prompt(get_system_info())
+    load = _request(base, "/api/chat", {"model": model, "messages": [], "keep_alive": "5m"})
+    prompt_tps, gen_tps = [], []
+    for run in range(RUNS):
+        data = _request(base, "/api/chat", {
+            "model": model, "stream": False, "keep_alive": "5m",
+            "messages": [{"role": "system", "content": f"Calibration run {run} at {time.time()}.\n{system}"},
+                         {"role": "user", "content": QUESTION}],
+            "options": {"num_ctx": CONTEXT_TOKENS, "num_predict": TYPICAL_REPLY_TOKENS, "temperature": 0}})
+        prompt, gen = rates(data)
+        prompt_tps += [prompt] if prompt else []
+        gen_tps += [gen] if gen else []
+    result = {"load_seconds": round((load.get("load_duration") or 0) / 1e9, 2), "rss_mb": runner_peak_rss_mb() or None}
+    if prompt_tps and gen_tps:
+        prompt, gen = sum(prompt_tps) / len(prompt_tps), sum(gen_tps) / len(gen_tps)
+        result.update(prompt_tps=round(prompt, 1), gen_tps=round(gen, 1), seconds=round(turn_seconds(prompt, gen), 2))
+    _request(base, "/api/chat", {"model": model, "messages": [], "keep_alive": 0})  # unload before the next one
+    return result
+
+def calibrate(base: str, hardware: dict, target: float, pull: bool) -> dict:
+    """model -> result for each candidate tried; a result's pulled_now is set if it was pulled just for this."""
+    budget = hardware.get("memory_avail_mb", 0) + hardware.get("gpu_vram_mb", 0)
+    present, results = pulled(base), {}
+    for model in candidates():
+        if budget and estimate_mb(model) > budget:
+            results[model] = {"skipped": f"needs ~{estimate_mb(model)} MB, {budget} MB free"}
+            break
+        if model not in present:
+            if not pull:
+                results[model] = {"skipped": "not pulled"}
+                continue
+            print(f"calibrate: pulling {model}", file=sys.stderr)
+            _request(base, "/api/pull", {"model": model, "name": model, "stream": False}, timeout=3600)  # "name": Ollama < 0.5
+        print(f"calibrate: timing {model}", file=sys.stderr)
+        results[model] = measure(base, model)
+        results[model]["pulled_now"] = model not in present
+        if results[model].get("seconds", float("inf")) > target:
+            break
+    return results
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--hardware", type=Path, default=HARDWARE_FILE, help="hardware.json to read and add the results to")
+    ap.add_argument("--ollama", default=OLLAMA_BASE_URL)
+    ap.add_argument("--target", type=float, default=TARGET_LATENCY, help="seconds a typical turn may take")
+    ap.add_argument("--no-pull", dest="pull", action="store_false", help="only time models that are already pulled")
+    ap.add_argument("--keep", action="store_true", help="keep every model pulled for calibration")
+    args = ap.parse_args()
+    try:
+        hardware = json.loads(args.hardware.read_text())
+    except (OSError, ValueError):
+        from provisioning.hardware_detect import get_gpu_vram_mb, get_mem_info
+        mem, vram_mb = get_mem_info(), get_gpu_vram_mb()
+        hardware = {"memory_mb": mem["total_mb"], "memory_avail_mb": mem["avail_mb"], "gpu_vram_mb": vram_mb, "gpu_vram_gb": vram_mb // 1024}
+    vram_gb = hardware.get("gpu_vram_gb", 0)
+    base = args.ollama.rstrip("/")
+    try:
+        results = calibrate(base, hardware, args.target, args.pull)
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        print(f"calibrate: no measurement ({e}); choosing by VRAM and memory", file=sys.stderr)
+        print(json.dumps({"model": select_model(vram_gb, hardware.get("memory_mb", 0)), "gpu_vram_gb": vram_gb}))
+        return
+    model = select(results, args.target) or select_model(vram_gb, hardware.get("memory_mb", 0))
+    fallback = smaller(model, lambda m: "seconds" in results.get(m, {}))
+    if not args.keep:  # models pulled only to be timed, other than the choice and the one to fall back to
+        for name, result in results.items():
+            if result.pop("pulled_now", False) and name not in (model, fallback):
+                try:
+                    urllib.request.urlopen(urllib.request.Request(base + "/api/delete", method="DELETE",
+                                                                  data=json.dumps({"model": name, "name": name}).encode()), timeout=30).close()
+                except (urllib.error.URLError, OSError):
+                    pass
+    for result in results.values():
+        result.pop("pulled_now", None)
+    hardware["calibration"] = {"target_seconds": args.target, "prompt_tokens": TYPICAL_PROMPT_TOKENS, "reply_tokens": TYPICAL_REPLY_TOKENS,
+                               "at": int(time.time()), "models": results}
+    args.hardware.write_text(json.dumps(hardware, indent=2))
+    print(json.dumps({"model": model, "gpu_vram_gb": vram_gb, "fallback": fallback, "target_seconds": args.target,
+                      **{k: v for k, v in results.get(model, {}).items() if k in ("prompt_tps", "gen_tps", "seconds")}}))
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,33 @@
 #!/usr/bin/env python3
-"""Model selection from hardware (VRAM-based)."""
+"""Model selection from hardware (VRAM-based, within memory); provisioning/calibrate.py measures instead."""
 import json
 import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from jupiter.calibration import estimate_mb, smaller
 from jupiter.config import MODEL_POLICY, DEFAULT_MODEL
 
-def select_model(gpu_vram_gb: int) -> str:
+def select_model(gpu_vram_gb: int, memory_mb: int = 0) -> str:
     bucket = 0
     for v in sorted(MODEL_POLICY.keys(), reverse=True):
         if gpu_vram_gb >= v:
             bucket = v
             break
-    return MODEL_POLICY.get(bucket, DEFAULT_MODEL)
+    model = MODEL_POLICY.get(bucket, DEFAULT_MODEL)
+    # Whatever does not fit in VRAM runs from RAM: step down until the model fits in both together
+    while memory_mb and estimate_mb(model) > memory_mb + gpu_vram_gb * 1024 and smaller(model):
+        model = smaller(model)
+    return model
 
 def main():
     if len(sys.argv) > 1:
         vram_gb = int(sys.argv[1])
+        memory_mb = int(sys.argv[2]) if len(sys.argv) > 2 else 0
     else:
-        from provisioning.hardware_detect import get_gpu_vram_mb
+        from provisioning.hardware_detect import get_gpu_vram_mb, get_mem_info
         vram_gb = get_gpu_vram_mb() // 1024
-    model = select_model(vram_gb)
+        memory_mb = get_mem_info()["total_mb"]
+    model = select_model(vram_gb, memory_mb)
     print(json.dumps({"model": model, "gpu_vram_gb": vram_gb}))
 
 if __name__ == "__main__":
@@ -34,10 +34,15 @@ print('DB init ok')
 " 2>/dev/null || true
 fi
 
-# Model preference
-if [ -x "$JUPITER_INSTALL/provisioning/model_policy.py" ]; then
+# Model preference: timed on the models already pulled if Ollama is up, else by VRAM and memory
+MODEL_JSON="$JUPITER_DATA/model.json"
+if [ -x "$JUPITER_INSTALL/provisioning/calibrate.py" ]; then
+  (cd "$JUPITER_INSTALL" && python3 provisioning/calibrate.py --hardware "$HARDWARE_JSON" --no-pull) > "$MODEL_JSON" 2>/dev/null || true
+fi
+if [ ! -s "$MODEL_JSON" ] && [ -x "$JUPITER_INSTALL/provisioning/model_policy.py" ]; then
   VRAM_GB=$(python3 -c "import json; print(json.load(open('$HARDWARE_JSON')).get('gpu_vram_gb',0))" 2>/dev/null || echo 0)
-  (cd "$JUPITER_INSTALL" && python3 provisioning/model_policy.py "$VRAM_GB") > "$JUPITER_DATA/model.json" 2>/dev/null || true
+  MEM_MB=$(python3 -c "import json; print(json.load(open('$HARDWARE_JSON')).get('memory_mb',0))" 2>/dev/null || echo 0)
+  (cd "$JUPITER_INSTALL" && python3 provisioning/model_policy.py "$VRAM_GB" "$MEM_MB") > "$MODEL_JSON" 2>/dev/null || true
 fi
 
 touch "$JUPITER_PROVISIONED"
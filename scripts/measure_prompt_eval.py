@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Measure Ollama prompt_eval_count per turn for the old flat prompt layout vs the current chat layout.
+
+Runs the same scripted conversation twice against a scratch memory DB and prints, per turn, how many
+prompt tokens Ollama had to evaluate. With the chat layout the unchanged prefix is served from the KV
+cache, so the count should stay near the size of the newest messages instead of the whole prompt.
+
+    python scripts/measure_prompt_eval.py [--model llama3.2:3b] [--turns 6]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import sys
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from jupiter.agent.planner import JupiterPlanner
+from jupiter.config import OLLAMA_BASE_URL, DEFAULT_MODEL
+from jupiter.storage.memory import MemoryStore
+
+QUESTIONS = [
+    "Hi, who are you?",
+    "What can you do on this machine?",
+    "How do I check free disk space?",
+    "And how do I see which process uses the most memory?",
+    "Explain what 'ls -la' shows.",
+    "Thanks. What did I ask first?",
+    "Summarize our conversation in one sentence.",
+    "Which package manager should I use here?",
+]
+
+
+class FlatPlanner(JupiterPlanner):
+    """The pre-chat-layout prompt: system prompt, context and message flattened into one user message."""
+    async def _messages(self, user_message: str, conversation_id: str) -> tuple:
+        context = await asyncio.to_thread(self.memory.get_context_for_agent, session_limit=20, episodic_limit=5, conversation_id=conversation_id)
+        prompt = (context + "\n\nUser: " + user_message) if context else user_message
+        content = self._system_prompt + "\n\n---\nConversation context:\n" + prompt
+        return [{"role": "user", "content": content}], hashlib.sha256(content.encode()).hexdigest()
+
+
+async def run(planner_cls, base_url: str, model: str, turns: int) -> list:
+    with tempfile.TemporaryDirectory() as tmp:
+        memory = MemoryStore(Path(tmp) / "measure.db")
+        memory.preference_set("editor", "vim")
+        planner = planner_cls(base_url=base_url, model=model, memory=memory)
+        counts = []
+        try:
+            for question in QUESTIONS[:turns]:
+                memory.session_append("user", question)
+                plan = await planner.plan(question)
+                memory.session_append("assistant", plan.get("content") or json.dumps(plan))
+                counts.append(planner.last_stats.get("prompt_eval_count"))
+        finally:
+            await planner.aclose()
+        return counts
+
+
+async def main_async(args):
+    results = {}
+    for name, cls in (("flat", FlatPlanner), ("chat", JupiterPlanner)):
+        results[name] = await run(cls, args.base_url, args.model, args.turns)
+    print(f"{'turn':>4} {'flat':>8} {'chat':>8}")
+    for i in range(args.turns):
+        print(f"{i + 1:>4} {results['flat'][i]!s:>8} {results['chat'][i]!s:>8}")
+    print(json.dumps(results))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--base-url", default=OLLAMA_BASE_URL)
+    ap.add_argument("--model", default=DEFAULT_MODEL)
+    ap.add_argument("--turns", type=int, default=6, choices=range(1, len(QUESTIONS) + 1), metavar=f"1..{len(QUESTIONS)}")
+    asyncio.run(main_async(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""Test setup — a scratch data directory (jupiter.config reads it at import) and the fake Ollama server."""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+_scratch = tempfile.mkdtemp(prefix="jupiter-tests-")
+for var in ("XDG_DATA_HOME", "XDG_CONFIG_HOME", "XDG_STATE_HOME"):
+    os.environ[var] = os.path.join(_scratch, var.lower())
+os.environ["JUPITER_FAST_PATH"] = "0"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest  # noqa: E402
+from benchmarks.fake_ollama import FakeConfig, FakeOllama  # noqa: E402
+
+
+@pytest.fixture
+def fake_ollama():
+    """fake_ollama(**FakeConfig fields) starts a fake Ollama server; all are stopped after the test."""
+    started = []
+
+    def start(port: int = 0, **config) -> FakeOllama:
+        fake = FakeOllama(FakeConfig(**{"prompt_tps": 0, "tokens_per_sec": 0, **config}), port=port).start()
+        started.append(fake)
+        return fake
+    yield start
+    for fake in started:
+        fake.stop()
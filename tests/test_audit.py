@@ -0,0 +1,52 @@
+"""The audit store's write-behind queue: what is on disk when, and shutting it down."""
+import queue
+import sqlite3
+from jupiter.storage import audit as audit_module
+from jupiter.storage.audit import AuditStore
+
+
+def on_disk(path) -> list:
+    """Actions committed to the audit DB, read on a connection of its own (no flush)."""
+    with sqlite3.connect(path) as db:
+        return [r[0] for r in db.execute("SELECT action FROM audit ORDER BY id")]
+
+
+def test_batched_entries_are_written_by_close(tmp_path):
+    store = AuditStore(tmp_path / "audit.db", durability="batched")
+    for i in range(50):
+        store.log(f"a{i}", scope="system_read")
+    store.close()
+    assert on_disk(tmp_path / "audit.db") == [f"a{i}" for i in range(50)]
+    store.log("late")  # after close: written synchronously
+    assert on_disk(tmp_path / "audit.db")[-1] == "late"
+
+
+def test_strict_entries_are_committed_before_log_returns(tmp_path):
+    store = AuditStore(tmp_path / "audit.db", durability="strict")
+    store.log("reboot", scope="system_write", outcome="denied_no_confirm")
+    assert on_disk(tmp_path / "audit.db") == ["reboot"]
+    assert store._writer is None  # no write-behind thread
+    store.close()
+
+
+def test_full_queue_writes_inline(tmp_path):
+    store = AuditStore(tmp_path / "audit.db")
+    store._queue = queue.Queue(maxsize=1)
+    store._writer = object()  # a writer that never drains
+    store.log("queued")
+    store.log("inline")
+    assert on_disk(tmp_path / "audit.db") == ["inline"]
+    assert store._queue.get_nowait()[0] == "queued"
+    store._writer = None
+    store.close()
+
+
+def test_close_unregisters_the_exit_hook(tmp_path, monkeypatch):
+    hooks = []
+    monkeypatch.setattr(audit_module.atexit, "register", hooks.append)
+    monkeypatch.setattr(audit_module.atexit, "unregister", hooks.remove)
+    stores = [AuditStore(tmp_path / f"audit{i}.db") for i in range(3)]
+    assert len(hooks) == 3
+    for store in stores:
+        store.close()
+    assert hooks == []
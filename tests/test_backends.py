@@ -0,0 +1,166 @@
+"""The backend pool against several fake Ollama servers: routing, failover and the circuit breaker."""
+import asyncio
+import time
+import httpx
+import pytest
+from jupiter.agent import backends
+from jupiter.agent.backends import BackendPool, BackendUnavailable, NoHealthyBackend
+from jupiter.config import BACKEND_FAILURES
+
+MODEL = "llama3.2:3b"
+
+
+def chat(model: str = MODEL) -> dict:
+    return {"model": model, "messages": [{"role": "user", "content": "hi"}], "stream": False}
+
+
+def test_least_outstanding_backend_is_picked(fake_ollama):
+    a, b = fake_ollama(), fake_ollama()
+    pool = BackendPool([(a.url, ()), (b.url, ())])
+    first, second = pool.backends
+    assert pool.pick(MODEL) is first  # ties go to the first configured
+    first.outstanding = 2
+    assert pool.pick(MODEL) is second
+    second.outstanding = 3
+    assert pool.pick(MODEL) is first
+
+
+def test_concurrent_requests_are_spread(fake_ollama):
+    a, b = fake_ollama(tokens_per_sec=200, parallel=4), fake_ollama(tokens_per_sec=200, parallel=4)
+
+    async def run():
+        pool = BackendPool([(a.url, ()), (b.url, ())])
+        try:
+            responses = await asyncio.gather(*(pool.post("/api/chat", chat()) for _ in range(8)))
+            assert all(r.status_code == 200 for r in responses)
+            assert [x.outstanding for x in pool.backends] == [0, 0]
+        finally:
+            await pool.aclose()
+    asyncio.run(run())
+    assert a.stats.requests == b.stats.requests == 4
+
+
+def test_requests_go_only_to_backends_with_the_model(fake_ollama):
+    small, large = fake_ollama(model=MODEL), fake_ollama(model="llama3.2:7b-q4_0")
+
+    async def run():
+        pool = BackendPool([(small.url, ()), (large.url, ())])
+        try:
+            assert all(await asyncio.gather(*(pool.check(x) for x in pool.backends)))  # learns what each has pulled
+            for _ in range(3):
+                assert (await pool.post("/api/chat", chat("llama3.2:7b-q4_0"))).status_code == 200
+                assert (await pool.post("/api/chat", chat(MODEL))).status_code == 200
+        finally:
+            await pool.aclose()
+    asyncio.run(run())
+    assert small.stats.requests == large.stats.requests == 3
+
+    # An explicit model list wins over what the backend has pulled
+    pool = BackendPool([(small.url, ("llama3.2:7b-q4_0",)), (large.url, (MODEL,))])
+    assert pool.pick(MODEL) is pool.backends[1]
+    assert pool.pick("llama3.2:7b-q4_0") is pool.backends[0]
+
+
+def test_server_errors_fail_over(fake_ollama):
+    busy, live = fake_ollama(error_rate=1.0), fake_ollama()
+
+    async def run():
+        pool = BackendPool([(busy.url, ()), (live.url, ())])
+        try:
+            for _ in range(BACKEND_FAILURES + 2):
+                assert (await pool.post("/api/chat", chat())).status_code == 200
+            return pool.stats()
+        finally:
+            await pool.aclose()
+    stats = asyncio.run(run())
+    assert busy.stats.errors == BACKEND_FAILURES  # then its circuit opened and it got no more
+    assert live.stats.requests == BACKEND_FAILURES + 2
+    assert stats[0]["failures"] == BACKEND_FAILURES and stats[0]["open_for"] > 0
+    assert stats[1]["failures"] == 0 and stats[1]["open_for"] == 0
+
+
+def test_killed_backend_fails_over_and_recovers(fake_ollama, monkeypatch):
+    """Kill one of two backends mid-run: requests move to the live one, /backends shows the open circuit,
+    and once the cooldown has passed the restarted backend gets requests again."""
+    import jupiter.api.main as api
+    from jupiter.agent.planner import JupiterPlanner
+    monkeypatch.setattr(backends, "BACKEND_COOLDOWN", 0.5)
+    doomed, live = fake_ollama(), fake_ollama()
+    port = doomed._server.server_address[1]
+
+    async def run():
+        planner = JupiterPlanner(backends=[(doomed.url, ()), (live.url, ())])
+        monkeypatch.setattr(api, "_planner", planner)
+        pool = planner.pool
+        try:
+            for _ in range(4):  # both in use
+                await asyncio.gather(pool.post("/api/chat", chat()), pool.post("/api/chat", chat()))
+            assert doomed.stats.requests == live.stats.requests == 4
+            doomed.stop()
+            for _ in range(BACKEND_FAILURES + 3):
+                assert (await pool.post("/api/chat", chat())).status_code == 200
+            assert live.stats.requests == 4 + BACKEND_FAILURES + 3
+            shown = (await api.backend_stats())["backends"]
+            assert shown[0]["url"] == doomed.url and shown[0]["failures"] >= BACKEND_FAILURES and shown[0]["open_for"] > 0
+            assert shown[1]["failures"] == 0 and shown[1]["open_for"] == 0
+
+            revived = fake_ollama(port=port)
+            await asyncio.sleep(0.6)
+            await asyncio.gather(pool.post("/api/chat", chat()), pool.post("/api/chat", chat()))
+            assert revived.stats.requests == 1
+            assert (await api.backend_stats())["backends"][0]["open_for"] == 0
+
+            live.stop()
+            revived.stop()
+            with pytest.raises(BackendUnavailable):
+                await pool.post("/api/chat", chat())
+        finally:
+            await planner.aclose()
+    asyncio.run(run())
+
+
+def test_all_circuits_open_fails_fast_with_a_retry_time(fake_ollama, tmp_path, monkeypatch):
+    import jupiter.api.main as api
+    from jupiter.agent.planner import JupiterPlanner
+    from jupiter.storage.memory import MemoryStore
+    a, b = fake_ollama(), fake_ollama()
+
+    async def run():
+        planner = JupiterPlanner(backends=[(a.url, ()), (b.url, ())], model=MODEL, memory=MemoryStore(tmp_path / "memory.db"))
+        for name, value in (("_planner", planner), ("_memory", planner.memory)):
+            monkeypatch.setattr(api, name, value)
+        for backend, cooldown in zip(planner.pool.backends, (8, 4)):
+            backend.failures, backend.open_until = BACKEND_FAILURES, time.monotonic() + cooldown
+        try:
+            with pytest.raises(NoHealthyBackend) as e:
+                await planner.pool.post("/api/chat", chat())
+            assert e.value.retry_after == 4
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://127.0.0.1") as client:
+                r = await client.post("/chat", json={"message": "how is my machine doing?"})
+            assert r.status_code == 503 and r.headers["Retry-After"] == "4"
+        finally:
+            await planner.aclose()
+    asyncio.run(run())
+    assert a.stats.requests == b.stats.requests == 0
+
+
+def test_health_loop_survives_a_failed_round(fake_ollama, monkeypatch):
+    monkeypatch.setattr(backends, "BACKEND_HEALTH_INTERVAL", 0.01)
+    fake, rounds = fake_ollama(), []
+
+    async def run():
+        pool = BackendPool([(fake.url, ())])
+
+        async def check(backend):
+            rounds.append(1)
+            if len(rounds) == 1:
+                raise RuntimeError("unexpected")
+            return True
+        pool.check = check
+        try:
+            pool._start_health()
+            await asyncio.sleep(0.1)
+        finally:
+            await pool.aclose()
+    asyncio.run(run())
+    assert len(rounds) > 1
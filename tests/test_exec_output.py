@@ -0,0 +1,33 @@
+"""Command output kept as its head and tail, with the middle cut out, however much a command writes."""
+from jupiter.tools.process import OutputBuffer, run_command
+
+
+def test_short_output_is_kept_whole():
+    buf = OutputBuffer(head=16, tail=16)
+    buf.write(b"one\ntwo\n")
+    buf.write(b"three")
+    assert buf.text() == "one\ntwo\nthree"
+    assert (buf.omitted, buf.lines) == (0, 3)
+
+
+def test_the_middle_is_cut_out():
+    buf = OutputBuffer(head=10, tail=10)
+    for i in range(100):
+        buf.write(f"line {i:03}\n".encode())  # 9 bytes each, written in small pieces
+    assert bytes(buf.head) == b"line 000\nl" and bytes(buf.tail) == b"\nline 099\n"
+    assert buf.omitted == 900 - 20
+    assert buf.text() == "line 000\nl\n…[880 bytes omitted]…\n\nline 099\n\n[900 bytes, 100 lines in total]"
+
+
+def test_a_chunk_larger_than_both_ends():
+    buf = OutputBuffer(head=4, tail=4)
+    buf.write(b"abcdefghijklmnop")
+    assert (bytes(buf.head), bytes(buf.tail), buf.omitted) == (b"abcd", b"mnop", 8)
+
+
+def test_command_output_keeps_head_and_tail():
+    r = run_command("seq 1 100000", timeout=10, buffer=OutputBuffer(head=64, tail=64))
+    assert r.returncode == 0 and not r.timed_out
+    assert r.output.startswith("1\n2\n3\n") and "99999\n100000\n" in r.output
+    assert "bytes omitted" in r.output and r.total_lines == 100000
+    assert len(r.output) < 300
@@ -0,0 +1,92 @@
+"""Plans from model output that is cut off, not JSON, runs on past the plan, or calls several tools."""
+import asyncio
+import json
+import time
+import pytest
+from jupiter.agent.planner import JupiterPlanner
+from jupiter.agent.schema import plan_calls
+from jupiter.storage.memory import MemoryStore
+
+MULTI = {"action": "tool", "calls": [{"tool": "system_status", "args": {}, "confirmed": True},
+                                     {"tool": "system_logs_tail", "args": {"service": "nginx", "lines": 5}, "confirmed": True}]}
+
+
+def _planner(fake, tmp_path) -> JupiterPlanner:
+    return JupiterPlanner(base_url=fake.url, model=fake.config.model, memory=MemoryStore(tmp_path / "memory.db"), fast_path=False)
+
+
+def stream(fake, tmp_path, message: str = "how is my machine doing?") -> tuple:
+    """(reply text streamed, final plan, planner.last_stats) from one plan_stream call."""
+    async def run():
+        planner = _planner(fake, tmp_path)
+        try:
+            tokens, plan = "", None
+            async for event in planner.plan_stream(message):
+                if event["type"] == "token":
+                    tokens += event["content"]
+                else:
+                    plan = event["plan"]
+            return tokens, plan, planner.last_stats
+        finally:
+            await planner.aclose()
+    return asyncio.run(run())
+
+
+def plan(fake, tmp_path, message: str = "how is my machine doing?") -> dict:
+    async def run():
+        planner = _planner(fake, tmp_path)
+        try:
+            return await planner.plan(message)
+        finally:
+            await planner.aclose()
+    return asyncio.run(run())
+
+
+def test_reply_cut_off_mid_object(fake_ollama, tmp_path):
+    fake = fake_ollama(response='{"action": "reply", "content": "Disk usage is at 4', chunk_tokens=2)
+    tokens, result, _ = stream(fake, tmp_path)
+    assert tokens == "Disk usage is at 4"
+    assert result == {"action": "reply", "content": "Disk usage is at 4"}  # what the user already saw
+    # Not streamed: nothing was shown, so the raw response is the reply
+    assert plan(fake, tmp_path, "and now?") == {"action": "reply", "content": fake.config.response}
+
+
+def test_tool_plan_cut_off_falls_back_to_raw_text(fake_ollama, tmp_path):
+    fake = fake_ollama(response='{"action": "tool", "tool": "system_st')
+    tokens, result, _ = stream(fake, tmp_path)
+    assert tokens == ""
+    assert result == {"action": "reply", "content": '{"action": "tool", "tool": "system_st'}
+
+
+def test_non_json_reply(fake_ollama, tmp_path):
+    fake = fake_ollama(response="Your disk is 40% full; nothing to worry about.", chunk_tokens=3)
+    tokens, result, _ = stream(fake, tmp_path)
+    assert tokens == fake.config.response
+    assert result == {"action": "reply", "content": fake.config.response}
+    assert plan(fake, tmp_path, "and now?") == {"action": "reply", "content": fake.config.response}
+
+
+def test_tokens_after_the_plan_stop_generation(fake_ollama, tmp_path):
+    status = {"action": "tool", "tool": "system_status", "args": {}, "confirmed": True}
+    fake = fake_ollama(response=json.dumps(status), trailing_tokens=2000, tokens_per_sec=2000, chunk_tokens=4)
+    start = time.perf_counter()
+    tokens, result, stats = stream(fake, tmp_path)
+    assert result == status
+    assert tokens == ""
+    assert stats == {}  # closed before the final chunk
+    assert time.perf_counter() - start < 0.8  # the whole response takes over a second to generate
+    deadline = time.monotonic() + 2
+    while fake.stats.stopped == 0 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert fake.stats.stopped == 1
+    # Not streamed, the whole response is read and the plan still parses
+    assert plan(fake, tmp_path, "status again") == status
+
+
+@pytest.mark.parametrize("streamed", [True, False])
+def test_multi_call_plan(fake_ollama, tmp_path, streamed):
+    fake = fake_ollama(response=json.dumps(MULTI), chunk_tokens=2)
+    result = stream(fake, tmp_path)[1] if streamed else plan(fake, tmp_path)
+    assert result == MULTI
+    assert [c["tool"] for c in plan_calls(result)] == ["system_status", "system_logs_tail"]
+    assert fake.stats.structured == 1  # constrained to the plan schema
@@ -0,0 +1,36 @@
+"""The intent router: requests that are exactly an intent get a fixed plan, anything more goes to the model."""
+import pytest
+from jupiter.agent.router import IntentRouter, normalize
+
+router = IntentRouter()
+
+
+@pytest.mark.parametrize("text, tool, args", [
+    ("status", "system_status", {}),
+    ("Jupiter, could you show me the system status please?", "system_status", {}),
+    ("disk usage", "system_diagnostics", {}),
+    ("what's the load average", "system_diagnostics", {}),
+    ("show the last 20 audit entries", "audit_log", {"limit": 20}),
+    ("tail the last 50 lines of logs for nginx", "system_logs_tail", {"lines": 50, "service": "nginx"}),
+    ("logs", "system_logs_tail", {}),
+])
+def test_exact_requests_are_routed(text, tool, args):
+    plan = router.route(text)
+    assert plan == {"action": "tool", "tool": tool, "args": args, "confirmed": True, "route": tool}
+
+
+@pytest.mark.parametrize("text", [
+    "why is disk usage so high?",
+    "status of nginx and restart it if it's down",
+    "delete the logs",
+    "show me the logs for nginx and then tell me what's wrong",
+    "",
+    "status " + "x" * 80,
+])
+def test_anything_more_falls_through(text):
+    assert router.route(text) is None
+
+
+def test_normalize_strips_only_politeness():
+    assert normalize("  Hey Jupiter,   PLEASE show   disk usage?! ") == "show disk usage"
+    assert normalize("please don't") == "don't"
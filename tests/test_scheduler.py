@@ -0,0 +1,45 @@
+"""The request queue: admission up to QUEUE_DEPTH turns, then 429 with Retry-After."""
+import asyncio
+import httpx
+import pytest
+from jupiter.agent.planner import JupiterPlanner
+from jupiter.agent.scheduler import Overloaded, RequestScheduler
+from jupiter.storage.memory import MemoryStore
+
+
+def test_admit_rejects_once_the_queue_is_full():
+    scheduler = RequestScheduler(max_pending=2)
+    first, second = scheduler.admit("a"), scheduler.admit("b")
+    with pytest.raises(Overloaded) as e:
+        scheduler.admit("c")
+    assert e.value.retry_after >= 1
+    first.release()
+    first.release()  # idempotent: frees one place, not two
+    third = scheduler.admit("c")
+    with pytest.raises(Overloaded):
+        scheduler.admit("d")
+    second.release()
+    third.release()
+
+
+def test_full_queue_answers_429(fake_ollama, tmp_path, monkeypatch):
+    import jupiter.api.main as api
+    fake = fake_ollama()
+
+    async def run():
+        planner = JupiterPlanner(base_url=fake.url, model=fake.config.model, memory=MemoryStore(tmp_path / "memory.db"),
+                                 scheduler=RequestScheduler(max_pending=1))
+        for name, value in (("_planner", planner), ("_memory", planner.memory)):
+            monkeypatch.setattr(api, name, value)
+        waiting = planner.scheduler.admit("other")
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://127.0.0.1") as client:
+                for path in ("/chat", "/chat/stream"):
+                    r = await client.post(path, json={"message": "how is my machine doing?"})
+                    assert r.status_code == 429 and int(r.headers["Retry-After"]) >= 1
+                waiting.release()
+                assert (await client.post("/chat", json={"message": "how is my machine doing?"})).status_code == 200
+        finally:
+            await planner.aclose()
+    asyncio.run(run())
+    assert fake.stats.requests == 1  # the rejected turns never reached the model
@@ -0,0 +1,32 @@
+"""Semantic memory's embedding requests: the index's own client outside the planner, the backend pool inside it."""
+import asyncio
+import pytest
+from jupiter.agent.planner import JupiterPlanner
+from jupiter.storage.memory import MemoryStore
+
+pytest.importorskip("numpy")
+from jupiter.storage.semantic import SemanticIndex  # noqa: E402
+
+
+def test_an_empty_index_is_kept(tmp_path):
+    index = SemanticIndex(tmp_path / "memory.db.vec", model="embed")
+    assert len(index) == 0
+    assert MemoryStore(tmp_path / "memory.db", semantic=index).semantic is index
+
+
+def test_planner_embeds_through_its_pool(fake_ollama, tmp_path):
+    direct, pooled = fake_ollama(), fake_ollama(response='{"action": "reply", "content": "fine"}')
+    memory = MemoryStore(tmp_path / "memory.db", semantic=SemanticIndex(tmp_path / "memory.db.vec", model="embed", base_url=direct.url))
+    memory.episodic_add("nginx was restarted after the disk filled up")  # no planner yet: the index's own client
+    assert direct.stats.paths["/api/embed"] == 1
+
+    async def run():
+        planner = JupiterPlanner(base_url=pooled.url, model=pooled.config.model, memory=memory, fast_path=False)
+        try:
+            assert await planner.plan("why did nginx restart?") == {"action": "reply", "content": "fine"}
+        finally:
+            await planner.aclose()
+    asyncio.run(run())
+    assert pooled.stats.paths["/api/embed"] == 1
+    assert direct.stats.paths["/api/embed"] == 1
+    assert memory.semantic.transport is None  # unbound on close
@@ -0,0 +1,70 @@
+"""The tool result cache (TTL, LRU, single-flight) and the broker in front of it."""
+import threading
+import time
+from jupiter.safety import broker as broker_module
+from jupiter.safety.broker import SafetyBroker, Scope, ToolResult
+from jupiter.safety.cache import ResultCache
+from jupiter.storage.audit import AuditStore
+
+
+def test_concurrent_calls_share_one_run():
+    cache, calls, release = ResultCache({"t": 10}), [], threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(2)
+        return "result"
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_call("k", 10, compute))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    release.set()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert sorted(results, key=lambda r: r[1]) == [("result", False)] + [("result", True)] * 4
+
+
+def test_entries_expire_after_their_ttl():
+    cache, calls = ResultCache({"t": 0.1}), []
+    compute = lambda: calls.append(1) or len(calls)
+    assert cache.get_or_call("k", 0.1, compute) == (1, False)
+    assert cache.get_or_call("k", 0.1, compute) == (1, True)
+    time.sleep(0.15)
+    assert cache.get_or_call("k", 0.1, compute) == (2, False)
+
+
+def test_failures_are_not_cached_and_lru_is_bounded():
+    cache = ResultCache({"t": 10}, max_entries=2)
+    failed = ToolResult(success=False, output="", error="boom")
+    assert cache.get_or_call("bad", 10, lambda: failed) == (failed, False)
+    assert cache.get_or_call("bad", 10, lambda: "ok") == ("ok", False)
+    for key in ("a", "b", "c"):
+        cache.get_or_call(key, 10, lambda: key)
+    assert cache.get_or_call("a", 10, lambda: "again") == ("again", False)  # evicted, the oldest
+    assert cache.get_or_call("c", 10, lambda: "again") == ("c", True)
+
+
+def test_broker_caches_reads(tmp_path):
+    audit = AuditStore(tmp_path / "audit.db")
+    broker, calls = SafetyBroker(audit=audit, cache=ResultCache({"system_status": 10})), []
+    status = lambda: calls.append(1) or ToolResult(success=True, output="up")
+    assert broker.execute("system_status", Scope.SYSTEM_READ, status).output == "up"
+    assert broker.execute("system_status", Scope.SYSTEM_READ, status).output == "up"
+    assert len(calls) == 1
+    audit.close()
+
+
+def test_denied_call_never_runs_even_when_cacheable(tmp_path, monkeypatch):
+    monkeypatch.setattr(broker_module, "_CACHEABLE", (Scope.SYSTEM_WRITE,))
+    audit = AuditStore(tmp_path / "audit.db")
+    broker, calls = SafetyBroker(audit=audit, cache=ResultCache({"reboot": 10})), []
+    reboot = lambda: calls.append(1) or ToolResult(success=True, output="rebooting")
+    result = broker.execute("reboot", Scope.SYSTEM_WRITE, reboot, confirmed=False)
+    assert not result.success and result.output == "" and "confirmation" in result.error
+    assert calls == []
+    assert [e["outcome"] for e in audit.query()["entries"]] == ["denied_no_confirm"]
+    assert broker.execute("reboot", Scope.SYSTEM_WRITE, reboot, confirmed=True).output == "rebooting"
+    assert calls == [1]
+    audit.close()
@@ -0,0 +1,44 @@
+"""One deadline per chat turn (AGENT_TIME_LIMIT) covers the planner's model calls as well as the tools."""
+import asyncio
+import time
+from jupiter.agent import daemon
+from jupiter.agent.planner import JupiterPlanner
+from jupiter.safety.broker import SafetyBroker
+from jupiter.storage.audit import AuditStore
+from jupiter.storage.memory import MemoryStore
+
+
+def turn(fake, tmp_path, message: str = "tell me about my machine") -> tuple:
+    """(tokens streamed, final reply, seconds taken) for one chat_turn_stream call."""
+    async def run():
+        memory, audit = MemoryStore(tmp_path / "memory.db"), AuditStore(tmp_path / "audit.db")
+        planner = JupiterPlanner(base_url=fake.url, model=fake.config.model, memory=memory, fast_path=False)
+        tokens, reply, start = "", None, time.perf_counter()
+        try:
+            async for event in daemon.chat_turn_stream(message, planner, SafetyBroker(audit=audit), memory):
+                if event["type"] == "token":
+                    tokens += event["content"]
+                elif event["type"] == "done":
+                    reply = event["reply"]
+            return tokens, reply, time.perf_counter() - start
+        finally:
+            await planner.aclose()
+            audit.close()
+    return asyncio.run(run())
+
+
+def test_slow_reply_stops_at_the_deadline_with_what_was_streamed(fake_ollama, tmp_path, monkeypatch):
+    monkeypatch.setattr(daemon, "AGENT_TIME_LIMIT", 0.5)
+    fake = fake_ollama(response="word " * 200, tokens_per_sec=40)  # five seconds of reply
+    tokens, reply, seconds = turn(fake, tmp_path)
+    assert seconds < 1.5
+    assert tokens and reply == tokens and len(reply) < len(fake.config.response)
+    assert MemoryStore(tmp_path / "memory.db").session_get_recent(2)[-1]["content"] == reply
+
+
+def test_nothing_streamed_by_the_deadline(fake_ollama, tmp_path, monkeypatch):
+    monkeypatch.setattr(daemon, "AGENT_TIME_LIMIT", 0.3)
+    fake = fake_ollama(load_ms=2000)
+    tokens, reply, seconds = turn(fake, tmp_path)
+    assert seconds < 1.3
+    assert tokens == "" and reply.startswith("Stopped")